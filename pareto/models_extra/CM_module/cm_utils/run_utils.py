@@ -16,6 +16,9 @@ Functions mainly used in run_optimal_desalination.py
 This also contains the solving function.
 """
 
+import copy
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import pyomo.environ as pyo
 from pareto.models_extra.CM_module.models.qcp_br import build_qcp_br
@@ -216,7 +219,37 @@ def change_piping_connection(data, base, old, new, pipe_in):
     return data
 
 
-def node_rerun(df_sets, df_parameters, treatment_site="R01", max_iterations=3000):
+def _evaluate_node(df_sets, df_parameters, max_iterations):
+    """
+    Builds and solves the model for one treatment site connection. Used as the task
+    of the worker processes in node_rerun, so only the cost summary is returned.
+    """
+    model = build_qcp_br(data_parser(df_sets, df_parameters))
+    model, values = solving(model, max_iterations)
+    return values
+
+
+def _rank_nodes(final_values):
+    """
+    Sorts the nodes by net cost, nodes without a feasible solution (net cost of 0) last
+    """
+    return sorted(
+        final_values,
+        key=lambda node: (
+            final_values[node]["\nNet cost"] <= 1e-4,
+            final_values[node]["\nNet cost"],
+        ),
+    )
+
+
+def node_rerun(
+    df_sets,
+    df_parameters,
+    treatment_site="R01",
+    max_iterations=3000,
+    max_workers=1,
+    keep_models=None,
+):
     """
     builds the models with different arc connections and runs them through the solver, printing
     the resutls and displaying a graph for comparison
@@ -225,6 +258,11 @@ def node_rerun(df_sets, df_parameters, treatment_site="R01", max_iterations=3000
     df_sets: a dictionary containing the various sets and their respective sites found within the model
     df_parameters: a dictionary containing the parameters of the model, including the arcs, capacities, and costs
     treatment_site: the selected treatment site that will have its connections changed
+    max_workers: number of worker processes that build and solve the models in parallel, with the
+        default of 1 the models are built and solved one after another in the current process
+    keep_models: maximum number of solved models that are kept in memory and returned, the ones with
+        the smallest total cost are kept. If None, all the models are kept. Models solved by worker
+        processes can not be sent back, so the kept models are built and solved again
 
     Function Outputs:
     min_node: returns the node which resulted in the smallest total cost for the model
@@ -237,33 +275,70 @@ def node_rerun(df_sets, df_parameters, treatment_site="R01", max_iterations=3000
     model = build_qcp_br(data)
     models = dict()
 
-    print("\n\n\nmaking new models\n")
-
     prev_node = model.s_Ain[treatment_site + "_IN"][0][0]  # calling previous node
-
-    # Looping through all the treatment sites and changing which node is being used
-    for node in df_sets["NetworkNodes"].tolist():
-        print(f"model {node} being made...")
-        # creates new paramter data with the selected node
-        new_param_data = change_piping_connection(
-            df_parameters, treatment_site, prev_node, node, pipe_in=True
-        )
-        new_data = data_parser(df_sets, new_param_data)
-        new_model = build_qcp_br(new_data)
-        # adds the new_model to the list of models
-        models[node] = new_model
-        # sets previous node to the
-        prev_node = node
-
-    print("\nmodels generated\n\n\n")
+    del model
 
     final_values = dict()
-    for node_num in models:
-        print(f"\n\nRunning {node_num}\n")
-        # runs each model through and solves for optimal solution
-        solved_model, values = solving(models[node_num], max_iterations)
-        # appends final data to be displayed later
-        final_values[node_num] = values
+    if max_workers > 1:
+        print("\n\n\nsolving new models in parallel\n")
+        # the connections are changed one after another, so the parameter data of
+        # every node is copied before it is sent to the worker processes
+        node_parameters = dict()
+        for node in df_sets["NetworkNodes"].tolist():
+            new_param_data = change_piping_connection(
+                df_parameters, treatment_site, prev_node, node, pipe_in=True
+            )
+            node_parameters[node] = copy.deepcopy(new_param_data)
+            prev_node = node
+
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                node: executor.submit(
+                    _evaluate_node, df_sets, node_parameters[node], max_iterations
+                )
+                for node in node_parameters
+            }
+            for node, future in futures.items():
+                final_values[node] = future.result()
+
+        # rebuild and solve the models that are kept
+        kept_nodes = _rank_nodes(final_values)
+        if keep_models is not None:
+            kept_nodes = kept_nodes[:keep_models]
+        for node in node_parameters:
+            if node in kept_nodes:
+                print(f"\n\nRunning {node}\n")
+                new_model = build_qcp_br(data_parser(df_sets, node_parameters[node]))
+                models[node], _ = solving(new_model, max_iterations)
+    else:
+        print("\n\n\nmaking and solving new models\n")
+        # Looping through all the treatment sites and changing which node is being used
+        for node in df_sets["NetworkNodes"].tolist():
+            print(f"model {node} being made...")
+            # creates new paramter data with the selected node
+            new_param_data = change_piping_connection(
+                df_parameters, treatment_site, prev_node, node, pipe_in=True
+            )
+            new_data = data_parser(df_sets, new_param_data)
+            new_model = build_qcp_br(new_data)
+            # sets previous node to the
+            prev_node = node
+
+            print(f"\n\nRunning {node}\n")
+            # runs each model through and solves for optimal solution
+            solved_model, values = solving(new_model, max_iterations)
+            # appends final data to be displayed later
+            final_values[node] = values
+            models[node] = solved_model
+
+            # only the models with the smallest total cost are kept in memory
+            if keep_models is not None and len(models) > keep_models:
+                for discarded in _rank_nodes({n: final_values[n] for n in models})[
+                    keep_models:
+                ]:
+                    del models[discarded]
+
+    print("\nmodels solved\n\n\n")
 
     for node_num, model in models.items():
         print(f"\n---- Treatment at node: {node_num} ----\n")
@@ -31,6 +31,10 @@ from pyomo.core.base.constraint import simple_constraint_rule
 
 # import gurobipy
 from pyomo.common.config import ConfigBlock, ConfigValue, In, Bool
+from pareto.utilities.profiling import ConstructionProfiler, construction_stage
+from pareto.strategic_water_management.strategic_produced_water_optimization import (
+    _build_arc_adjacency,
+)
 from enum import Enum
 
 
@@ -84,6 +88,20 @@ CONFIG.declare(
         }""",
     ),
 )
+CONFIG.declare(
+    "profile_construction",
+    ConfigValue(
+        default=False,
+        domain=Bool,
+        description="Model construction profiling",
+        doc="""Selection to record the construction of every model component
+        ***default*** - False
+        **Valid Values:** - {
+        **True** - Record the wall time, peak memory and size of each component in model.construction_profile (see pareto.utilities.profiling.ConstructionProfiler),
+        **False** - Build the model without instrumentation
+        }""",
+    ),
+)
 
 
 # return the units container used for strategic model
@@ -98,7 +116,17 @@ def create_model(df_sets, df_parameters, default={}):
     Args: list with sets and parameters
     Return: mathematical model
     """
+    if CONFIG(default).profile_construction:
+        profiler = ConstructionProfiler()
+        with profiler.stage("create_model"):
+            model = _create_model(df_sets, df_parameters, default)
+        # Components added later (e.g. water quality) are recorded too
+        model.construction_profile = profiler
+        return model
+    return _create_model(df_sets, df_parameters, default)
+
 
+def _create_model(df_sets, df_parameters, default):
     model = ConcreteModel()
     # import config dictionary
     model.config = CONFIG(default)
@@ -512,6 +540,30 @@ def create_model(df_sets, df_parameters, default={}):
         initialize=list(df_parameters["LLA"].keys()),
         doc="Location-to-location piping arcs",
     )
+    # In/out neighbors of every location, so that the balances only visit the
+    # arcs that actually exist instead of scanning all locations
+    piped_in, piped_out = _build_arc_adjacency(model.s_L, model.s_LLA)
+    trucked_in, trucked_out = _build_arc_adjacency(model.s_L, model.s_LLT)
+    model.s_LLA_In = Set(
+        model.s_L,
+        initialize=piped_in,
+        doc="Locations with a valid piping arc into location l",
+    )
+    model.s_LLA_Out = Set(
+        model.s_L,
+        initialize=piped_out,
+        doc="Locations with a valid piping arc out of location l",
+    )
+    model.s_LLT_In = Set(
+        model.s_L,
+        initialize=trucked_in,
+        doc="Locations with a valid trucking arc into location l",
+    )
+    model.s_LLT_Out = Set(
+        model.s_L,
+        initialize=trucked_out,
+        doc="Locations with a valid trucking arc out of location l",
+    )
 
     model.p_LLT = Param(
         model.s_L,
@@ -1550,11 +1602,13 @@ def create_model(df_sets, df_parameters, default={}):
         return model.p_gamma_Completions[p, t] == (
             sum(
                 model.v_F_Piped[l, p, t]
-                for l in (model.s_L - model.s_F)
-                if model.p_LLA[l, p]
+                for l in model.s_LLA_In[p]
+                if l not in model.s_F
+            )
+            + sum(
+                model.v_F_Sourced[f, p, t] for f in model.s_LLA_In[p] if f in model.s_F
             )
-            + sum(model.v_F_Sourced[f, p, t] for f in model.s_F if model.p_LLA[f, p])
-            + sum(model.v_F_Trucked[l, p, t] for l in model.s_L if model.p_LLT[l, p])
+            + sum(model.v_F_Trucked[l, p, t] for l in model.s_LLT_In[p])
             + model.v_F_PadStorageOut[p, t]
             - model.v_F_PadStorageIn[p, t]
             + model.v_S_FracDemand[p, t]
@@ -1636,7 +1690,7 @@ def create_model(df_sets, df_parameters, default={}):
 
     def CompletionsPadTruckOffloadingCapacityRule(model, p, t):
         return (
-            sum(model.v_F_Trucked[l, p, t] for l in model.s_L if model.p_LLT[l, p])
+            sum(model.v_F_Trucked[l, p, t] for l in model.s_LLT_In[p])
         ) <= model.p_sigma_OffloadingPad[p]
 
     model.CompletionsPadTruckOffloadingCapacity = Constraint(
@@ -1647,34 +1701,26 @@ def create_model(df_sets, df_parameters, default={}):
     )
 
     def TrucksMaxCapacityRule(model, l, l_tilde, t):
-        if (l, l_tilde) in model.s_LLT:
-            return (
-                model.v_F_Trucked[l, l_tilde, t]
-                <= model.p_sigma_MaxTruckFlow * model.vb_y_Truck[l, l_tilde, t]
-            )
-        else:
-            return Constraint.Skip
+        return (
+            model.v_F_Trucked[l, l_tilde, t]
+            <= model.p_sigma_MaxTruckFlow * model.vb_y_Truck[l, l_tilde, t]
+        )
 
     model.TrucksMaxCapacity = Constraint(
-        model.s_L,
-        model.s_L,
+        model.s_LLT,
         model.s_T,
         rule=TrucksMaxCapacityRule,
         doc="Maximum amount of water that can be transported by trucks",
     )
 
     def TrucksMinCapacityRule(model, l, l_tilde, t):
-        if (l, l_tilde) in model.s_LLT:
-            return (
-                model.v_F_Trucked[l, l_tilde, t]
-                >= model.p_sigma_MinTruckFlow * model.vb_y_Truck[l, l_tilde, t]
-            )
-        else:
-            return Constraint.Skip
+        return (
+            model.v_F_Trucked[l, l_tilde, t]
+            >= model.p_sigma_MinTruckFlow * model.vb_y_Truck[l, l_tilde, t]
+        )
 
     model.TrucksMinCapacity = Constraint(
-        model.s_L,
-        model.s_L,
+        model.s_LLT,
         model.s_T,
         rule=TrucksMinCapacityRule,
         doc="Minimum amount of water that can be transported by trucks",
@@ -1682,7 +1728,7 @@ def create_model(df_sets, df_parameters, default={}):
 
     def StorageSiteTruckOffloadingCapacityRule(model, s, t):
         return (
-            sum(model.v_F_Trucked[l, s, t] for l in model.s_L if model.p_LLT[l, s])
+            sum(model.v_F_Trucked[l, s, t] for l in model.s_LLT_In[s])
             <= model.p_sigma_OffloadingStorage[s]
         )
 
@@ -1695,8 +1741,8 @@ def create_model(df_sets, df_parameters, default={}):
 
     def StorageSiteProcessingCapacityRule(model, s, t):
         return (
-            sum(model.v_F_Piped[l, s, t] for l in model.s_L if model.p_LLA[l, s])
-            + sum(model.v_F_Trucked[l, s, t] for l in model.s_L if model.p_LLT[l, s])
+            sum(model.v_F_Piped[l, s, t] for l in model.s_LLA_In[s])
+            + sum(model.v_F_Trucked[l, s, t] for l in model.s_LLT_In[s])
             <= model.p_sigma_ProcessingStorage[s]
         )
 
@@ -1891,8 +1937,8 @@ def create_model(df_sets, df_parameters, default={}):
     def ProductionPadSupplyBalanceRule(model, p, t):
         return (
             model.v_B_Production[p, t]
-            == sum(model.v_F_Piped[p, l, t] for l in model.s_L if model.p_LLA[p, l])
-            + sum(model.v_F_Trucked[p, l, t] for l in model.s_L if model.p_LLT[p, l])
+            == sum(model.v_F_Piped[p, l, t] for l in model.s_LLA_Out[p])
+            + sum(model.v_F_Trucked[p, l, t] for l in model.s_LLT_Out[p])
             + model.v_S_Production[p, t]
         )
 
@@ -1906,8 +1952,8 @@ def create_model(df_sets, df_parameters, default={}):
     def CompletionsPadSupplyBalanceRule(model, p, t):
         return (
             model.v_B_Production[p, t]
-            == sum(model.v_F_Piped[p, l, t] for l in model.s_L if model.p_LLA[p, l])
-            + sum(model.v_F_Trucked[p, l, t] for l in model.s_L if model.p_LLT[p, l])
+            == sum(model.v_F_Piped[p, l, t] for l in model.s_LLA_Out[p])
+            + sum(model.v_F_Trucked[p, l, t] for l in model.s_LLT_Out[p])
             + model.v_S_Flowback[p, t]
         )
 
@@ -1919,30 +1965,37 @@ def create_model(df_sets, df_parameters, default={}):
     )
 
     def NetworkNodeBalanceRule(model, n, t):
-        return sum(
-            model.v_F_Piped[l, n, t] for l in model.s_L if model.p_LLA[l, n]
-        ) == sum(model.v_F_Piped[n, l, t] for l in model.s_L if model.p_LLA[n, l])
+        return sum(model.v_F_Piped[l, n, t] for l in model.s_LLA_In[n]) == sum(
+            model.v_F_Piped[n, l, t] for l in model.s_LLA_Out[n]
+        )
 
     model.NetworkBalance = Constraint(
         model.s_N, model.s_T, rule=NetworkNodeBalanceRule, doc="Network node balance"
     )
 
+    def _is_bidirectional_arc(model, l, l_tilde):
+        return (
+            l not in model.s_F
+            and l not in model.s_O
+            and l_tilde not in model.s_F
+            and (l_tilde, l) in model.s_LLA
+        )
+
     def BidirectionalFlowRule1(model, l, l_tilde, t):
-        if model.p_LLA[l, l_tilde] and model.p_LLA[l_tilde, l]:
+        if _is_bidirectional_arc(model, l, l_tilde):
             return model.vb_y_Flow[l, l_tilde, t] + model.vb_y_Flow[l_tilde, l, t] == 1
         else:
             return Constraint.Skip
 
     model.BidirectionalFlow1 = Constraint(
-        (model.s_L - model.s_F - model.s_O),
-        (model.s_L - model.s_F),
+        model.s_LLA,
         model.s_T,
         rule=BidirectionalFlowRule1,
         doc="Bi-directional flow",
     )
 
     def BidirectionalFlowRule2(model, l, l_tilde, t):
-        if model.p_LLA[l, l_tilde] and model.p_LLA[l_tilde, l]:
+        if _is_bidirectional_arc(model, l, l_tilde):
             return (
                 model.v_F_Piped[l, l_tilde, t]
                 <= model.vb_y_Flow[l, l_tilde, t] * model.p_M_Flow
@@ -1951,8 +2004,7 @@ def create_model(df_sets, df_parameters, default={}):
             return Constraint.Skip
 
     model.BidirectionalFlow2 = Constraint(
-        (model.s_L - model.s_F - model.s_O),
-        (model.s_L - model.s_F),
+        model.s_LLA,
         model.s_T,
         rule=BidirectionalFlowRule2,
         doc="Bi-directional flow",
@@ -1961,25 +2013,21 @@ def create_model(df_sets, df_parameters, default={}):
     def StorageSiteBalanceRule(model, s, t):
         if t == model.s_T.first():
             return model.v_L_Storage[s, t] == model.p_lambda_Storage[s] + sum(
-                model.v_F_Piped[l, s, t] for l in model.s_L if model.p_LLA[l, s]
-            ) + sum(
-                model.v_F_Trucked[l, s, t] for l in model.s_L if model.p_LLT[l, s]
+                model.v_F_Piped[l, s, t] for l in model.s_LLA_In[s]
+            ) + sum(model.v_F_Trucked[l, s, t] for l in model.s_LLT_In[s]) - sum(
+                model.v_F_Piped[s, l, t] for l in model.s_LLA_Out[s]
             ) - sum(
-                model.v_F_Piped[s, l, t] for l in model.s_L if model.p_LLA[s, l]
-            ) - sum(
-                model.v_F_Trucked[s, l, t] for l in model.s_L if model.p_LLT[s, l]
+                model.v_F_Trucked[s, l, t] for l in model.s_LLT_Out[s]
             )
         else:
             return model.v_L_Storage[s, t] == model.v_L_Storage[
                 s, model.s_T.prev(t)
-            ] + sum(
-                model.v_F_Piped[l, s, t] for l in model.s_L if model.p_LLA[l, s]
-            ) + sum(
-                model.v_F_Trucked[l, s, t] for l in model.s_L if model.p_LLT[l, s]
+            ] + sum(model.v_F_Piped[l, s, t] for l in model.s_LLA_In[s]) + sum(
+                model.v_F_Trucked[l, s, t] for l in model.s_LLT_In[s]
             ) - sum(
-                model.v_F_Piped[s, l, t] for l in model.s_L if model.p_LLA[s, l]
+                model.v_F_Piped[s, l, t] for l in model.s_LLA_Out[s]
             ) - sum(
-                model.v_F_Trucked[s, l, t] for l in model.s_L if model.p_LLT[s, l]
+                model.v_F_Trucked[s, l, t] for l in model.s_LLT_Out[s]
             )
 
     model.StorageSiteBalance = Constraint(
@@ -1990,52 +2038,45 @@ def create_model(df_sets, df_parameters, default={}):
     )
 
     def PipelineCapacityExpansionRule(model, l, l_tilde):
-        if model.p_LLA[l, l_tilde]:
-            if model.p_LLA[l_tilde, l]:
-                return (
-                    model.v_F_Capacity[l, l_tilde]
-                    == model.p_sigma_Pipeline[l, l_tilde]
-                    + model.p_sigma_Pipeline[l_tilde, l]
-                    + sum(
-                        model.p_delta_Pipeline[d]
-                        * (
-                            model.vb_y_Pipeline[l, l_tilde, d]
-                            + model.vb_y_Pipeline[l_tilde, l, d]
-                        )
-                        for d in model.s_D
-                    )
-                    + model.v_S_PipelineCapacity[l, l_tilde]
-                )
-            else:
-                return (
-                    model.v_F_Capacity[l, l_tilde]
-                    == model.p_sigma_Pipeline[l, l_tilde]
-                    + sum(
-                        model.p_delta_Pipeline[d] * (model.vb_y_Pipeline[l, l_tilde, d])
-                        for d in model.s_D
+        if (l_tilde, l) in model.s_LLA:
+            return (
+                model.v_F_Capacity[l, l_tilde]
+                == model.p_sigma_Pipeline[l, l_tilde]
+                + model.p_sigma_Pipeline[l_tilde, l]
+                + sum(
+                    model.p_delta_Pipeline[d]
+                    * (
+                        model.vb_y_Pipeline[l, l_tilde, d]
+                        + model.vb_y_Pipeline[l_tilde, l, d]
                     )
-                    + model.v_S_PipelineCapacity[l, l_tilde]
+                    for d in model.s_D
                 )
-
+                + model.v_S_PipelineCapacity[l, l_tilde]
+            )
         else:
-            return Constraint.Skip
+            return (
+                model.v_F_Capacity[l, l_tilde]
+                == model.p_sigma_Pipeline[l, l_tilde]
+                + sum(
+                    model.p_delta_Pipeline[d] * (model.vb_y_Pipeline[l, l_tilde, d])
+                    for d in model.s_D
+                )
+                + model.v_S_PipelineCapacity[l, l_tilde]
+            )
 
     model.PipelineCapacityExpansion = Constraint(
-        model.s_L,
-        model.s_L,
+        model.s_LLA,
         rule=PipelineCapacityExpansionRule,
         doc="Pipeline capacity construction/expansion",
     )
 
     def PipelineCapacityRule(model, l, l_tilde, t):
-        if model.p_LLA[l, l_tilde]:
-            return model.v_F_Piped[l, l_tilde, t] <= model.v_F_Capacity[l, l_tilde]
-        else:
+        if l in model.s_O or l in model.s_K or l_tilde in model.s_F:
             return Constraint.Skip
+        return model.v_F_Piped[l, l_tilde, t] <= model.v_F_Capacity[l, l_tilde]
 
     model.PipelineCapacity = Constraint(
-        (model.s_L - model.s_O - model.s_K),
-        (model.s_L - model.s_F),
+        model.s_LLA,
         model.s_T,
         rule=PipelineCapacityRule,
         doc="Pipeline capacity",
@@ -2074,8 +2115,8 @@ def create_model(df_sets, df_parameters, default={}):
 
     def DisposalCapacityRule(model, k, t):
         return (
-            sum(model.v_F_Piped[l, k, t] for l in model.s_L if model.p_LLA[l, k])
-            + sum(model.v_F_Trucked[l, k, t] for l in model.s_L if model.p_LLT[l, k])
+            sum(model.v_F_Piped[l, k, t] for l in model.s_LLA_In[k])
+            + sum(model.v_F_Trucked[l, k, t] for l in model.s_LLT_In[k])
             <= model.v_D_Capacity[k]
         )
 
@@ -2085,8 +2126,8 @@ def create_model(df_sets, df_parameters, default={}):
 
     def TreatmentCapacityRule(model, r, t):
         return (
-            sum(model.v_F_Piped[l, r, t] for l in model.s_L if model.p_LLA[l, r])
-            + sum(model.v_F_Trucked[l, r, t] for l in model.s_L if model.p_LLT[l, r])
+            sum(model.v_F_Piped[l, r, t] for l in model.s_LLA_In[r])
+            + sum(model.v_F_Trucked[l, r, t] for l in model.s_LLT_In[r])
             <= model.p_sigma_Treatment[r] + model.v_S_TreatmentCapacity[r]
         )
 
@@ -2098,12 +2139,10 @@ def create_model(df_sets, df_parameters, default={}):
         return (
             model.p_epsilon_Treatment[r, "TDS"]
             * (
-                sum(model.v_F_Piped[l, r, t] for l in model.s_L if model.p_LLA[l, r])
-                + sum(
-                    model.v_F_Trucked[l, r, t] for l in model.s_L if model.p_LLT[l, r]
-                )
+                sum(model.v_F_Piped[l, r, t] for l in model.s_LLA_In[r])
+                + sum(model.v_F_Trucked[l, r, t] for l in model.s_LLT_In[r])
             )
-            == sum(model.v_F_Piped[r, l, t] for l in model.s_L if model.p_LLA[l, r])
+            == sum(model.v_F_Piped[r, l, t] for l in model.s_LLA_In[r])
             + model.v_F_UnusedTreatedWater[r, t]
         )
 
@@ -2116,8 +2155,8 @@ def create_model(df_sets, df_parameters, default={}):
 
     def BeneficialReuseCapacityRule(model, o, t):
         return (
-            sum(model.v_F_Piped[l, o, t] for l in model.s_L if model.p_LLA[l, o])
-            + sum(model.v_F_Trucked[l, o, t] for l in model.s_L if model.p_LLT[l, o])
+            sum(model.v_F_Piped[l, o, t] for l in model.s_LLA_In[o])
+            + sum(model.v_F_Trucked[l, o, t] for l in model.s_LLT_In[o])
             <= model.p_sigma_Reuse[o] + model.v_S_ReuseCapacity[o]
         )
 
@@ -2179,10 +2218,8 @@ def create_model(df_sets, df_parameters, default={}):
         return (
             model.v_C_Disposal[k, t]
             == (
-                sum(model.v_F_Piped[l, k, t] for l in model.s_L if model.p_LLA[l, k])
-                + sum(
-                    model.v_F_Trucked[l, k, t] for l in model.s_L if model.p_LLT[l, k]
-                )
+                sum(model.v_F_Piped[l, k, t] for l in model.s_LLA_In[k])
+                + sum(model.v_F_Trucked[l, k, t] for l in model.s_LLT_In[k])
             )
             * model.p_pi_Disposal[k]
         )
@@ -2204,10 +2241,8 @@ def create_model(df_sets, df_parameters, default={}):
         return (
             model.v_C_Treatment[r, t]
             == (
-                sum(model.v_F_Piped[l, r, t] for l in model.s_L if model.p_LLA[l, r])
-                + sum(
-                    model.v_F_Trucked[l, r, t] for l in model.s_L if model.p_LLT[l, r]
-                )
+                sum(model.v_F_Piped[l, r, t] for l in model.s_LLA_In[r])
+                + sum(model.v_F_Trucked[l, r, t] for l in model.s_LLT_In[r])
             )
             * model.p_pi_Treatment[r]
         )
@@ -2234,13 +2269,13 @@ def create_model(df_sets, df_parameters, default={}):
             (
                 sum(
                     model.v_F_Piped[l, p, t]
-                    for l in (model.s_L - model.s_F)
-                    if model.p_LLA[l, p]
+                    for l in model.s_LLA_In[p]
+                    if l not in model.s_F
                 )
                 + sum(
                     model.v_F_Trucked[l, p, t]
-                    for l in (model.s_L - model.s_F)
-                    if model.p_LLT[l, p]
+                    for l in model.s_LLT_In[p]
+                    if l not in model.s_F
                 )
             )
             * model.p_pi_Reuse[p]
@@ -2263,24 +2298,21 @@ def create_model(df_sets, df_parameters, default={}):
     )
 
     def PipingCostRule(model, l, l_tilde, t):
-        if model.p_LLA[l, l_tilde]:
-            if l in model.s_F:
-                return (
-                    model.v_C_Piped[l, l_tilde, t]
-                    == model.v_F_Sourced[l, l_tilde, t]
-                    * model.p_pi_Pipeline[l, l_tilde]
-                )
-            else:
-                return (
-                    model.v_C_Piped[l, l_tilde, t]
-                    == model.v_F_Piped[l, l_tilde, t] * model.p_pi_Pipeline[l, l_tilde]
-                )
-        else:
+        if l in model.s_O or l in model.s_K or l_tilde in model.s_F:
             return Constraint.Skip
+        if l in model.s_F:
+            return (
+                model.v_C_Piped[l, l_tilde, t]
+                == model.v_F_Sourced[l, l_tilde, t] * model.p_pi_Pipeline[l, l_tilde]
+            )
+        else:
+            return (
+                model.v_C_Piped[l, l_tilde, t]
+                == model.v_F_Piped[l, l_tilde, t] * model.p_pi_Pipeline[l, l_tilde]
+            )
 
     model.PipingCost = Constraint(
-        (model.s_L - model.s_O - model.s_K),
-        (model.s_L - model.s_F),
+        model.s_LLA,
         model.s_T,
         rule=PipingCostRule,
         doc="Piping cost",
@@ -2290,12 +2322,11 @@ def create_model(df_sets, df_parameters, default={}):
         return model.v_C_TotalPiping == (
             sum(
                 sum(
-                    sum(
-                        model.v_C_Piped[l, l_tilde, t]
-                        for l in (model.s_L - model.s_O - model.s_K)
-                        if model.p_LLA[l, l_tilde]
-                    )
-                    for l_tilde in (model.s_L - model.s_F)
+                    model.v_C_Piped[l, l_tilde, t]
+                    for (l, l_tilde) in model.s_LLA
+                    if l not in model.s_O
+                    and l not in model.s_K
+                    and l_tilde not in model.s_F
                 )
                 for t in model.s_T
             )
@@ -2308,10 +2339,8 @@ def create_model(df_sets, df_parameters, default={}):
     def StorageDepositCostRule(model, s, t):
         return model.v_C_Storage[s, t] == (
             (
-                sum(model.v_F_Piped[l, s, t] for l in model.s_L if model.p_LLA[l, s])
-                + sum(
-                    model.v_F_Trucked[l, s, t] for l in model.s_L if model.p_LLT[l, s]
-                )
+                sum(model.v_F_Piped[l, s, t] for l in model.s_LLA_In[s])
+                + sum(model.v_F_Trucked[l, s, t] for l in model.s_LLT_In[s])
             )
             * model.p_pi_Storage[s]
         )
@@ -2332,10 +2361,8 @@ def create_model(df_sets, df_parameters, default={}):
     def StorageWithdrawalCreditRule(model, s, t):
         return model.v_R_Storage[s, t] == (
             (
-                sum(model.v_F_Piped[s, l, t] for l in model.s_L if model.p_LLA[s, l])
-                + sum(
-                    model.v_F_Trucked[s, l, t] for l in model.s_L if model.p_LLT[s, l]
-                )
+                sum(model.v_F_Piped[s, l, t] for l in model.s_LLA_Out[s])
+                + sum(model.v_F_Trucked[s, l, t] for l in model.s_LLT_Out[s])
             )
             * model.p_rho_Storage[s]
         )
@@ -2379,20 +2406,17 @@ def create_model(df_sets, df_parameters, default={}):
     )
 
     def TruckingCostRule(model, l, l_tilde, t):
-        if (l, l_tilde) in model.s_LLT:
-            return (
-                model.v_C_Trucked[l, l_tilde, t]
-                == model.v_F_Trucked[l, l_tilde, t]
-                * 1
-                / model.p_delta_Truck
-                * model.p_tau_Trucking[l, l_tilde]
-                * model.p_pi_Trucking[l]
-            )
-        else:
-            return Constraint.Skip
+        return (
+            model.v_C_Trucked[l, l_tilde, t]
+            == model.v_F_Trucked[l, l_tilde, t]
+            * 1
+            / model.p_delta_Truck
+            * model.p_tau_Trucking[l, l_tilde]
+            * model.p_pi_Trucking[l]
+        )
 
     model.TruckingCost = Constraint(
-        model.s_L, model.s_L, model.s_T, rule=TruckingCostRule, doc="Trucking cost"
+        model.s_LLT, model.s_T, rule=TruckingCostRule, doc="Trucking cost"
     )
 
     def TotalTruckingCostRule(model):
@@ -2431,8 +2455,7 @@ def create_model(df_sets, df_parameters, default={}):
                 sum(
                     model.v_S_PipelineCapacity[l, l_tilde]
                     * model.p_psi_PipelineCapacity
-                    for l in model.s_L
-                    if model.p_LLA[l, l_tilde]
+                    for l in model.s_LLA_In[l_tilde]
                 )
                 for l_tilde in model.s_L
             )
@@ -2458,13 +2481,9 @@ def create_model(df_sets, df_parameters, default={}):
 
     def ReuseDestinationDeliveriesRule(model, p, t):
         return model.v_F_ReuseDestination[p, t] == sum(
-            model.v_F_Piped[l, p, t]
-            for l in (model.s_L - model.s_F)
-            if model.p_LLA[l, p]
+            model.v_F_Piped[l, p, t] for l in model.s_LLA_In[p] if l not in model.s_F
         ) + sum(
-            model.v_F_Trucked[l, p, t]
-            for l in (model.s_L - model.s_F)
-            if model.p_LLT[l, p]
+            model.v_F_Trucked[l, p, t] for l in model.s_LLT_In[p] if l not in model.s_F
         )
 
     model.ReuseDestinationDeliveries = Constraint(
@@ -2476,8 +2495,8 @@ def create_model(df_sets, df_parameters, default={}):
 
     def DisposalDestinationDeliveriesRule(model, k, t):
         return model.v_F_DisposalDestination[k, t] == sum(
-            model.v_F_Piped[l, k, t] for l in model.s_L if model.p_LLA[l, k]
-        ) + sum(model.v_F_Trucked[l, k, t] for l in model.s_L if model.p_LLT[l, k])
+            model.v_F_Piped[l, k, t] for l in model.s_LLA_In[k]
+        ) + sum(model.v_F_Trucked[l, k, t] for l in model.s_LLT_In[k])
 
     model.DisposalDestinationDeliveries = Constraint(
         model.s_K,
@@ -2488,8 +2507,8 @@ def create_model(df_sets, df_parameters, default={}):
 
     def TreatmentDestinationDeliveriesRule(model, r, t):
         return model.v_F_TreatmentDestination[r, t] == sum(
-            model.v_F_Piped[l, r, t] for l in model.s_L if model.p_LLA[l, r]
-        ) + sum(model.v_F_Trucked[l, r, t] for l in model.s_L if model.p_LLT[l, r])
+            model.v_F_Piped[l, r, t] for l in model.s_LLA_In[r]
+        ) + sum(model.v_F_Trucked[l, r, t] for l in model.s_LLT_In[r])
 
     model.TreatmentDestinationDeliveries = Constraint(
         model.s_R,
@@ -2500,8 +2519,8 @@ def create_model(df_sets, df_parameters, default={}):
 
     def BeneficialReuseDeliveriesRule(model, o, t):
         return model.v_F_BeneficialReuseDestination[o, t] == sum(
-            model.v_F_Piped[l, o, t] for l in model.s_L if model.p_LLA[l, o]
-        ) + sum(model.v_F_Trucked[l, o, t] for l in model.s_L if model.p_LLT[l, o])
+            model.v_F_Piped[l, o, t] for l in model.s_LLA_In[o]
+        ) + sum(model.v_F_Trucked[l, o, t] for l in model.s_LLT_In[o])
 
     model.BeneficialReuseDeliveries = Constraint(
         model.s_O,
@@ -2522,6 +2541,7 @@ def create_model(df_sets, df_parameters, default={}):
     return model
 
 
+@construction_stage
 def water_quality(model, df_sets, df_parameters):
     # Introduce parameter nu for water quality at each pad
     model.p_nu = Param(
@@ -2854,6 +2874,7 @@ def discrete_water_quality_list(steps=6) -> list:
     return discrete_qualities
 
 
+@construction_stage
 def water_quality_discrete(model, df_parameters, df_sets):
     # Quality at pad
     model.p_nu_pad = Param(
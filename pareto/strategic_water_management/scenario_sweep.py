@@ -0,0 +1,303 @@
+#####################################################################################################
+# PARETO was produced under the DOE Produced Water Application for Beneficial Reuse Environmental
+# Impact and Treatment Optimization (PARETO), and is copyright (c) 2021-2024 by the software owners:
+# The Regents of the University of California, through Lawrence Berkeley National Laboratory, et al.
+# All rights reserved.
+#
+# NOTICE. This Software was developed under funding from the U.S. Department of Energy and the U.S.
+# Government consequently retains certain rights. As such, the U.S. Government has been granted for
+# itself and others acting on its behalf a paid-up, nonexclusive, irrevocable, worldwide license in
+# the Software to reproduce, distribute copies to the public, prepare derivative works, and perform
+# publicly and display publicly, and to permit others to do so.
+#####################################################################################################
+"""
+Module to run sensitivity studies ("what-if" scenarios) on the strategic model.
+
+A scenario sweep starts from a base data set [df_sets, df_parameters], applies
+parameter overrides and config variants for every scenario, and builds, solves and
+reports each scenario in a pool of worker processes. The KPIs from the overview
+table of generate_report() are collected into one results table.
+
+Authors: PARETO Team
+"""
+import argparse
+import copy
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from numbers import Number
+
+import pandas as pd
+
+from pareto.strategic_water_management.strategic_produced_water_optimization import (
+    WaterQuality,
+    create_model,
+    Objectives,
+    solve_model,
+    PipelineCost,
+    PipelineCapacity,
+    Hydraulics,
+    RemovalEfficiencyMethod,
+    InfrastructureTiming,
+)
+from pareto.utilities.get_data import get_data
+from pareto.utilities.results import generate_report, nostdout
+from pareto.utilities.solvers import get_solver
+
+# Enumerations used to translate config variants given as strings (e.g. in a
+# JSON scenario file) into the values expected by create_model()
+_CONFIG_ENUMS = {
+    "objective": Objectives,
+    "pipeline_cost": PipelineCost,
+    "pipeline_capacity": PipelineCapacity,
+    "hydraulics": Hydraulics,
+    "water_quality": WaterQuality,
+    "removal_efficiency_method": RemovalEfficiencyMethod,
+    "infrastructure_timing": InfrastructureTiming,
+}
+
+# Tabs in the strategic input workbook that define Sets. Every other data tab is
+# read as a parameter when the sweep is started from the command line
+STRATEGIC_SET_LIST = [
+    "ProductionPads",
+    "CompletionsPads",
+    "SWDSites",
+    "ExternalWaterSources",
+    "WaterQualityComponents",
+    "StorageSites",
+    "TreatmentSites",
+    "ReuseOptions",
+    "NetworkNodes",
+    "PipelineDiameters",
+    "StorageCapacities",
+    "InjectionCapacities",
+    "TreatmentCapacities",
+    "TreatmentTechnologies",
+]
+_NON_DATA_TABS = ["Overview", "Schematic"]
+
+# Data shared by all scenarios solved in a worker process, set by _init_worker()
+_worker_state = {}
+
+
+def product_scenarios(parameter_overrides, config_variants):
+    """
+    Build the full factorial combination of parameter overrides and config variants.
+
+    Both arguments are dictionaries that map a label to a dictionary of parameter
+    overrides or config values, respectively. The scenario names are built as
+    "<parameter label>|<config label>".
+    """
+    scenarios = {}
+    for (p_label, parameters), (c_label, config) in itertools.product(
+        parameter_overrides.items(), config_variants.items()
+    ):
+        scenarios[f"{p_label}|{c_label}"] = {
+            "parameters": parameters,
+            "config": config,
+        }
+    return scenarios
+
+
+def apply_parameter_overrides(df_parameters, overrides):
+    """
+    Return a copy of df_parameters with the overrides applied, the input is not modified.
+
+    For every parameter name in overrides the value can be:
+    - a number: every entry of the parameter is multiplied by this factor,
+    - a dictionary: the given entries are updated, keyed as in df_parameters,
+    - anything else: the parameter is replaced by the given value.
+    """
+    df_parameters = dict(df_parameters)
+    for name, override in overrides.items():
+        if name not in df_parameters:
+            raise KeyError(f"Parameter {name} is not part of the input data")
+        original = df_parameters[name]
+        if isinstance(override, Number) and isinstance(original, dict):
+            df_parameters[name] = {
+                k: v * override if isinstance(v, Number) else v
+                for k, v in original.items()
+            }
+        elif isinstance(override, dict) and isinstance(original, dict):
+            updated = dict(original)
+            updated.update(override)
+            df_parameters[name] = updated
+        else:
+            df_parameters[name] = copy.deepcopy(override)
+    return df_parameters
+
+
+def _parse_config(config):
+    """
+    Convert config values given by name, e.g. "cost", into the matching Enum members
+    """
+    parsed = {}
+    for key, val in config.items():
+        if key in _CONFIG_ENUMS and isinstance(val, str):
+            try:
+                val = _CONFIG_ENUMS[key][val]
+            except KeyError:
+                raise ValueError(
+                    f"{val} is not a valid value for config argument {key}"
+                ) from None
+        parsed[key] = val
+    return parsed
+
+
+def _init_worker(df_sets, df_parameters, base_config, options):
+    """
+    Store the base data in the worker process, so it is only transferred once per
+    worker instead of once per scenario, and resolve the solver once per worker.
+    """
+    options = dict(options or {})
+    solver = options.get("solver", ("gurobi_direct", "gurobi", "cbc"))
+    opt = get_solver(*solver) if type(solver) is tuple else get_solver(solver)
+    options["solver"] = opt.type
+    _worker_state.update(
+        df_sets=df_sets,
+        df_parameters=df_parameters,
+        base_config=base_config,
+        options=options,
+    )
+
+
+def _run_scenario(name, scenario):
+    """
+    Build, solve and report a single scenario in the current worker process.
+    Returns a dictionary with the scenario status and its KPIs.
+    """
+    row = {"Scenario": name}
+    try:
+        df_parameters = apply_parameter_overrides(
+            _worker_state["df_parameters"], scenario.get("parameters", {})
+        )
+        config = dict(_worker_state["base_config"])
+        config.update(_parse_config(scenario.get("config", {})))
+        model = create_model(_worker_state["df_sets"], df_parameters, config)
+        results = solve_model(model=model, options=dict(_worker_state["options"]))
+        with nostdout():
+            _, results_dict = generate_report(model, results_obj=results, fname=None)
+    except Exception as e:
+        row["Termination Condition"] = "error"
+        row["Error"] = f"{type(e).__name__}: {e}"
+        return row
+
+    row["Termination Condition"] = str(results.solver.termination_condition)
+    row["Error"] = ""
+    for variable_name, _, unit, total in results_dict["v_F_Overview_dict"][1:]:
+        column = variable_name if unit is None else f"{variable_name} [{unit}]"
+        row[column] = total
+    return row
+
+
+def _run_scenario_in_worker(args):
+    return _run_scenario(*args)
+
+
+def run_scenario_sweep(
+    df_sets,
+    df_parameters,
+    scenarios,
+    base_config=None,
+    options=None,
+    max_workers=None,
+):
+    """
+    Solve every scenario of a sweep and collect the KPIs of all of them in a DataFrame.
+
+    Args:
+        df_sets, df_parameters: base input data, as returned by get_data().
+        scenarios: dictionary that maps a scenario name to a dictionary with the
+            optional keys "parameters" (see apply_parameter_overrides()) and "config"
+            (config arguments for create_model(), Enum members or their names).
+        base_config: config arguments shared by all scenarios.
+        options: solver options passed to solve_model() for all scenarios.
+        max_workers: number of worker processes, defaults to the number of CPUs.
+            With max_workers=1 the scenarios are solved in the current process.
+
+    Returns:
+        DataFrame with one row per scenario (in input order) holding the termination
+        condition, the error message for failed scenarios and the KPIs reported in
+        the overview table of generate_report().
+    """
+    base_config = _parse_config(base_config or {})
+    tasks = list(scenarios.items())
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = min(max_workers, max(len(tasks), 1))
+
+    if max_workers == 1:
+        _init_worker(df_sets, df_parameters, base_config, options)
+        rows = [_run_scenario(name, scenario) for name, scenario in tasks]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker,
+            initargs=(df_sets, df_parameters, base_config, options),
+        ) as executor:
+            rows = list(executor.map(_run_scenario_in_worker, tasks))
+
+    return pd.DataFrame(rows).set_index("Scenario")
+
+
+def _parse_json_overrides(parameters):
+    """
+    Parameter overrides in a JSON file cannot use tuples as keys, so indexed
+    entries are given as lists [index_1, ..., index_n, value].
+    """
+    parsed = {}
+    for name, override in parameters.items():
+        if isinstance(override, list):
+            override = {
+                (tuple(entry[:-1]) if len(entry) > 2 else entry[0]): entry[-1]
+                for entry in override
+            }
+        parsed[name] = override
+    return parsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run a sweep of scenarios of the PARETO strategic model"
+    )
+    parser.add_argument("input", help="Excel workbook with the base case study")
+    parser.add_argument(
+        "scenarios",
+        help="JSON file with the scenarios, "
+        '{"name": {"parameters": {...}, "config": {...}}, ...}',
+    )
+    parser.add_argument(
+        "-o", "--output", default="scenario_sweep.csv", help="CSV file for the KPIs"
+    )
+    parser.add_argument("-w", "--workers", type=int, default=None)
+    parser.add_argument("--running-time", type=float, default=60)
+    parser.add_argument("--gap", type=float, default=0)
+    parser.add_argument("--solver", default=None)
+    args = parser.parse_args(argv)
+
+    parameter_list = [
+        tab
+        for tab in pd.ExcelFile(args.input).sheet_names
+        if tab not in STRATEGIC_SET_LIST and tab not in _NON_DATA_TABS
+    ]
+    [df_sets, df_parameters] = get_data(args.input, STRATEGIC_SET_LIST, parameter_list)
+
+    with open(args.scenarios) as f:
+        scenarios = json.load(f)
+    for scenario in scenarios.values():
+        scenario["parameters"] = _parse_json_overrides(scenario.get("parameters", {}))
+
+    options = {"running_time": args.running_time, "gap": args.gap}
+    if args.solver is not None:
+        options["solver"] = args.solver
+
+    kpis = run_scenario_sweep(
+        df_sets, df_parameters, scenarios, options=options, max_workers=args.workers
+    )
+    kpis.to_csv(args.output)
+    print(kpis)
+
+
+if __name__ == "__main__":
+    main()
@@ -13,10 +13,13 @@
 # Title: STRATEGIC Produced Water Optimization Model
 
 # Import
+import logging
 import math
 from cmath import nan
+from collections import deque
 import numpy as np
 import os
+import time
 import pandas as pd
 from pyomo.environ import (
     Var,
@@ -46,8 +49,17 @@ from pyomo.common.config import ConfigBlock, ConfigValue, In, Bool
 from enum import Enum, IntEnum
 
 from pareto.utilities.solvers import get_solver, set_timeout
+from pareto.utilities.profiling import ConstructionProfiler, construction_stage
+from pareto.utilities.model_modifications import (
+    bound_around_solution,
+    fix_all_except,
+    restore_variable_state,
+    snapshot_variable_state,
+)
 from pyomo.opt import TerminationCondition
 
+_log = logging.getLogger(__name__)
+
 
 class Objectives(Enum):
     cost = 0
@@ -93,6 +105,11 @@ class InfrastructureTiming(Enum):
     true = 1
 
 
+class BigM(Enum):
+    global_constant = 0
+    tight = 1
+
+
 # create config dictionary
 CONFIG = ConfigBlock()
 CONFIG.declare(
@@ -216,16 +233,179 @@ CONFIG.declare(
     ),
 )
 
+CONFIG.declare(
+    "big_m",
+    ConfigValue(
+        default=BigM.global_constant,
+        domain=In(BigM),
+        description="Big-M flow values",
+        doc="""Selection of the big-M values of the flow logic constraints
+        ***default*** - BigM.global_constant
+        **Valid Values:** - {
+        **BigM.global_constant** - use the global big-M flow parameter p_M_Flow everywhere,
+        **BigM.tight** - use big-M values derived from the capacity of each pipeline, treatment site and beneficial reuse option (assumes that the capacity slack variables are deactivated)
+        }""",
+    ),
+)
+
+CONFIG.declare(
+    "network_presolve",
+    ConfigValue(
+        default=False,
+        domain=Bool,
+        description="Network presolve",
+        doc="""Selection to prune the network before building the model
+        ***default*** - False
+        **Valid Values:** - {
+        **True** - Remove network nodes that cannot carry water and disposal sites without capacity, with their arcs,
+        **False** - Build the model over the full network
+        }""",
+    ),
+)
+
+CONFIG.declare(
+    "variable_bounds",
+    ConfigValue(
+        default=False,
+        domain=Bool,
+        description="Automatic variable bounds",
+        doc="""Selection to bound the model variables before solving
+        ***default*** - False
+        **Valid Values:** - {
+        **True** - Derive upper bounds on flows, storage levels, capacities and costs from the supply totals, capacity increments and planning horizon, and apply them in solve_model,
+        **False** - Solve the model with the bounds it was built with
+        }""",
+    ),
+)
+
+CONFIG.declare(
+    "profile_construction",
+    ConfigValue(
+        default=False,
+        domain=Bool,
+        description="Model construction profiling",
+        doc="""Selection to record the construction of every model component
+        ***default*** - False
+        **Valid Values:** - {
+        **True** - Record the wall time, peak memory and size of each component in model.construction_profile (see pareto.utilities.profiling.ConstructionProfiler),
+        **False** - Build the model without instrumentation
+        }""",
+    ),
+)
+
+# Parameter tables defining the valid piping and trucking arcs
+piping_arc_types = [
+    "PCA",
+    "PNA",
+    "PPA",
+    "CNA",
+    "CCA",
+    "NNA",
+    "NCA",
+    "NKA",
+    "NSA",
+    "NRA",
+    "NOA",
+    "FCA",
+    "RNA",
+    "RCA",
+    "RKA",
+    "RSA",
+    "SNA",
+    "SCA",
+    "SKA",
+    "SRA",
+    "SOA",
+    "ROA",
+]
+trucking_arc_types = [
+    "PCT",
+    "PKT",
+    "PST",
+    "PRT",
+    "POT",
+    "FCT",
+    "CKT",
+    "CST",
+    "CRT",
+    "CCT",
+    "SCT",
+    "SKT",
+    "SOT",
+    "RKT",
+    "RST",
+    "ROT",
+]
+
+# Number of sections of the piecewise linearization of the Hazen-Williams flow term
 n_sections = 3
-Del_I = 70000 / n_sections
+
+# Parameter tables that can change between scenarios without rebuilding the model
+# (see update_model_parameters), with the mutable Param they initialize and the
+# key of their units in model.user_units (None if they are converted as is)
+updatable_parameters = {
+    "CompletionsDemand": ("p_gamma_Completions", "volume_time"),
+    "PadRates": ("p_beta_Production", "volume_time"),
+    "FlowbackRates": ("p_beta_Flowback", "volume_time"),
+    "ExtWaterSourcingAvailability": ("p_sigma_ExternalWater", "volume_time"),
+    "InitialDisposalCapacity": ("p_sigma_Disposal", "volume_time"),
+    "InitialStorageCapacity": ("p_sigma_Storage", "volume"),
+    "CompletionsPadStorage": ("p_sigma_PadStorage", "volume"),
+    "PadOffloadingCapacity": ("p_sigma_OffloadingPad", "volume_time"),
+    "DisposalOperatingCapacity": ("p_epsilon_DisposalOperatingCapacity", None),
+    "DisposalOperationalCost": ("p_pi_Disposal", "currency_volume"),
+    "ReuseOperationalCost": ("p_pi_Reuse", "currency_volume"),
+    "PipelineOperationalCost": ("p_pi_Pipeline", "currency_volume"),
+    "TruckingHourlyCost": ("p_pi_Trucking", "currency"),
+    "TruckingTime": ("p_tau_Trucking", None),
+    "ExternalSourcingCost": ("p_pi_Sourcing", "currency_volume"),
+    "BeneficialReuseCost": ("p_pi_BeneficialReuse", "currency_volume"),
+    "BeneficialReuseCredit": ("p_rho_BeneficialReuse", "currency_volume"),
+}
+# Water quality tables, only read by the water quality block that is built when
+# the model is solved (i.e. they can change unless water quality is discrete)
+water_quality_tables = [
+    "PadWaterQuality",
+    "ExternalWaterQuality",
+    "StorageInitialWaterQuality",
+]
+# Tables added to df_parameters by create_model
+_derived_tables = [
+    "LLA",
+    "LLT",
+    "AnnualizationRate",
+    "PipelineCapacityIncrements_Calculated",
+]
+# Cost used by default when no operational cost at all is given in a table
+# [USD/bbl, USD/hr for trucking], otherwise the default is 100 times the largest
+# given cost
+_operational_cost_fallbacks = {
+    "DisposalOperationalCost": (25, "currency_volume"),
+    "ReuseOperationalCost": (25, "currency_volume"),
+    "TruckingHourlyCost": (15000, "currency"),
+    "ExternalSourcingCost": (150, "currency_volume"),
+}
 
 
 def create_model(df_sets, df_parameters, default={}):
+    if CONFIG(default).profile_construction:
+        profiler = ConstructionProfiler()
+        with profiler.stage("create_model"):
+            model = _create_model(df_sets, df_parameters, default)
+        # Components added later (e.g. water quality, hydraulics) are recorded too
+        model.construction_profile = profiler
+        return model
+    return _create_model(df_sets, df_parameters, default)
+
+
+def _create_model(df_sets, df_parameters, default):
     model = ConcreteModel()
 
     # import config dictionary
     model.config = CONFIG(default)
     model.type = "strategic"
+    if model.config.network_presolve:
+        df_sets, df_parameters = _presolve_network(df_sets, df_parameters)
     model.df_sets = df_sets
     model.df_parameters = df_parameters
 
@@ -429,30 +609,6 @@ def create_model(df_sets, df_parameters, default={}):
         initialize=model.df_sets["TreatmentTechnologies"], doc="Treatment Technologies"
     )
 
-    piping_arc_types = [
-        "PCA",
-        "PNA",
-        "PPA",
-        "CNA",
-        "CCA",
-        "NNA",
-        "NCA",
-        "NKA",
-        "NSA",
-        "NRA",
-        "NOA",
-        "FCA",
-        "RNA",
-        "RCA",
-        "RKA",
-        "RSA",
-        "SNA",
-        "SCA",
-        "SKA",
-        "SRA",
-        "SOA",
-        "ROA",
-    ]
     # Define sets for the piecewise linear approximation
     model.s_lamset = Set(initialize=list(range(n_sections + 1)))
     model.s_lamset2 = Set(initialize=list(range(n_sections)))
@@ -467,25 +623,6 @@ def create_model(df_sets, df_parameters, default={}):
         initialize=list(model.df_parameters["LLA"].keys()), doc="Valid Piping Arcs"
     )
 
-    trucking_arc_types = [
-        "PCT",
-        "PKT",
-        "PST",
-        "PRT",
-        "POT",
-        "FCT",
-        "CKT",
-        "CST",
-        "CRT",
-        "CCT",
-        "SCT",
-        "SKT",
-        "SOT",
-        "RKT",
-        "RST",
-        "ROT",
-    ]
-
     # Build dictionary of all specified trucking arcs
     model.df_parameters["LLT"] = {}
     for arctype in trucking_arc_types:
@@ -495,6 +632,32 @@ def create_model(df_sets, df_parameters, default={}):
         initialize=list(model.df_parameters["LLT"].keys()), doc="Valid Trucking Arcs"
     )
 
+    # Build in/out adjacency indexes for the piping and trucking arcs once, so
+    # that balance rules only iterate over the actual neighbors of a location
+    # instead of scanning every location in s_L
+    piped_in, piped_out = _build_arc_adjacency(model.s_L, model.s_LLA)
+    trucked_in, trucked_out = _build_arc_adjacency(model.s_L, model.s_LLT)
+    model.s_LLA_In = Set(
+        model.s_L,
+        initialize=piped_in,
+        doc="Locations with a valid piping arc into location l",
+    )
+    model.s_LLA_Out = Set(
+        model.s_L,
+        initialize=piped_out,
+        doc="Locations with a valid piping arc out of location l",
+    )
+    model.s_LLT_In = Set(
+        model.s_L,
+        initialize=trucked_in,
+        doc="Locations with a valid trucking arc into location l",
+    )
+    model.s_LLT_Out = Set(
+        model.s_L,
+        initialize=trucked_out,
+        doc="Locations with a valid trucking arc out of location l",
+    )
+
     # Define continuous variables #
 
     model.v_Z = Var(
@@ -616,10 +779,14 @@ def create_model(df_sets, df_parameters, default={}):
         units=model.model_units["volume"],
         doc="Total volume of water beneficially reused [volume]",
     )
+    # The arc variables below are indexed by location pairs, but are not dense: only
+    # the entries used by the constraints (i.e. on the piping and trucking arcs) are
+    # constructed. Any other pair is created on access with its initial value.
     model.v_C_Piped = Var(
         model.s_L,
         model.s_L,
         model.s_T,
+        dense=False,
         initialize=0,
         within=NonNegativeReals,
         units=model.model_units["currency_time"],
@@ -629,6 +796,7 @@ def create_model(df_sets, df_parameters, default={}):
         model.s_L,
         model.s_L,
         model.s_T,
+        dense=False,
         initialize=0,
         within=NonNegativeReals,
         units=model.model_units["currency_time"],
@@ -805,6 +973,7 @@ def create_model(df_sets, df_parameters, default={}):
     model.v_F_Capacity = Var(
         model.s_L,
         model.s_L,
+        dense=False,
         within=NonNegativeReals,
         initialize=0,
         units=model.model_units["volume_time"],
@@ -886,6 +1055,7 @@ def create_model(df_sets, df_parameters, default={}):
     model.v_S_PipelineCapacity = Var(
         model.s_L,
         model.s_L,
+        dense=False,
         within=NonNegativeReals,
         initialize=0,
         units=model.model_units["volume_time"],
@@ -948,10 +1118,12 @@ def create_model(df_sets, df_parameters, default={}):
         initialize=0,
         doc="New or additional disposal capacity installed at disposal site with specific injection capacity",
     )
+    # Only constructed on the piping arcs (in both directions), see v_C_Piped
     model.vb_y_Flow = Var(
         model.s_L,
         model.s_L,
         model.s_T,
+        dense=False,
         within=Binary,
         initialize=0,
         doc="Directional flow between two locations",
@@ -1270,6 +1442,7 @@ def create_model(df_sets, df_parameters, default={}):
             for key, value in model.df_parameters["CompletionsDemand"].items()
         },
         units=model.model_units["volume_time"],
+        mutable=True,  # Mutable Param - can be changed in sensitivity analysis without rebuilding the entire model
         doc="Completions water demand [volume/time]",
     )
     model.p_gamma_TotalDemand = Param(
@@ -1294,6 +1467,7 @@ def create_model(df_sets, df_parameters, default={}):
             for key, value in model.df_parameters["PadRates"].items()
         },
         units=model.model_units["volume_time"],
+        mutable=True,  # Mutable Param - can be changed in sensitivity analysis without rebuilding the entire model
         doc="Produced water supply forecast [volume/time]",
     )
     model.p_beta_Flowback = Param(
@@ -1309,6 +1483,7 @@ def create_model(df_sets, df_parameters, default={}):
             for key, value in model.df_parameters["FlowbackRates"].items()
         },
         units=model.model_units["volume_time"],
+        mutable=True,  # Mutable Param - can be changed in sensitivity analysis without rebuilding the entire model
         doc="Flowback supply forecast for a completions pad [volume/time]",
     )
     model.p_beta_TotalProd = Param(
@@ -1351,6 +1526,7 @@ def create_model(df_sets, df_parameters, default={}):
             for key, value in model.df_parameters["InitialDisposalCapacity"].items()
         },
         units=model.model_units["volume_time"],
+        mutable=True,  # Mutable Param - can be changed in sensitivity analysis without rebuilding the entire model
         doc="Initial disposal capacity at disposal sites [volume/time]",
     )
     model.p_sigma_Storage = Param(
@@ -1365,6 +1541,7 @@ def create_model(df_sets, df_parameters, default={}):
             for key, value in model.df_parameters["InitialStorageCapacity"].items()
         },
         units=model.model_units["volume"],
+        mutable=True,  # Mutable Param - can be changed in sensitivity analysis without rebuilding the entire model
         doc="Initial storage capacity at storage site [volume]",
     )
     model.p_sigma_PadStorage = Param(
@@ -1379,6 +1556,7 @@ def create_model(df_sets, df_parameters, default={}):
             for key, value in model.df_parameters["CompletionsPadStorage"].items()
         },
         units=model.model_units["volume"],
+        mutable=True,  # Mutable Param - can be changed in sensitivity analysis without rebuilding the entire model
         doc="Storage capacity at completions site [volume]",
     )
     model.p_sigma_Treatment = Param(
@@ -1918,15 +2096,12 @@ def create_model(df_sets, df_parameters, default={}):
 
     model.p_pi_Disposal = Param(
         model.s_K,
-        default=max(DisposalOperationalCost_convert_to_model.values()) * 100
-        if DisposalOperationalCost_convert_to_model
-        else pyunits.convert_value(
-            25,
-            from_units=pyunits.USD / pyunits.oil_bbl,
-            to_units=model.model_units["currency_volume"],
+        default=_operational_cost_default(
+            model, "DisposalOperationalCost", DisposalOperationalCost_convert_to_model
         ),
         initialize=DisposalOperationalCost_convert_to_model,
         units=model.model_units["currency_volume"],
+        mutable=True,  # Mutable Param - can be changed in sensitivity analysis without rebuilding the entire model
         doc="Disposal operational cost [currency/volume]",
     )
     model.p_pi_Treatment = Param(
@@ -1954,15 +2129,12 @@ def create_model(df_sets, df_parameters, default={}):
     }
     model.p_pi_Reuse = Param(
         model.s_CP,
-        default=max(ReuseOperationalCost_convert_to_model.values()) * 100
-        if ReuseOperationalCost_convert_to_model
-        else pyunits.convert_value(
-            25,
-            from_units=pyunits.USD / pyunits.oil_bbl,
-            to_units=model.model_units["currency_volume"],
+        default=_operational_cost_default(
+            model, "ReuseOperationalCost", ReuseOperationalCost_convert_to_model
         ),
         initialize=ReuseOperationalCost_convert_to_model,
         units=model.model_units["currency_volume"],
+        mutable=True,  # Mutable Param - can be changed in sensitivity analysis without rebuilding the entire model
         doc="Reuse operational cost [currency/volume]",
     )
     model.p_pi_Storage = Param(
@@ -2017,6 +2189,7 @@ def create_model(df_sets, df_parameters, default={}):
             for key, value in model.df_parameters["BeneficialReuseCost"].items()
         },
         units=model.model_units["currency_volume"],
+        mutable=True,  # Mutable Param - can be changed in sensitivity analysis without rebuilding the entire model
         doc="Processing cost for sending water to beneficial reuse [currency/volume]",
     )
     model.p_rho_BeneficialReuse = Param(
@@ -2035,6 +2208,7 @@ def create_model(df_sets, df_parameters, default={}):
             for key, value in model.df_parameters["BeneficialReuseCredit"].items()
         },
         units=model.model_units["currency_volume"],
+        mutable=True,  # Mutable Param - can be changed in sensitivity analysis without rebuilding the entire model
         doc="Credit for sending water to beneficial reuse [currency/volume]",
     )
     _df_parameters = {}
@@ -2062,31 +2236,29 @@ def create_model(df_sets, df_parameters, default={}):
         min_elevation = min([val for val in model.df_parameters["Elevation"].values()])
         max_elevation_change = max_elevation - min_elevation
         # Set economic penalties for pipeline operational Cost based on the elevation changes
-        for k1 in model.s_L:
-            for k2 in model.s_L:
-                if (k1, k2) in model.s_LLA:
-                    elevation_delta = value(model.p_zeta_Elevation[k1]) - value(
-                        model.p_zeta_Elevation[k2]
-                    )
-                    _df_parameters[(k1, k2)] = max(
-                        0,
-                        (
-                            model.df_parameters["PipelineOperationalCost"][(k1, k2)]
-                            - (
-                                0.01
-                                * max(
-                                    [
-                                        val
-                                        for val in model.df_parameters[
-                                            "PipelineOperationalCost"
-                                        ].values()
-                                    ]
-                                )
-                                * elevation_delta
-                                / max_elevation_change
-                            )
-                        ),
+        for k1, k2 in model.s_LLA:
+            elevation_delta = value(model.p_zeta_Elevation[k1]) - value(
+                model.p_zeta_Elevation[k2]
+            )
+            _df_parameters[(k1, k2)] = max(
+                0,
+                (
+                    model.df_parameters["PipelineOperationalCost"][(k1, k2)]
+                    - (
+                        0.01
+                        * max(
+                            [
+                                val
+                                for val in model.df_parameters[
+                                    "PipelineOperationalCost"
+                                ].values()
+                            ]
+                        )
+                        * elevation_delta
+                        / max_elevation_change
                     )
+                ),
+            )
     else:
         _df_parameters = model.df_parameters["PipelineOperationalCost"]
 
@@ -2107,6 +2279,7 @@ def create_model(df_sets, df_parameters, default={}):
             for key, value in _df_parameters.items()
         },
         units=model.model_units["currency_volume"],
+        mutable=True,  # Mutable Param - can be changed in sensitivity analysis without rebuilding the entire model
         doc="Pipeline operational cost [currency/volume]",
     )
     TruckingHourlyCost_convert_to_model = {
@@ -2122,15 +2295,12 @@ def create_model(df_sets, df_parameters, default={}):
     # be confusing
     model.p_pi_Trucking = Param(
         model.s_L,
-        default=max(TruckingHourlyCost_convert_to_model.values()) * 100
-        if TruckingHourlyCost_convert_to_model
-        else pyunits.convert_value(
-            15000,
-            from_units=pyunits.USD,
-            to_units=model.model_units["currency"],
+        default=_operational_cost_default(
+            model, "TruckingHourlyCost", TruckingHourlyCost_convert_to_model
         ),
         initialize=TruckingHourlyCost_convert_to_model,
         units=model.model_units["currency"],
+        mutable=True,  # Mutable Param - can be changed in sensitivity analysis without rebuilding the entire model
         doc="Trucking hourly cost (by source) [currency/hr]",
     )
     ExternalSourcingCost_convert_to_model = {
@@ -2143,15 +2313,12 @@ def create_model(df_sets, df_parameters, default={}):
     }
     model.p_pi_Sourcing = Param(
         model.s_F,
-        default=max(ExternalSourcingCost_convert_to_model.values()) * 100
-        if ExternalSourcingCost_convert_to_model
-        else pyunits.convert_value(
-            150,
-            from_units=pyunits.USD / pyunits.oil_bbl,
-            to_units=model.model_units["currency_volume"],
+        default=_operational_cost_default(
+            model, "ExternalSourcingCost", ExternalSourcingCost_convert_to_model
         ),
         initialize=ExternalSourcingCost_convert_to_model,
         units=model.model_units["currency_volume"],
+        mutable=True,  # Mutable Param - can be changed in sensitivity analysis without rebuilding the entire model
         doc="Externally sourced water cost [currency/volume]",
     )
     model.p_M_Flow = Param(
@@ -2176,6 +2343,68 @@ def create_model(df_sets, df_parameters, default={}):
         doc="Big-M flow-concentration parameter [concentration * volume_time]",
     )
 
+    # Big-M flow values for each pipeline, treatment site and beneficial reuse option.
+    # With BigM.tight they are derived from the maximum capacity (initial capacity
+    # plus the largest expansion), in the style of bounding_functions.Bound_v_F_Piped
+    M_Flow = value(model.p_M_Flow)
+    tight_big_m = model.config.big_m == BigM.tight
+    max_pipeline_expansion = max(
+        [value(model.p_delta_Pipeline[d]) for d in model.s_D], default=0
+    )
+
+    def p_M_Flow_Piped_init(model, l, l_tilde):
+        if not tight_big_m or l in model.s_O or l in model.s_K or l_tilde in model.s_F:
+            # the flow of these arcs is not limited by a pipeline capacity
+            return M_Flow
+        M = value(model.p_sigma_Pipeline[l, l_tilde]) + max_pipeline_expansion
+        if (l_tilde, l) in model.s_LLA:
+            M += value(model.p_sigma_Pipeline[l_tilde, l]) + max_pipeline_expansion
+        return min(M, M_Flow)
+
+    model.p_M_Flow_Piped = Param(
+        model.s_LLA,
+        initialize=p_M_Flow_Piped_init,
+        units=model.model_units["volume_time"],
+        doc="Big-M flow parameter of each pipeline [volume/time]",
+    )
+
+    def p_M_Flow_Treatment_init(model, r):
+        if not tight_big_m:
+            return M_Flow
+        return min(
+            max(
+                [
+                    value(model.p_sigma_Treatment[r, wt])
+                    + max([value(model.p_delta_Treatment[wt, j]) for j in model.s_J])
+                    for wt in model.s_WT
+                ],
+                default=0,
+            ),
+            M_Flow,
+        )
+
+    model.p_M_Flow_Treatment = Param(
+        model.s_R,
+        initialize=p_M_Flow_Treatment_init,
+        units=model.model_units["volume_time"],
+        doc="Big-M flow parameter of each treatment site [volume/time]",
+    )
+
+    def p_M_Flow_BeneficialReuse_init(model, o):
+        # trucked flows are not limited by a capacity
+        if not tight_big_m or len(model.s_LLT_In[o]) > 0:
+            return M_Flow
+        return min(
+            sum(value(model.p_M_Flow_Piped[l, o]) for l in model.s_LLA_In[o]), M_Flow
+        )
+
+    model.p_M_Flow_BeneficialReuse = Param(
+        model.s_O,
+        initialize=p_M_Flow_BeneficialReuse_init,
+        units=model.model_units["volume_time"],
+        doc="Big-M flow parameter of each beneficial reuse option [volume/time]",
+    )
+
     model.p_psi_FracDemand = Param(
         default=pyunits.convert_value(
             99999,
@@ -2343,19 +2572,15 @@ def create_model(df_sets, df_parameters, default={}):
             constraint = model.p_gamma_Completions[p, t] >= (
                 sum(
                     model.v_F_Piped[l, p, t]
-                    for l in (model.s_L - model.s_F)
-                    if (l, p) in model.s_LLA
+                    for l in model.s_LLA_In[p]
+                    if l not in model.s_F
                 )
                 + sum(
                     model.v_F_Sourced[f, p, t]
-                    for f in model.s_F
-                    if (f, p) in model.s_LLA
-                )
-                + sum(
-                    model.v_F_Trucked[l, p, t]
-                    for l in model.s_L
-                    if (l, p) in model.s_LLT
+                    for f in model.s_LLA_In[p]
+                    if f in model.s_F
                 )
+                + sum(model.v_F_Trucked[l, p, t] for l in model.s_LLT_In[p])
                 + model.v_F_PadStorageOut[p, t]
                 - model.v_F_PadStorageIn[p, t]
                 + model.v_S_FracDemand[p, t]
@@ -2365,19 +2590,15 @@ def create_model(df_sets, df_parameters, default={}):
             constraint = model.p_gamma_Completions[p, t] == (
                 sum(
                     model.v_F_Piped[l, p, t]
-                    for l in (model.s_L - model.s_F)
-                    if (l, p) in model.s_LLA
+                    for l in model.s_LLA_In[p]
+                    if l not in model.s_F
                 )
                 + sum(
                     model.v_F_Sourced[f, p, t]
-                    for f in model.s_F
-                    if (f, p) in model.s_LLA
-                )
-                + sum(
-                    model.v_F_Trucked[l, p, t]
-                    for l in model.s_L
-                    if (l, p) in model.s_LLT
+                    for f in model.s_LLA_In[p]
+                    if f in model.s_F
                 )
+                + sum(model.v_F_Trucked[l, p, t] for l in model.s_LLT_In[p])
                 + model.v_F_PadStorageOut[p, t]
                 - model.v_F_PadStorageIn[p, t]
                 + model.v_S_FracDemand[p, t]
@@ -2457,7 +2678,7 @@ def create_model(df_sets, df_parameters, default={}):
     def CompletionsPadTruckOffloadingCapacityRule(model, p, t):
 
         constraint = (
-            sum(model.v_F_Trucked[l, p, t] for l in model.s_L if (l, p) in model.s_LLT)
+            sum(model.v_F_Trucked[l, p, t] for l in model.s_LLT_In[p])
             <= model.p_sigma_OffloadingPad[p]
         )
 
@@ -2472,7 +2693,7 @@ def create_model(df_sets, df_parameters, default={}):
 
     def StorageSiteTruckOffloadingCapacityRule(model, s, t):
         constraint = (
-            sum(model.v_F_Trucked[l, s, t] for l in model.s_L if (l, s) in model.s_LLT)
+            sum(model.v_F_Trucked[l, s, t] for l in model.s_LLT_In[s])
             <= model.p_sigma_OffloadingStorage[s]
         )
 
@@ -2487,10 +2708,8 @@ def create_model(df_sets, df_parameters, default={}):
 
     def StorageSiteProcessingCapacityRule(model, s, t):
         constraint = (
-            sum(model.v_F_Piped[l, s, t] for l in model.s_L if (l, s) in model.s_LLA)
-            + sum(
-                model.v_F_Trucked[l, s, t] for l in model.s_L if (l, s) in model.s_LLT
-            )
+            sum(model.v_F_Piped[l, s, t] for l in model.s_LLA_In[s])
+            + sum(model.v_F_Trucked[l, s, t] for l in model.s_LLT_In[s])
             <= model.p_sigma_ProcessingStorage[s]
         )
 
@@ -2506,10 +2725,8 @@ def create_model(df_sets, df_parameters, default={}):
     def ProductionPadSupplyBalanceRule(model, p, t):
         constraint = (
             model.p_beta_Production[p, t]
-            == sum(model.v_F_Piped[p, l, t] for l in model.s_L if (p, l) in model.s_LLA)
-            + sum(
-                model.v_F_Trucked[p, l, t] for l in model.s_L if (p, l) in model.s_LLT
-            )
+            == sum(model.v_F_Piped[p, l, t] for l in model.s_LLA_Out[p])
+            + sum(model.v_F_Trucked[p, l, t] for l in model.s_LLT_Out[p])
             + model.v_S_Production[p, t]
         )
         return process_constraint(constraint)
@@ -2524,10 +2741,8 @@ def create_model(df_sets, df_parameters, default={}):
     def CompletionsPadSupplyBalanceRule(model, p, t):
         constraint = (
             model.p_beta_Flowback[p, t]
-            == sum(model.v_F_Piped[p, l, t] for l in model.s_L if (p, l) in model.s_LLA)
-            + sum(
-                model.v_F_Trucked[p, l, t] for l in model.s_L if (p, l) in model.s_LLT
-            )
+            == sum(model.v_F_Piped[p, l, t] for l in model.s_LLA_Out[p])
+            + sum(model.v_F_Trucked[p, l, t] for l in model.s_LLT_Out[p])
             + model.v_S_Flowback[p, t]
         )
 
@@ -2541,9 +2756,9 @@ def create_model(df_sets, df_parameters, default={}):
     )
 
     def NetworkNodeBalanceRule(model, n, t):
-        constraint = sum(
-            model.v_F_Piped[l, n, t] for l in model.s_L if (l, n) in model.s_LLA
-        ) == sum(model.v_F_Piped[n, l, t] for l in model.s_L if (n, l) in model.s_LLA)
+        constraint = sum(model.v_F_Piped[l, n, t] for l in model.s_LLA_In[n]) == sum(
+            model.v_F_Piped[n, l, t] for l in model.s_LLA_Out[n]
+        )
 
         return process_constraint(constraint)
 
@@ -2552,35 +2767,33 @@ def create_model(df_sets, df_parameters, default={}):
     )
 
     def BidirectionalFlowRule1(model, l, l_tilde, t):
-        if (l, l_tilde) in model.s_LLA:
+        if l in model.s_F or l in model.s_O or l_tilde in model.s_F:
+            return Constraint.Skip
+        else:
             constraint = (
                 model.vb_y_Flow[l, l_tilde, t] + model.vb_y_Flow[l_tilde, l, t] == 1
             )
             return process_constraint(constraint)
-        else:
-            return Constraint.Skip
 
     model.BidirectionalFlow1 = Constraint(
-        (model.s_L - model.s_F - model.s_O),
-        (model.s_L - model.s_F),
+        model.s_LLA,
         model.s_T,
         rule=BidirectionalFlowRule1,
         doc="Bi-directional flow",
     )
 
     def BidirectionalFlowRule2(model, l, l_tilde, t):
-        if (l, l_tilde) in model.s_LLA:
+        if l in model.s_F or l in model.s_O or l_tilde in model.s_F:
+            return Constraint.Skip
+        else:
             constraint = (
                 model.v_F_Piped[l, l_tilde, t]
-                <= model.vb_y_Flow[l, l_tilde, t] * model.p_M_Flow
+                <= model.vb_y_Flow[l, l_tilde, t] * model.p_M_Flow_Piped[l, l_tilde]
             )
             return process_constraint(constraint)
-        else:
-            return Constraint.Skip
 
     model.BidirectionalFlow2 = Constraint(
-        (model.s_L - model.s_F - model.s_O),
-        (model.s_L - model.s_F),
+        model.s_LLA,
         model.s_T,
         rule=BidirectionalFlowRule2,
         doc="Bi-directional flow",
@@ -2589,44 +2802,20 @@ def create_model(df_sets, df_parameters, default={}):
     def StorageSiteBalanceRule(model, s, t):
         if t == model.s_T.first():
             constraint = model.v_L_Storage[s, t] == model.p_lambda_Storage[s] + (
-                sum(
-                    model.v_F_Piped[l, s, t] for l in model.s_L if (l, s) in model.s_LLA
-                )
-                + sum(
-                    model.v_F_Trucked[l, s, t]
-                    for l in model.s_L
-                    if (l, s) in model.s_LLT
-                )
-                - sum(
-                    model.v_F_Piped[s, l, t] for l in model.s_L if (s, l) in model.s_LLA
-                )
-                - sum(
-                    model.v_F_Trucked[s, l, t]
-                    for l in model.s_L
-                    if (s, l) in model.s_LLT
-                )
+                sum(model.v_F_Piped[l, s, t] for l in model.s_LLA_In[s])
+                + sum(model.v_F_Trucked[l, s, t] for l in model.s_LLT_In[s])
+                - sum(model.v_F_Piped[s, l, t] for l in model.s_LLA_Out[s])
+                - sum(model.v_F_Trucked[s, l, t] for l in model.s_LLT_Out[s])
                 - model.v_F_StorageEvaporationStream[s, t]
             )
         else:
             constraint = model.v_L_Storage[s, t] == model.v_L_Storage[
                 s, model.s_T.prev(t)
             ] + (
-                sum(
-                    model.v_F_Piped[l, s, t] for l in model.s_L if (l, s) in model.s_LLA
-                )
-                + sum(
-                    model.v_F_Trucked[l, s, t]
-                    for l in model.s_L
-                    if (l, s) in model.s_LLT
-                )
-                - sum(
-                    model.v_F_Piped[s, l, t] for l in model.s_L if (s, l) in model.s_LLA
-                )
-                - sum(
-                    model.v_F_Trucked[s, l, t]
-                    for l in model.s_L
-                    if (s, l) in model.s_LLT
-                )
+                sum(model.v_F_Piped[l, s, t] for l in model.s_LLA_In[s])
+                + sum(model.v_F_Trucked[l, s, t] for l in model.s_LLT_In[s])
+                - sum(model.v_F_Piped[s, l, t] for l in model.s_LLA_Out[s])
+                - sum(model.v_F_Trucked[s, l, t] for l in model.s_LLT_Out[s])
                 - model.v_F_StorageEvaporationStream[s, t]
             )
 
@@ -2655,59 +2844,53 @@ def create_model(df_sets, df_parameters, default={}):
     )
 
     def PipelineCapacityExpansionRule(model, l, l_tilde):
-        if (l, l_tilde) in model.s_LLA:
-            if (l_tilde, l) in model.s_LLA:
-                # i.e., if the pipeline is defined as birectional then the aggregated capacity is available in both directions
-                constraint = (
-                    model.v_F_Capacity[l, l_tilde]
-                    == model.p_sigma_Pipeline[l, l_tilde]
-                    + model.p_sigma_Pipeline[l_tilde, l]
-                    + sum(
-                        model.p_delta_Pipeline[d]
-                        * (
-                            model.vb_y_Pipeline[l, l_tilde, d]
-                            + model.vb_y_Pipeline[l_tilde, l, d]
-                        )
-                        for d in model.s_D
-                    )
-                    + model.v_S_PipelineCapacity[l, l_tilde]
-                )
-                return process_constraint(constraint)
-            else:
-                # i.e., if the pipeline is defined as unirectional then the capacity is only available in the defined direction
-                constraint = (
-                    model.v_F_Capacity[l, l_tilde]
-                    == model.p_sigma_Pipeline[l, l_tilde]
-                    + sum(
-                        model.p_delta_Pipeline[d] * model.vb_y_Pipeline[l, l_tilde, d]
-                        for d in model.s_D
+        if (l_tilde, l) in model.s_LLA:
+            # i.e., if the pipeline is defined as birectional then the aggregated capacity is available in both directions
+            constraint = (
+                model.v_F_Capacity[l, l_tilde]
+                == model.p_sigma_Pipeline[l, l_tilde]
+                + model.p_sigma_Pipeline[l_tilde, l]
+                + sum(
+                    model.p_delta_Pipeline[d]
+                    * (
+                        model.vb_y_Pipeline[l, l_tilde, d]
+                        + model.vb_y_Pipeline[l_tilde, l, d]
                     )
-                    + model.v_S_PipelineCapacity[l, l_tilde]
+                    for d in model.s_D
                 )
-                return process_constraint(constraint)
-
+                + model.v_S_PipelineCapacity[l, l_tilde]
+            )
+            return process_constraint(constraint)
         else:
-            return Constraint.Skip
+            # i.e., if the pipeline is defined as unirectional then the capacity is only available in the defined direction
+            constraint = (
+                model.v_F_Capacity[l, l_tilde]
+                == model.p_sigma_Pipeline[l, l_tilde]
+                + sum(
+                    model.p_delta_Pipeline[d] * model.vb_y_Pipeline[l, l_tilde, d]
+                    for d in model.s_D
+                )
+                + model.v_S_PipelineCapacity[l, l_tilde]
+            )
+            return process_constraint(constraint)
 
     model.PipelineCapacityExpansion = Constraint(
-        model.s_L,
-        model.s_L,
+        model.s_LLA,
         rule=PipelineCapacityExpansionRule,
         doc="Pipeline capacity construction/expansion",
     )
 
     def PipelineCapacityRule(model, l, l_tilde, t):
-        if (l, l_tilde) in model.s_LLA:
+        if l in model.s_O or l in model.s_K or l_tilde in model.s_F:
+            return Constraint.Skip
+        else:
             constraint = (
                 model.v_F_Piped[l, l_tilde, t] <= model.v_F_Capacity[l, l_tilde]
             )
             return process_constraint(constraint)
-        else:
-            return Constraint.Skip
 
     model.PipelineCapacity = Constraint(
-        (model.s_L - model.s_O - model.s_K),
-        (model.s_L - model.s_F),
+        model.s_LLA,
         model.s_T,
         rule=PipelineCapacityRule,
         doc="Pipeline capacity",
@@ -2719,11 +2902,7 @@ def create_model(df_sets, df_parameters, default={}):
         def NetworkNodeCapacityRule(model, n, t):
             if value(model.p_sigma_NetworkNode[n]) > 0:
                 constraint = (
-                    sum(
-                        model.v_F_Piped[l, n, t]
-                        for l in model.s_L
-                        if (l, n) in model.s_LLA
-                    )
+                    sum(model.v_F_Piped[l, n, t] for l in model.s_LLA_In[n])
                     <= model.p_sigma_NetworkNode[n]
                 )
             else:
@@ -2788,10 +2967,8 @@ def create_model(df_sets, df_parameters, default={}):
 
     def DisposalCapacityRule(model, k, t):
         constraint = (
-            sum(model.v_F_Piped[l, k, t] for l in model.s_L if (l, k) in model.s_LLA)
-            + sum(
-                model.v_F_Trucked[l, k, t] for l in model.s_L if (l, k) in model.s_LLT
-            )
+            sum(model.v_F_Piped[l, k, t] for l in model.s_LLA_In[k])
+            + sum(model.v_F_Trucked[l, k, t] for l in model.s_LLT_In[k])
             <= model.v_D_Capacity[k]
         )
         return process_constraint(constraint)
@@ -2821,10 +2998,8 @@ def create_model(df_sets, df_parameters, default={}):
 
     def TreatmentCapacityRule(model, r, t):
         constraint = (
-            sum(model.v_F_Piped[l, r, t] for l in model.s_L if (l, r) in model.s_LLA)
-            + sum(
-                model.v_F_Trucked[l, r, t] for l in model.s_L if (l, r) in model.s_LLT
-            )
+            sum(model.v_F_Piped[l, r, t] for l in model.s_LLA_In[r])
+            + sum(model.v_F_Trucked[l, r, t] for l in model.s_LLT_In[r])
             <= model.v_T_Capacity[r]
         )
         return process_constraint(constraint)
@@ -2835,10 +3010,8 @@ def create_model(df_sets, df_parameters, default={}):
 
     def TreatmentFeedBalanceRule(model, r, t):
         constraint = (
-            sum(model.v_F_Piped[l, r, t] for l in model.s_L if (l, r) in model.s_LLA)
-            + sum(
-                model.v_F_Trucked[l, r, t] for l in model.s_L if (l, r) in model.s_LLT
-            )
+            sum(model.v_F_Piped[l, r, t] for l in model.s_LLA_In[r])
+            + sum(model.v_F_Trucked[l, r, t] for l in model.s_LLT_In[r])
             == model.v_F_TreatmentFeed[r, t]
         )
         return process_constraint(constraint)
@@ -2867,7 +3040,7 @@ def create_model(df_sets, df_parameters, default={}):
     def ResidualWaterLHSRule(model, r, wt, t):
         constraint = (
             model.v_F_TreatmentFeed[r, t] * (1 - model.p_epsilon_Treatment[r, wt])
-            - model.p_M_Flow
+            - model.p_M_Flow_Treatment[r]
             * (1 - sum(model.vb_y_Treatment[r, wt, j] for j in model.s_J))
             <= model.v_F_ResidualWater[r, t]
         )
@@ -2884,7 +3057,7 @@ def create_model(df_sets, df_parameters, default={}):
     def ResidualWaterRHSRule(model, r, wt, t):
         constraint = (
             model.v_F_TreatmentFeed[r, t] * (1 - model.p_epsilon_Treatment[r, wt])
-            + model.p_M_Flow
+            + model.p_M_Flow_Treatment[r]
             * (1 - sum(model.vb_y_Treatment[r, wt, j] for j in model.s_J))
             >= model.v_F_ResidualWater[r, t]
         )
@@ -2913,14 +3086,12 @@ def create_model(df_sets, df_parameters, default={}):
         if r in treatment_sites_with_treated_stream_modeled:
             constraint = model.v_F_TreatedWater[r, t] == sum(
                 model.v_F_Piped[r, l, t]
-                for l in model.s_L
-                if (r, l) in model.s_LLA
-                and model.df_parameters["LLA"][r, l] == TreatmentStreams.treated_stream
+                for l in model.s_LLA_Out[r]
+                if model.df_parameters["LLA"][r, l] == TreatmentStreams.treated_stream
             ) + sum(
                 model.v_F_Trucked[r, l, t]
-                for l in model.s_L
-                if (r, l) in model.s_LLT
-                and model.df_parameters["LLT"][r, l] == TreatmentStreams.treated_stream
+                for l in model.s_LLT_Out[r]
+                if model.df_parameters["LLT"][r, l] == TreatmentStreams.treated_stream
             )
             return process_constraint(constraint)
         else:
@@ -2947,14 +3118,12 @@ def create_model(df_sets, df_parameters, default={}):
         if r in treatment_sites_with_residual_stream_modeled:
             constraint = model.v_F_ResidualWater[r, t] == sum(
                 model.v_F_Piped[r, l, t]
-                for l in model.s_L
-                if (r, l) in model.s_LLA
-                and model.df_parameters["LLA"][r, l] == TreatmentStreams.residual_stream
+                for l in model.s_LLA_Out[r]
+                if model.df_parameters["LLA"][r, l] == TreatmentStreams.residual_stream
             ) + sum(
                 model.v_F_Trucked[r, l, t]
-                for l in model.s_L
-                if (r, l) in model.s_LLT
-                and model.df_parameters["LLT"][r, l] == TreatmentStreams.residual_stream
+                for l in model.s_LLT_Out[r]
+                if model.df_parameters["LLT"][r, l] == TreatmentStreams.residual_stream
             )
             return process_constraint(constraint)
         else:
@@ -2990,7 +3159,7 @@ def create_model(df_sets, df_parameters, default={}):
             # Beneficial reuse capacity value has not been provided by user
             constraint = (
                 model.v_F_BeneficialReuseDestination[o, t]
-                <= model.p_M_Flow * model.vb_y_BeneficialReuse[o, t]
+                <= model.p_M_Flow_BeneficialReuse[o] * model.vb_y_BeneficialReuse[o, t]
                 + model.v_S_BeneficialReuseCapacity[o]
             )
         else:
@@ -3106,14 +3275,8 @@ def create_model(df_sets, df_parameters, default={}):
         constraint = (
             model.v_C_Disposal[k, t]
             == (
-                sum(
-                    model.v_F_Piped[l, k, t] for l in model.s_L if (l, k) in model.s_LLA
-                )
-                + sum(
-                    model.v_F_Trucked[l, k, t]
-                    for l in model.s_L
-                    if (l, k) in model.s_LLT
-                )
+                sum(model.v_F_Piped[l, k, t] for l in model.s_LLA_In[k])
+                + sum(model.v_F_Trucked[l, k, t] for l in model.s_LLT_In[k])
             )
             * model.p_pi_Disposal[k]
         )
@@ -3150,15 +3313,9 @@ def create_model(df_sets, df_parameters, default={}):
         constraint = (
             model.v_C_Treatment[r, t]
             >= (
-                sum(
-                    model.v_F_Piped[l, r, t] for l in model.s_L if (l, r) in model.s_LLA
-                )
-                + sum(
-                    model.v_F_Trucked[l, r, t]
-                    for l in model.s_L
-                    if (l, r) in model.s_LLT
-                )
-                - model.p_M_Flow
+                sum(model.v_F_Piped[l, r, t] for l in model.s_LLA_In[r])
+                + sum(model.v_F_Trucked[l, r, t] for l in model.s_LLT_In[r])
+                - model.p_M_Flow_Treatment[r]
                 * (1 - sum(model.vb_y_Treatment[r, wt, j] for j in model.s_J))
             )
             * model.p_pi_Treatment[r, wt]
@@ -3174,19 +3331,23 @@ def create_model(df_sets, df_parameters, default={}):
     )
 
     def TreatmentCostRHSRule(model, r, wt, t):
+        big_m = model.p_M_Flow_Treatment[r]
+        if tight_big_m and value(model.p_pi_Treatment[r, wt]) > 0:
+            # The cost of the selected technology must fit under the bound, so scale
+            # the flow bound by the largest cost ratio of the other technologies
+            cost_ratio = max(
+                value(model.p_pi_Treatment[r, w]) for w in model.s_WT
+            ) / value(model.p_pi_Treatment[r, wt])
+            big_m = (
+                min(value(big_m) * cost_ratio, M_Flow)
+                * model.model_units["volume_time"]
+            )
         constraint = (
             model.v_C_Treatment[r, t]
             <= (
-                sum(
-                    model.v_F_Piped[l, r, t] for l in model.s_L if (l, r) in model.s_LLA
-                )
-                + sum(
-                    model.v_F_Trucked[l, r, t]
-                    for l in model.s_L
-                    if (l, r) in model.s_LLT
-                )
-                + model.p_M_Flow
-                * (1 - sum(model.vb_y_Treatment[r, wt, j] for j in model.s_J))
+                sum(model.v_F_Piped[l, r, t] for l in model.s_LLA_In[r])
+                + sum(model.v_F_Trucked[l, r, t] for l in model.s_LLT_In[r])
+                + big_m * (1 - sum(model.vb_y_Treatment[r, wt, j] for j in model.s_J))
             )
             * model.p_pi_Treatment[r, wt]
         )
@@ -3220,13 +3381,13 @@ def create_model(df_sets, df_parameters, default={}):
             (
                 sum(
                     model.v_F_Piped[l, p, t]
-                    for l in (model.s_L - model.s_F)
-                    if (l, p) in model.s_LLA
+                    for l in model.s_LLA_In[p]
+                    if l not in model.s_F
                 )
                 + sum(
                     model.v_F_Trucked[l, p, t]
-                    for l in (model.s_L - model.s_F)
-                    if (l, p) in model.s_LLT
+                    for l in model.s_LLT_In[p]
+                    if l not in model.s_F
                 )
             )
             * model.p_pi_Reuse[p]
@@ -3258,13 +3419,13 @@ def create_model(df_sets, df_parameters, default={}):
                 sum(
                     sum(
                         model.v_F_Piped[l, p, t]
-                        for l in (model.s_L - model.s_F)
-                        if (l, p) in model.s_LLA
+                        for l in model.s_LLA_In[p]
+                        if l not in model.s_F
                     )
                     + sum(
                         model.v_F_Trucked[l, p, t]
-                        for l in (model.s_L - model.s_F)
-                        if (l, p) in model.s_LLT
+                        for l in model.s_LLT_In[p]
+                        if l not in model.s_F
                     )
                     for p in model.s_CP
                 )
@@ -3278,7 +3439,9 @@ def create_model(df_sets, df_parameters, default={}):
     )
 
     def PipingCostRule(model, l, l_tilde, t):
-        if (l, l_tilde) in model.s_LLA:
+        if l in model.s_O or l in model.s_K or l_tilde in model.s_F:
+            return Constraint.Skip
+        else:
             if l in model.s_F:
                 constraint = (
                     model.v_C_Piped[l, l_tilde, t]
@@ -3291,12 +3454,9 @@ def create_model(df_sets, df_parameters, default={}):
                     == model.v_F_Piped[l, l_tilde, t] * model.p_pi_Pipeline[l, l_tilde]
                 )
             return process_constraint(constraint)
-        else:
-            return Constraint.Skip
 
     model.PipingCost = Constraint(
-        (model.s_L - model.s_O - model.s_K),
-        (model.s_L - model.s_F),
+        model.s_LLA,
         model.s_T,
         rule=PipingCostRule,
         doc="Piping cost",
@@ -3308,10 +3468,11 @@ def create_model(df_sets, df_parameters, default={}):
                 sum(
                     sum(
                         model.v_C_Piped[l, l_tilde, t]
-                        for l in (model.s_L - model.s_O - model.s_K)
-                        if (l, l_tilde) in model.s_LLA
+                        for l in model.s_LLA_In[l_tilde]
+                        if l not in model.s_O and l not in model.s_K
                     )
-                    for l_tilde in (model.s_L - model.s_F)
+                    for l_tilde in model.s_L
+                    if l_tilde not in model.s_F
                 )
                 for t in model.s_T
             )
@@ -3325,14 +3486,8 @@ def create_model(df_sets, df_parameters, default={}):
     def StorageDepositCostRule(model, s, t):
         constraint = model.v_C_Storage[s, t] == (
             (
-                sum(
-                    model.v_F_Piped[l, s, t] for l in model.s_L if (l, s) in model.s_LLA
-                )
-                + sum(
-                    model.v_F_Trucked[l, s, t]
-                    for l in model.s_L
-                    if (l, s) in model.s_LLT
-                )
+                sum(model.v_F_Piped[l, s, t] for l in model.s_LLA_In[s])
+                + sum(model.v_F_Trucked[l, s, t] for l in model.s_LLT_In[s])
             )
             * model.p_pi_Storage[s]
         )
@@ -3356,14 +3511,8 @@ def create_model(df_sets, df_parameters, default={}):
     def StorageWithdrawalCreditRule(model, s, t):
         constraint = model.v_R_Storage[s, t] == (
             (
-                sum(
-                    model.v_F_Piped[s, l, t] for l in model.s_L if (s, l) in model.s_LLA
-                )
-                + sum(
-                    model.v_F_Trucked[s, l, t]
-                    for l in model.s_L
-                    if (s, l) in model.s_LLT
-                )
+                sum(model.v_F_Piped[s, l, t] for l in model.s_LLA_Out[s])
+                + sum(model.v_F_Trucked[s, l, t] for l in model.s_LLT_Out[s])
             )
             * model.p_rho_Storage[s]
         )
@@ -3390,14 +3539,8 @@ def create_model(df_sets, df_parameters, default={}):
     def BeneficialReuseCostRule(model, o, t):
         constraint = model.v_C_BeneficialReuse[o, t] == (
             (
-                sum(
-                    model.v_F_Piped[l, o, t] for l in model.s_L if (l, o) in model.s_LLA
-                )
-                + sum(
-                    model.v_F_Trucked[l, o, t]
-                    for l in model.s_L
-                    if (l, o) in model.s_LLT
-                )
+                sum(model.v_F_Piped[l, o, t] for l in model.s_LLA_In[o])
+                + sum(model.v_F_Trucked[l, o, t] for l in model.s_LLT_In[o])
             )
             * model.p_pi_BeneficialReuse[o]
         )
@@ -3424,14 +3567,8 @@ def create_model(df_sets, df_parameters, default={}):
     def BeneficialReuseCreditRule(model, o, t):
         constraint = model.v_R_BeneficialReuse[o, t] == (
             (
-                sum(
-                    model.v_F_Piped[l, o, t] for l in model.s_L if (l, o) in model.s_LLA
-                )
-                + sum(
-                    model.v_F_Trucked[l, o, t]
-                    for l in model.s_L
-                    if (l, o) in model.s_LLT
-                )
+                sum(model.v_F_Piped[l, o, t] for l in model.s_LLA_In[o])
+                + sum(model.v_F_Trucked[l, o, t] for l in model.s_LLT_In[o])
             )
             * model.p_rho_BeneficialReuse[o]
         )
@@ -3456,21 +3593,18 @@ def create_model(df_sets, df_parameters, default={}):
     )
 
     def TruckingCostRule(model, l, l_tilde, t):
-        if (l, l_tilde) in model.s_LLT:
-            constraint = (
-                model.v_C_Trucked[l, l_tilde, t]
-                == model.v_F_Trucked[l, l_tilde, t]
-                * 1
-                / model.p_delta_Truck
-                * model.p_tau_Trucking[l, l_tilde]
-                * model.p_pi_Trucking[l]
-            )
-            return process_constraint(constraint)
-        else:
-            return Constraint.Skip
+        constraint = (
+            model.v_C_Trucked[l, l_tilde, t]
+            == model.v_F_Trucked[l, l_tilde, t]
+            * 1
+            / model.p_delta_Truck
+            * model.p_tau_Trucking[l, l_tilde]
+            * model.p_pi_Trucking[l]
+        )
+        return process_constraint(constraint)
 
     model.TruckingCost = Constraint(
-        model.s_L, model.s_L, model.s_T, rule=TruckingCostRule, doc="Trucking cost"
+        model.s_LLT, model.s_T, rule=TruckingCostRule, doc="Trucking cost"
     )
 
     def TotalTruckingCostRule(model):
@@ -3479,8 +3613,7 @@ def create_model(df_sets, df_parameters, default={}):
                 sum(
                     sum(
                         model.v_C_Trucked[l, l_tilde, t]
-                        for l in model.s_L
-                        if (l, l_tilde) in model.s_LLT
+                        for l in model.s_LLT_In[l_tilde]
                     )
                     for l_tilde in model.s_L
                 )
@@ -3499,8 +3632,7 @@ def create_model(df_sets, df_parameters, default={}):
                 sum(
                     sum(
                         model.v_F_Trucked[l, l_tilde, t]
-                        for l in model.s_L
-                        if (l, l_tilde) in model.s_LLT
+                        for l in model.s_LLT_In[l_tilde]
                     )
                     for l_tilde in model.s_L
                 )
@@ -3639,8 +3771,7 @@ def create_model(df_sets, df_parameters, default={}):
                 sum(
                     model.v_S_PipelineCapacity[l, l_tilde]
                     * model.p_psi_PipelineCapacity
-                    for l in model.s_L
-                    if (l, l_tilde) in model.s_LLA
+                    for l in model.s_LLA_In[l_tilde]
                 )
                 for l_tilde in model.s_L
             )
@@ -3761,28 +3892,20 @@ def create_model(df_sets, df_parameters, default={}):
     )
 
     def LogicConstraintPipelineRule(model, l, l_tilde):
-        if (l, l_tilde) in model.s_LLA:
-            constraint = sum(model.vb_y_Pipeline[l, l_tilde, d] for d in model.s_D) == 1
-            return process_constraint(constraint)
-        else:
-            return Constraint.Skip
+        constraint = sum(model.vb_y_Pipeline[l, l_tilde, d] for d in model.s_D) == 1
+        return process_constraint(constraint)
 
     model.LogicConstraintPipeline = Constraint(
-        model.s_L,
-        model.s_L,
+        model.s_LLA,
         rule=LogicConstraintPipelineRule,
         doc="Logic constraint pipelines",
     )
 
     def ReuseDestinationDeliveriesRule(model, p, t):
         constraint = model.v_F_ReuseDestination[p, t] == sum(
-            model.v_F_Piped[l, p, t]
-            for l in (model.s_L - model.s_F)
-            if (l, p) in model.s_LLA
+            model.v_F_Piped[l, p, t] for l in model.s_LLA_In[p] if l not in model.s_F
         ) + sum(
-            model.v_F_Trucked[l, p, t]
-            for l in (model.s_L - model.s_F)
-            if (l, p) in model.s_LLT
+            model.v_F_Trucked[l, p, t] for l in model.s_LLT_In[p] if l not in model.s_F
         )
 
         return process_constraint(constraint)
@@ -3796,8 +3919,8 @@ def create_model(df_sets, df_parameters, default={}):
 
     def DisposalDestinationDeliveriesRule(model, k, t):
         constraint = model.v_F_DisposalDestination[k, t] == sum(
-            model.v_F_Piped[l, k, t] for l in model.s_L if (l, k) in model.s_LLA
-        ) + sum(model.v_F_Trucked[l, k, t] for l in model.s_L if (l, k) in model.s_LLT)
+            model.v_F_Piped[l, k, t] for l in model.s_LLA_In[k]
+        ) + sum(model.v_F_Trucked[l, k, t] for l in model.s_LLT_In[k])
 
         return process_constraint(constraint)
 
@@ -3810,8 +3933,8 @@ def create_model(df_sets, df_parameters, default={}):
 
     def BeneficialReuseDeliveriesRule(model, o, t):
         constraint = model.v_F_BeneficialReuseDestination[o, t] == sum(
-            model.v_F_Piped[l, o, t] for l in model.s_L if (l, o) in model.s_LLA
-        ) + sum(model.v_F_Trucked[l, o, t] for l in model.s_L if (l, o) in model.s_LLT)
+            model.v_F_Piped[l, o, t] for l in model.s_LLA_In[o]
+        ) + sum(model.v_F_Trucked[l, o, t] for l in model.s_LLT_In[o])
         return process_constraint(constraint)
 
     model.BeneficialReuseDeliveries = Constraint(
@@ -3825,14 +3948,14 @@ def create_model(df_sets, df_parameters, default={}):
         constraint = model.v_F_CompletionsDestination[p, t] == (
             sum(
                 model.v_F_Piped[l, p, t]
-                for l in (model.s_L - model.s_F)
-                if (l, p) in model.s_LLA
+                for l in model.s_LLA_In[p]
+                if l not in model.s_F
             )
             + sum(model.v_F_Sourced[f, p, t] for f in model.s_F if model.p_FCA[f, p])
             + sum(
                 model.v_F_Trucked[l, p, t]
-                for l in (model.s_L - model.s_F)
-                if (l, p) in model.s_LLT
+                for l in model.s_LLT_In[p]
+                if l not in model.s_F
             )
             + sum(model.v_F_Trucked[f, p, t] for f in model.s_F if model.p_FCT[f, p])
             - model.v_F_PadStorageIn[p, t]
@@ -3873,6 +3996,7 @@ def create_model(df_sets, df_parameters, default={}):
     return model
 
 
+@construction_stage
 def pipeline_hydraulics(model):
     """
     The hydraulics module asssists in computing pressures at each node
@@ -3990,17 +4114,57 @@ def pipeline_hydraulics(model):
         doc="Produced water quantity piped from location l to location l [volume/time] raised to 1.85",
     )
 
+    # The breakpoints are derived from the flow bounds of each arc. Arcs with a fixed
+    # or zero flow are not linearized, so they get no convex combination variables
+    max_expansion = max(value(model.p_delta_Pipeline[d]) for d in model.s_D)
+    flow_bounds = {}
+    known_flows = {}
+    for (l1, l2) in model.s_LLA:
+        for t in model.s_T:
+            flow = model.v_F_Piped[l1, l2, t]
+            if flow.fixed:
+                known_flows[l1, l2, t] = value(flow)
+                continue
+            upper = value(flow.ub)
+            if upper is None:
+                # Initial capacity plus the maximum expansion, in both directions for a
+                # bi-directional pipeline, as in bounding_functions.Bound_v_F_Piped
+                upper = value(model.p_sigma_Pipeline[l1, l2]) + max_expansion
+                if (l2, l1) in model.s_LLA:
+                    upper += value(model.p_sigma_Pipeline[l2, l1]) + max_expansion
+            lower = value(flow.lb) or 0
+            if upper > lower:
+                flow_bounds[l1, l2, t] = (lower, upper)
+            else:
+                known_flows[l1, l2, t] = upper
+
+    mh.s_PiecewiseArcs = Set(
+        dimen=3,
+        initialize=list(flow_bounds),
+        doc="Pipeline arcs and time periods with a piecewise linearized flow term",
+    )
+    mh.p_flow_breakpoints = Param(
+        mh.s_PiecewiseArcs,
+        model.s_lamset,
+        mutable=True,
+        initialize={
+            (*key, k): breakpoint
+            for key, bounds in flow_bounds.items()
+            for k, breakpoint in enumerate(
+                _piecewise_breakpoints(*bounds, len(model.s_zset))
+            )
+        },
+        doc="Flow breakpoints of the piecewise linear approximation [volume/time]",
+    )
     mh.v_lambdas = Var(
-        model.s_LLA,
-        model.s_T,
+        mh.s_PiecewiseArcs,
         model.s_lamset,
         within=NonNegativeReals,
         initialize=0,
         doc="Convex combination multipliers",
     )
     mh.vb_z = Var(
-        model.s_LLA,
-        model.s_T,
+        mh.s_PiecewiseArcs,
         model.s_zset,
         within=Binary,
         initialize=0,
@@ -4123,36 +4287,63 @@ def pipeline_hydraulics(model):
             units=pyunits.meter,
             doc="Hazen-Williams Frictional loss, m",
         )
-        for key in model.s_LLA:
-            mh.p_effective_Pipeline_diameter[key] = mh.p_Initial_Pipeline_Diameter[
-                key
-            ] + value(
-                sum(
-                    model.vb_y_Pipeline[key, d]
-                    * model.df_parameters["PipelineDiameterValues"][d]
-                    for d in model.s_D
-                )
+        # Collect the pipeline data of all arcs and periods in arrays, so the
+        # Hazen-Williams head can be computed in one vectorized pass
+        arcs = list(model.s_LLA)
+        periods = list(model.s_T)
+        diameter_values = np.array(
+            [model.df_parameters["PipelineDiameterValues"][d] for d in model.s_D],
+            dtype=float,
+        )
+        installed_diameters = np.array(
+            [[value(model.vb_y_Pipeline[key, d]) for d in model.s_D] for key in arcs],
+            dtype=float,
+        ).reshape(len(arcs), len(diameter_values))
+        effective_diameter = (
+            np.array(
+                [value(mh.p_Initial_Pipeline_Diameter[key]) for key in arcs],
+                dtype=float,
             )
+            + installed_diameters @ diameter_values
+        )
+        mh.p_effective_Pipeline_diameter.store_values(
+            dict(zip(arcs, effective_diameter))
+        )
+        length = np.array(
+            [value(model.p_lambda_Pipeline[key]) for key in arcs], dtype=float
+        )
+        flow = np.array(
+            [[value(model.v_F_Piped[key, t0]) for t0 in periods] for key in arcs],
+            dtype=float,
+        ).reshape(len(arcs), len(periods))
 
         # Compute Hazen-Williams head
-        for t0 in model.s_T:
-            for key in model.s_LLA:
-                if value(model.v_F_Piped[key, t0]) > 0.01:
-                    if value(mh.p_effective_Pipeline_diameter[key]) > 0.1:
-                        mh.p_HW_loss[key, t0] = _hazen_williams_head(
-                            mh.p_iota_HW_material_factor_pipeline,
-                            pyunits.convert(
-                                model.p_lambda_Pipeline[key], to_units=pyunits.meter
-                            ),
-                            pyunits.convert(
-                                mh.p_effective_Pipeline_diameter[key],
-                                to_units=pyunits.meter,
-                            ),
-                            pyunits.convert(
-                                model.v_F_Piped[key, t0],
-                                to_units=pyunits.m**3 / pyunits.s,
-                            ),
-                        )
+        hw_arcs, hw_periods = np.nonzero(
+            (flow > 0.01) & (effective_diameter[:, np.newaxis] > 0.1)
+        )
+        hw_loss = _hazen_williams_head(
+            value(mh.p_iota_HW_material_factor_pipeline),
+            length[hw_arcs]
+            * pyunits.convert_value(
+                1, from_units=model.model_units["distance"], to_units=pyunits.meter
+            ),
+            effective_diameter[hw_arcs]
+            * pyunits.convert_value(
+                1, from_units=model.model_units["diameter"], to_units=pyunits.meter
+            ),
+            flow[hw_arcs, hw_periods]
+            * pyunits.convert_value(
+                1,
+                from_units=model.model_units["volume_time"],
+                to_units=pyunits.m**3 / pyunits.s,
+            ),
+        )
+        mh.p_HW_loss.store_values(
+            {
+                (*arcs[a], periods[t0]): loss
+                for a, t0, loss in zip(hw_arcs, hw_periods, hw_loss)
+            }
+        )
 
         def NodePressureRule(b, l1, l2, t1):
             if value(model.v_F_Piped[l1, l2, t1]) > 0.01:
@@ -4379,23 +4570,33 @@ def pipeline_hydraulics(model):
         def FlowEquationConvRule(b, l1, l2, t1):
             constraint = (
                 model.v_F_Piped[l1, l2, t1] * cons_scaling_factor
-                == sum(mh.v_lambdas[l1, l2, t1, k] * Del_I * k for k in model.s_lamset)
+                == sum(
+                    mh.v_lambdas[l1, l2, t1, k] * mh.p_flow_breakpoints[l1, l2, t1, k]
+                    for k in model.s_lamset
+                )
                 * cons_scaling_factor
             )
             return process_constraint(constraint)
 
         mh.FlowEquationConv = Constraint(
-            model.s_LLA,
-            model.s_T,
+            mh.s_PiecewiseArcs,
             rule=FlowEquationConvRule,
             doc="Flow at an arc at a time",
         )
 
         def termEquationConvRule(b, l1, l2, t1):
-            constraint = mh.v_term[l1, l2, t1] == sum(
-                mh.v_lambdas[l1, l2, t1, k] * (k * Del_I * 1.84 * 10 ** (-6)) ** 1.85
-                for k in model.s_lamset
-            )
+            if (l1, l2, t1) not in mh.s_PiecewiseArcs:
+                # the flow is fixed or zero, so the flow term is known
+                constraint = (
+                    mh.v_term[l1, l2, t1]
+                    == (known_flows[l1, l2, t1] * 1.84 * 10 ** (-6)) ** 1.85
+                )
+            else:
+                constraint = mh.v_term[l1, l2, t1] == sum(
+                    mh.v_lambdas[l1, l2, t1, k]
+                    * (mh.p_flow_breakpoints[l1, l2, t1, k] * 1.84 * 10 ** (-6)) ** 1.85
+                    for k in model.s_lamset
+                )
             return process_constraint(constraint)
 
         mh.termEquationConv = Constraint(
@@ -4419,8 +4620,7 @@ def pipeline_hydraulics(model):
 
         mh.EnforceZero = Constraint(
             model.s_lamset,
-            model.s_LLA,
-            model.s_T,
+            mh.s_PiecewiseArcs,
             rule=EnforceZeroRule,
             doc="Put appropriate lambda to zero",
         )
@@ -4434,8 +4634,7 @@ def pipeline_hydraulics(model):
             return process_constraint(constraint)
 
         mh.SumOne = Constraint(
-            model.s_LLA,
-            model.s_T,
+            mh.s_PiecewiseArcs,
             rule=SumOneRule,
             doc="Lambdas add up to 1",
         )
@@ -4448,8 +4647,7 @@ def pipeline_hydraulics(model):
             return process_constraint(constraint)
 
         mh.SumOne2 = Constraint(
-            model.s_LLA,
-            model.s_T,
+            mh.s_PiecewiseArcs,
             rule=SumOne2Rule,
             doc="Lambdas add up to 1",
         )
@@ -4525,8 +4723,16 @@ def pipeline_hydraulics(model):
         )
 
         def VariablePumpCostRule(b, l1, l2, t, i):
-            binary_string = bin(i)[2:].zfill(len(model.s_zset))
-            binary_list = [int(bit) for bit in binary_string]
+            if (l1, l2, t) in mh.s_PiecewiseArcs:
+                # flow at the lower breakpoint of the selected section
+                flow = mh.p_flow_breakpoints[l1, l2, t, i]
+                big_m = 20000 * (1 - mh.vb_z[l1, l2, t, i])
+            elif i == 0 and known_flows[l1, l2, t] > 0:
+                # the flow is fixed, so only one constraint is needed
+                flow = known_flows[l1, l2, t]
+                big_m = 0
+            else:
+                return Constraint.Skip
             constraint = (
                 b.v_variable_pump_cost[l1, l2, t] * cons_scaling_factor
                 >= (
@@ -4535,13 +4741,12 @@ def pipeline_hydraulics(model):
                         * mh.p_rhog
                         * 1e3  # convert the kUSD/kWh to kUSD/Ws
                         * b.v_PumpHead[l1, l2, t]
-                        * Del_I
-                        * i
+                        * flow
                         * 1.84
                         * 10 ** (-6)
                         * 3600
                     )
-                    - 20000 * (1 - mh.vb_z[l1, l2, t, i])
+                    - big_m
                 )
                 * cons_scaling_factor
             )
@@ -4603,25 +4808,53 @@ def _hazen_williams_head(mat_factor, length, diameter, flow):
     return hw_friction_head
 
 
+def _piecewise_breakpoints(lower, upper, sections, incumbent=None, width=None):
+    """
+    Return the sections + 1 breakpoints of a piecewise linear approximation over
+    [lower, upper]. The breakpoints are evenly spaced, unless an incumbent value is
+    given: then the inner breakpoints are evenly spaced over an interval of the
+    given width around the incumbent, so the approximation is refined where the
+    solution lies while still covering the full range.
+    """
+    if incumbent is None or sections < 2:
+        return list(np.linspace(lower, upper, sections + 1))
+    low = min(max(lower, incumbent - width / 2), upper)
+    high = max(min(upper, incumbent + width / 2), lower)
+    return [lower, *np.linspace(low, high, sections - 1), upper]
+
+
+def refine_hydraulics_breakpoints(model, shrink=0.5):
+    """
+    Move the inner breakpoints of the piecewise linearized Hazen-Williams flow term
+    around the current flow of each arc, over an interval shrink times as wide as
+    the current one. The model can then be solved again for a tighter approximation
+    around the incumbent solution.
+    """
+    mh = model.hydraulics
+    sections = len(model.s_zset)
+    for key in mh.s_PiecewiseArcs:
+        breakpoints = [value(mh.p_flow_breakpoints[(*key, k)]) for k in model.s_lamset]
+        width = breakpoints[-2] - breakpoints[1]
+        if width <= 0:
+            width = breakpoints[-1] - breakpoints[0]
+        for k, breakpoint in enumerate(
+            _piecewise_breakpoints(
+                breakpoints[0],
+                breakpoints[-1],
+                sections,
+                incumbent=value(model.v_F_Piped[key]),
+                width=shrink * width,
+            )
+        ):
+            mh.p_flow_breakpoints[(*key, k)] = breakpoint
+    return model
+
+
+@construction_stage
 def water_quality(model):
     # region Fix solved Strategic Model variables
-    for var in model.component_objects(Var):
-        for index in var:
-            # Check if the variable is indexed
-            if index is None:
-                # Check if the value can reasonably be assumed to be non-zero
-                if abs(var.value) > 0.0000001:
-                    var.fix()
-                # Otherwise, fix to 0
-                else:
-                    var.fix(0)
-            elif index is not None:
-                # Check if the value can reasonably be assumed to be non-zero
-                if var[index].value and abs(var[index].value) > 0.0000001:
-                    var[index].fix()
-                # Otherwise, fix to 0
-                else:
-                    var[index].fix(0)
+    # Values that can not reasonably be assumed to be non-zero are fixed to 0
+    fix_all_except(model, zero_tol=0.0000001)
     # endregion
 
     # Create block for calculating quality at each location in the model
@@ -5395,6 +5628,7 @@ def get_max_value_for_parameter(parameter):
     return max([x.value for x in parameter.values()])
 
 
+@construction_stage
 def water_quality_discrete(model, df_parameters, df_sets):
     # Add sets, parameters and constraints
 
@@ -6945,6 +7179,120 @@ def scale_model(model, scaling_factor=None):
     return scaled_model
 
 
+def _build_arc_adjacency(locations, arcs):
+    """
+    Build dictionaries mapping every location to the locations connected to it
+    by an incoming and by an outgoing arc. Neighbors are listed in the order
+    of `locations` so that rule expressions are assembled deterministically.
+    """
+    position = {l: i for i, l in enumerate(locations)}
+    arcs_in = {l: [] for l in locations}
+    arcs_out = {l: [] for l in locations}
+    for l, l_tilde in arcs:
+        if l in position and l_tilde in position:
+            arcs_out[l].append(l_tilde)
+            arcs_in[l_tilde].append(l)
+    for adjacency in (arcs_in, arcs_out):
+        for neighbors in adjacency.values():
+            neighbors.sort(key=position.get)
+    return arcs_in, arcs_out
+
+
+def _presolve_network(df_sets, df_parameters):
+    """
+    Prune the parts of the network that can never carry water, before the model
+    is built:
+        > disposal sites without initial capacity whose capacity increments are all 0
+        > network nodes that no water can reach, or that cannot pass water on to
+          any other site (nodes only balance their inflow and outflow)
+    The arcs and parameter entries of the removed locations are dropped as well.
+    Time periods are kept, since storage links all of them.
+
+    Returns pruned copies of df_sets and df_parameters, the inputs are not modified.
+    """
+    removed = set()
+    # Disposal sites without any capacity
+    for k in df_sets["SWDSites"]:
+        increments = [
+            df_parameters["DisposalCapacityIncrements"].get((k, i))
+            for i in df_sets["InjectionCapacities"]
+        ]
+        if not df_parameters["InitialDisposalCapacity"].get(k) and all(
+            increment == 0 for increment in increments
+        ):
+            removed.add(k)
+
+    arcs = [
+        arc
+        for arctype in piping_arc_types + trucking_arc_types
+        if arctype in df_parameters
+        for arc in df_parameters[arctype]
+    ]
+    nodes = set(df_sets["NetworkNodes"])
+    sites = {
+        l
+        for set_name in (
+            "ProductionPads",
+            "CompletionsPads",
+            "ExternalWaterSources",
+            "SWDSites",
+            "StorageSites",
+            "TreatmentSites",
+            "ReuseOptions",
+        )
+        for l in df_sets[set_name]
+    } - removed
+
+    # Network nodes must be reachable from a site, and must reach a site
+    live_arcs = [
+        (l, l_tilde)
+        for l, l_tilde in arcs
+        if l not in removed and l_tilde not in removed
+    ]
+    for direction in (0, 1):
+        neighbors = {}
+        for arc in live_arcs:
+            neighbors.setdefault(arc[direction], []).append(arc[1 - direction])
+        reached = set(sites)
+        queue = deque(sites)
+        while queue:
+            for l in neighbors.get(queue.popleft(), []):
+                if l not in reached:
+                    reached.add(l)
+                    queue.append(l)
+        removed |= nodes - reached
+
+    if not removed:
+        _log.info("Network presolve did not remove any location")
+        return df_sets, df_parameters
+
+    def is_removed(key):
+        if type(key) is tuple:
+            return any(i in removed for i in key)
+        return key in removed
+
+    df_sets = {
+        name: values[~values.isin(removed)] if hasattr(values, "isin") else values
+        for name, values in df_sets.items()
+    }
+    pruned_parameters = {}
+    n_removed_arcs = 0
+    for name, values in df_parameters.items():
+        if isinstance(values, dict):
+            kept = {key: v for key, v in values.items() if not is_removed(key)}
+            if name in piping_arc_types or name in trucking_arc_types:
+                n_removed_arcs += len(values) - len(kept)
+            values = kept
+        pruned_parameters[name] = values
+    _log.info(
+        "Network presolve removed %d locations (%s) and %d arcs",
+        len(removed),
+        ", ".join(sorted(removed)),
+        n_removed_arcs,
+    )
+    return df_sets, pruned_parameters
+
+
 def _preprocess_data(model):
     """
     This module pre-processess data to fit the optimization format.
@@ -7013,6 +7361,136 @@ def _preprocess_data(model):
         )
 
 
+def _operational_cost_default(model, table, costs):
+    """
+    Default of the operational cost Params initialized from table, for the
+    entries missing from the input data: 100 times the largest given cost
+    (costs are converted to model units), or a fixed cost if none is given
+    """
+    if costs:
+        return max(costs.values()) * 100
+    fallback, units = _operational_cost_fallbacks[table]
+    if units == "currency":
+        from_units = pyunits.USD
+    else:
+        from_units = pyunits.USD / pyunits.oil_bbl
+    return pyunits.convert_value(
+        fallback, from_units=from_units, to_units=model.model_units[units]
+    )
+
+
+def _same_data(a, b):
+    """
+    Compares two entries of df_parameters or df_sets (dictionaries, pandas
+    objects or values), treating NaN values as equal
+    """
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_same_data(a[k], b[k]) for k in a)
+    if hasattr(a, "equals"):
+        return type(a) is type(b) and a.equals(b)
+    if isinstance(a, float) and isinstance(b, float) and np.isnan(a) and np.isnan(b):
+        return True
+    return type(a) is type(b) and a == b
+
+
+def _set_param_values(param, values, default=None):
+    """
+    Sets the values of a mutable Param. The entries missing from values are
+    reset to the Param default, which is changed first if a default is given.
+    """
+    if default is not None:
+        param.set_default(default)
+    default = param.default()
+    for index in list(param.sparse_keys()):
+        if index not in values:
+            param[index] = default
+    for index, val in values.items():
+        param[index] = val
+
+
+def update_model_parameters(model, df_parameters):
+    """
+    Updates a strategic model built with create_model for new parameter data,
+    without rebuilding it. Only the tables in updatable_parameters (demands,
+    supply forecasts, initial capacities, operational costs and trucking times)
+    and, unless water quality is discrete, the water quality tables can differ
+    from the data the model was built with. The mutable Params they initialize,
+    and the Params computed from them, are set to the new values.
+
+    Any other difference changes the structure of the model (e.g. the network,
+    the time periods or the capacity increments), and an Exception is raised:
+    such data needs a new model built with create_model.
+
+    The model is updated in place and its variables are not reset, see
+    ModelTemplate to reuse a model for several scenarios.
+    """
+    updatable = set(updatable_parameters)
+    if model.config.water_quality is not WaterQuality.discrete:
+        updatable.update(water_quality_tables)
+    if model.config.hydraulics == Hydraulics.post_process:
+        # The pipeline operational costs are adjusted for the elevation changes
+        updatable.discard("PipelineOperationalCost")
+
+    changed = [
+        name
+        for name in (set(df_parameters) | set(model.df_parameters))
+        - updatable
+        - set(_derived_tables)
+        if not _same_data(df_parameters.get(name), model.df_parameters.get(name))
+    ]
+    if changed:
+        raise Exception(
+            "The following parameters change the structure of the model, build a new model with create_model instead: "
+            + ", ".join(sorted(changed))
+        )
+
+    new_parameters = dict(df_parameters)
+    for name in _derived_tables:
+        if name in model.df_parameters:
+            new_parameters[name] = model.df_parameters[name]
+    model.df_parameters = new_parameters
+
+    for table, (param_name, units) in updatable_parameters.items():
+        if table not in updatable:
+            continue
+        values = df_parameters.get(table, {})
+        if units is not None:
+            values = {
+                key: pyunits.convert_value(
+                    val,
+                    from_units=model.user_units[units],
+                    to_units=model.model_units[units],
+                )
+                for key, val in values.items()
+            }
+        default = None
+        if table in _operational_cost_fallbacks:
+            default = _operational_cost_default(model, table, values)
+        _set_param_values(getattr(model, param_name), values, default)
+
+    # Params computed from the updated ones
+    model.p_gamma_TotalDemand.set_value(
+        sum(
+            value(model.p_gamma_Completions[p, t]) for p in model.s_P for t in model.s_T
+        )
+    )
+    model.p_beta_TotalProd.set_value(
+        sum(
+            value(model.p_beta_Production[p, t]) + value(model.p_beta_Flowback[p, t])
+            for p in model.s_P
+            for t in model.s_T
+        )
+    )
+    _set_param_values(
+        model.p_chi_DisposalExpansionAllowed,
+        {
+            key: 0 if val and val > 0 else 1
+            for key, val in df_parameters["InitialDisposalCapacity"].items()
+        },
+    )
+    return model
+
+
 def infrastructure_timing(model):
     # Store the start build time to a dictionary
     model.infrastructure_buildStart = {}
@@ -7043,13 +7521,11 @@ def infrastructure_timing(model):
                 if (
                     sum(
                         model.v_F_Piped[l, treatment_site, t].value
-                        for l in model.s_L
-                        if (l, treatment_site) in model.s_LLA
+                        for l in model.s_LLA_In[treatment_site]
                     )
                     + sum(
                         model.v_F_Trucked[l, treatment_site, t].value
-                        for l in model.s_L
-                        if (l, treatment_site) in model.s_LLT
+                        for l in model.s_LLT_In[treatment_site]
                     )
                     > model.p_sigma_Treatment[treatment_site, i[1]].value
                 ):
@@ -7208,14 +7684,12 @@ def solve_discrete_water_quality(model, opt, scaled):
     # Step 2a -- free or remove bounds for all non quality variables
     # Step 2b -- call solver to solve whole model using previous solve as initial solution
     # Step 3 - Return solution
+    # The three solves only differ in variable bounds and fixings. If a persistent
+    # interface is available for the solver, the model is sent to the solver once
+    # and only the modified variables are updated between solves.
 
     # Step 1 - generate a feasible initial solution
     v_DQ = model.scaled_v_DQ if scaled else model.v_DQ
-    # Step 1a - fix discrete water quality variables
-    v_DQ.fix()
-    # Step 1b - solve model, obtain optimal flows without considering quality
-    opt.solve(model, tee=True)
-    # Step 1c - fix or bound all non quality variables
     prefix = "scaled_" if scaled else ""
     discrete_variables_names = {
         prefix + "v_F_DiscretePiped",
@@ -7235,102 +7709,164 @@ def solve_discrete_water_quality(model, opt, scaled):
         prefix + "v_Q_CompletionPad",
         prefix + "v_ObjectiveWithQuality",
     }
-    for var in model.component_objects(Var):
-        if var.name in discrete_variables_names:
-            continue
-        for index in var:
-            index_var = var if index is None else var[index]
-            value = index_var.value
-            # Fix binary variables to their value and bound the continuous variables
-            if index_var.domain is Binary:
-                index_var.fix(round(value))
-            else:
-                index_var.setlb(0.99 * value)
-                index_var.setub(1.01 * value)
+    # Record bounds and fixed status of all non quality variables, so they can be
+    # restored in Step 2a
+    variable_state = snapshot_variable_state(model, exclude=discrete_variables_names)
+    # Step 1a - fix discrete water quality variables
+    v_DQ.fix()
+    # Step 1b - solve model, obtain optimal flows without considering quality
+    persistent_opt = _get_persistent_solver(opt)
+    if persistent_opt is not None:
+        opt = persistent_opt
+        opt.set_instance(model)
+        opt.solve(tee=True)
+    else:
+        opt.solve(model, tee=True)
+    # Step 1c - fix binary variables to their value and bound the continuous variables
+    bound_around_solution(model, exclude=discrete_variables_names)
     # Step 1d - free discrete water quality variables
     v_DQ.free()
+    if persistent_opt is not None:
+        _update_persistent_vars(opt, model, discrete_variables_names)
 
     # Step 1e - solve model again for a feasible initial solution for discrete water quality
     print("\n")
     print("*" * 50)
     print(" " * 15, "Solving non-discrete water quality model")
     print("*" * 50)
-    opt.solve(model, tee=True, warmstart=True)
+    if persistent_opt is not None:
+        opt.solve(tee=True, warmstart=True)
+    else:
+        opt.solve(model, tee=True, warmstart=True)
 
     # Step 2 - solve full discrete water quality
-    # Step 2a - free or remove bounds for all non quality variables
-    for var in model.component_objects(Var):
-        if var.name in discrete_variables_names:
-            continue
-        for index in var:
-            index_var = var if index is None else var[index]
-            value = index_var.value
-            # unfix binary variables and unbound the continuous variables
-
-            if index_var.domain is Binary:
-                index_var.free()
-            else:
-                index_var.setlb(0)
-                index_var.setub(None)
+    # Step 2a - restore the original bounds and fixed status of all non quality
+    # variables, keeping their values as initial solution
+    restore_variable_state(variable_state)
+    if persistent_opt is not None:
+        _update_persistent_vars(opt, model, discrete_variables_names)
 
     # Step 2b - call solver to solve whole model using previous solve as initial solution
     print("\n")
     print("*" * 50)
     print(" " * 15, "Solving discrete water quality model")
     print("*" * 50)
-    results = opt.solve(model, tee=True, warmstart=True)
+    if persistent_opt is not None:
+        results = opt.solve(tee=True, warmstart=True)
+    else:
+        results = opt.solve(model, tee=True, warmstart=True)
 
     # Step 3 - Return solution
     return results
 
 
+def _get_persistent_solver(opt):
+    """
+    Return the persistent interface matching the solver opt, with the same options,
+    or None if no persistent interface is available for it
+    """
+    persistent_solvers = {
+        "gurobi": "gurobi_persistent",
+        "gurobi_direct": "gurobi_persistent",
+    }
+    if opt.type not in persistent_solvers:
+        return None
+    persistent_opt = SolverFactory(persistent_solvers[opt.type])
+    if not persistent_opt.available(exception_flag=False):
+        return None
+    persistent_opt.options.update(opt.options)
+    return persistent_opt
+
+
+def _update_persistent_vars(opt, model, exclude):
+    """
+    Push the bounds, fixed status and domain of all variables of the model, except
+    the components named in exclude, to the persistent solver opt
+    """
+    for var in model.component_objects(Var, active=True):
+        if var.name in exclude:
+            continue
+        for v in var.values():
+            opt.update_var(v)
+
+
 def calc_new_pres(model_h, ps, l1, l2, t):
+    """
+    Return the pressure at l2 at time t, given the pressure ps at l1, from the
+    elevation change, the Hazen-Williams frictional loss and the pump and valve
+    heads of the pipeline (l1, l2)
+    """
     D_eff = value(model_h.hydraulics.p_Initial_Pipeline_Diameter[l1, l2]) + sum(
         value(model_h.vb_y_Pipeline[l1, l2, d])
         * value(model_h.df_parameters["PipelineDiameterValues"][d])
         for d in model_h.s_D
     )
-    if value(model_h.v_F_Piped[(l1, l2), t]) > 0.01:
-        if D_eff > 0.1:
-            HW_loss = (
-                10.704
-                * (
-                    (
-                        value(
-                            pyunits.convert(
-                                model_h.v_F_Piped[l1, l2, t],
-                                to_units=pyunits.m**3 / pyunits.s,
-                            )
-                        )
-                        / value(model_h.hydraulics.p_iota_HW_material_factor_pipeline)
-                    )
-                    ** 1.85
-                )
-                * value(
-                    pyunits.convert(
-                        model_h.p_lambda_Pipeline[l1, l2], to_units=pyunits.m
-                    )
+    if value(model_h.v_F_Piped[(l1, l2), t]) > 0.01 and D_eff > 0.1:
+        HW_loss = _hazen_williams_head(
+            value(model_h.hydraulics.p_iota_HW_material_factor_pipeline),
+            value(
+                pyunits.convert(model_h.p_lambda_Pipeline[l1, l2], to_units=pyunits.m)
+            ),
+            D_eff * 0.0254,
+            value(
+                pyunits.convert(
+                    model_h.v_F_Piped[l1, l2, t],
+                    to_units=pyunits.m**3 / pyunits.s,
                 )
-            ) / ((D_eff * 0.0254) ** 4.87)
-        else:
-            HW_loss = 0
+            ),
+        )
     else:
         HW_loss = 0
-    P2 = ps
-    (
-        +value(model_h.p_zeta_Elevation[l1]) * value(model_h.hydraulics.p_rhog)
-        - value(model_h.p_zeta_Elevation[l2]) * value(model_h.hydraulics.p_rhog)
-        - value(model_h.hydraulics.v_HW_loss[l1, l2, t])
-        * value(model_h.hydraulics.p_rhog)
+    P2 = ps + value(model_h.hydraulics.p_rhog) * (
+        value(model_h.p_zeta_Elevation[l1])
+        - value(model_h.p_zeta_Elevation[l2])
+        - HW_loss
         + value(model_h.hydraulics.v_PumpHead[l1, l2, t])
-        * value(model_h.hydraulics.p_rhog)
         - value(model_h.hydraulics.v_ValveHead[l1, l2, t])
-        * value(model_h.hydraulics.p_rhog)
     )
 
     return P2
 
 
+def pressure_violations(model_h):
+    """
+    Propagate the pressures of the production pads through the pipelines carrying
+    flow, with one breadth-first traversal of the network per time period, and
+    check them against the maximum allowable operating pressure and against 0 at
+    the network nodes.
+
+    Returns a DataFrame with one row per violation, with the node, the period,
+    the propagated pressure and the violated limit.
+    """
+    max_pressure = value(model_h.hydraulics.p_xi_Max_AOP)
+    violations = []
+    for t in model_h.s_T:
+        flowing_arcs = [
+            key
+            for key in model_h.s_LLA
+            if (model_h.v_F_Piped[key, t].value or 0) > 0.01
+        ]
+        _, arcs_out = _build_arc_adjacency(model_h.s_L, flowing_arcs)
+        pressure = {p: value(model_h.hydraulics.v_Pressure[p, t]) for p in model_h.s_PP}
+        queue = deque(pressure)
+        while queue:
+            l1 = queue.popleft()
+            for l2 in arcs_out[l1]:
+                if l2 in pressure:
+                    continue
+                pressure[l2] = calc_new_pres(model_h, pressure[l1], l1, l2, t)
+                queue.append(l2)
+                if l2 not in model_h.s_N:
+                    continue
+                if pressure[l2] > max_pressure:
+                    violations.append((l2, t, pressure[l2], max_pressure, "maximum"))
+                elif pressure[l2] < 0:
+                    violations.append((l2, t, pressure[l2], 0, "minimum"))
+    return pd.DataFrame(
+        violations, columns=["Node", "Period", "Pressure", "Limit", "Violation"]
+    )
+
+
 def solve_model(model, options=None):
     # default option values
     running_time = 60  # solver running time in seconds
@@ -7340,6 +7876,9 @@ def solve_model(model, options=None):
     scaling_factor = 1000000  # scaling factor to apply to the model (only relevant if scaling is turned on)
     solver = ("gurobi_direct", "gurobi", "cbc")  # solvers to try and load in order
     gurobi_numeric_focus = 1
+    hydraulics_refinements = (
+        0  # number of refinements of the linearized hydraulics around the incumbent
+    )
 
     # raise an exception if options is neither None nor a user-provided dictionary
     if options is not None and not isinstance(options, dict):
@@ -7364,6 +7903,8 @@ def solve_model(model, options=None):
             solver = options["solver"]
         if "gurobi_numeric_focus" in options.keys():
             gurobi_numeric_focus = options["gurobi_numeric_focus"]
+        if "hydraulics_refinements" in options.keys():
+            hydraulics_refinements = options["hydraulics_refinements"]
 
     # load pyomo solver
     opt = get_solver(*solver) if type(solver) is tuple else get_solver(solver)
@@ -7394,6 +7935,12 @@ def solve_model(model, options=None):
         model.v_S_TreatmentCapacity.fix(0)
         model.v_S_BeneficialReuseCapacity.fix(0)
 
+    if model.config.variable_bounds:
+        # Imported here since the bounding functions depend on this module
+        from pareto.utilities.bounding_functions import VariableBounds
+
+        VariableBounds(model)
+
     if use_scaling:
         # Step 1: scale model
         scaled_model = scale_model(model, scaling_factor=scaling_factor)
@@ -7554,50 +8101,322 @@ def solve_model(model, options=None):
             model_h.hydraulics.v_Pressure.setub(3.5e6)
 
             results_2 = opt.solve(model_h, tee=True, keepfiles=True)
+            # Refine the piecewise linearization around the incumbent flows and solve again
+            for _ in range(hydraulics_refinements):
+                if (
+                    results_2.solver.termination_condition
+                    == TerminationCondition.infeasible
+                ):
+                    break
+                refine_hydraulics_breakpoints(model_h)
+                results_2 = opt.solve(model_h, tee=True, keepfiles=True)
 
             # Check the feasibility of the results with regards to max pressure and node pressures
-
-            # Navigate over all the times
-            flagV = 0
-            flagU = 0
-            for t in model.s_T:
-                Press_dict = {}
-                for p in model.s_PP:
-                    Press_dict[p] = value(model_h.hydraulics.v_Pressure[p, t])
-                    while True:
-                        pres_dict_keys = list(Press_dict.keys())
-                        for (l1, l2) in model.s_LLA:
-                            if l1 in Press_dict.keys():
-                                ps = Press_dict[l1]
-                                this_p = calc_new_pres(model_h, ps, l1, l2, t)
-                                Press_dict[l2] = this_p
-                                if (
-                                    this_p > value(model_h.hydraulics.p_xi_Max_AOP)
-                                    and l2 in model.s_N
-                                ):
-                                    flagV = 1
-                                    print(l2, "->", l2 in model.s_N)
-                                    print(
-                                        "\n\nThe Pressure is ",
-                                        this_p,
-                                        " and max is ",
-                                        value(model_h.hydraulics.p_xi_Max_AOP),
-                                    )
-                                if this_p < 0 and l2 in model.s_N:
-                                    flagU = 1
-                        pres_dict_keys2 = list(Press_dict.keys())
-                        if pres_dict_keys == pres_dict_keys2:
-                            break
-
-            if flagV:
+            model.hydraulics_pressure_violations = pressure_violations(model_h)
+            violations = model.hydraulics_pressure_violations
+            if (violations["Violation"] == "maximum").any():
                 print("Violation of maximum pressure")
-            elif flagU:
+            elif (violations["Violation"] == "minimum").any():
                 print("Violation of minimum pressure")
             else:
                 print("All pressures satisfied ")
+            if not violations.empty:
+                print(violations.to_string(index=False))
 
         # Once the hydraulics block is solved, it is deactivated to retain the original MILP
         model_h.hydraulics.deactivate()
 
         results_2.write()
     return results
+
+
+def _period_position(index, period_position):
+    """
+    Return the position in s_T of the latest time period found in index, or None
+    if index is not time-indexed
+    """
+    if type(index) is not tuple:
+        index = (index,)
+    positions = [period_position[i] for i in index if i in period_position]
+    return max(positions) if positions else None
+
+
+def _commit_build_decisions(model):
+    """
+    Commit the build decisions of the current solution: for every pipeline arc,
+    storage, treatment and disposal site where something is built, options with a
+    smaller capacity than the selected one (and, for treatment, options with another
+    technology) are fixed to 0, so later windows can expand but never undo a build.
+    """
+    build_options = (
+        (
+            model.vb_y_Pipeline,
+            lambda l, l_tilde, d: ((l, l_tilde), model.p_delta_Pipeline[d]),
+        ),
+        (model.vb_y_Storage, lambda s, c: ((s,), model.p_delta_Storage[c])),
+        (model.vb_y_Disposal, lambda k, i: ((k,), model.p_delta_Disposal[k, i])),
+        (
+            model.vb_y_Treatment,
+            lambda r, wt, j: ((r, wt), model.p_delta_Treatment[wt, j]),
+        ),
+    )
+    for var, site_capacity in build_options:
+        options = {}
+        for index, v in var.items():
+            site, capacity = site_capacity(*index)
+            options.setdefault(site, []).append((v, value(capacity)))
+        if var is model.vb_y_Treatment:
+            # group the technologies of a treatment site, so a site keeps its technology
+            sites = {}
+            for (r, wt), site_options in options.items():
+                sites.setdefault(r, []).append(site_options)
+            groups = sites.values()
+        else:
+            groups = ([site_options] for site_options in options.values())
+        for group in groups:
+            selected = [
+                (site_options, capacity)
+                for site_options in group
+                for v, capacity in site_options
+                if v.value is not None and v.value > 0.5
+            ]
+            # nothing is built yet if the zero capacity option is selected
+            if not selected or selected[0][1] <= 0:
+                continue
+            selected_options, selected_capacity = selected[0]
+            for site_options in group:
+                for v, capacity in site_options:
+                    if site_options is not selected_options or (
+                        capacity < selected_capacity
+                    ):
+                        v.fix(0)
+
+
+def solve_rolling_horizon(
+    model, window, overlap=0, options=None, compare_monolithic=False
+):
+    """
+    Solve the strategic model over overlapping windows of s_T instead of solving the
+    full planning horizon at once.
+
+    Each window of window periods is solved with solve_model(), with all later
+    periods removed from the problem. The periods of a window that do not overlap
+    with the next window are then committed: their variables (including the storage
+    levels v_L_Storage and v_L_PadStorage passed on to the next window) are fixed,
+    and the build decisions vb_y_* can only be expanded by the following windows.
+    The last window covers the end of the planning horizon, so the stitched
+    solution is stored in the original model. Bounds, fixed status and active
+    constraints are restored at the end.
+
+    If compare_monolithic is True, a copy of the model is also solved over the full
+    horizon, to report the solve time/objective trade-off.
+
+    Returns the solver results of the last window and a DataFrame reporting the
+    solve time and objective of every window.
+    """
+    if (
+        model.config.water_quality is not WaterQuality.false
+        or model.config.hydraulics is not Hydraulics.false
+    ):
+        raise Exception(
+            "Rolling horizon is only supported for models without water quality and hydraulics"
+        )
+    if window < 1 or not 0 <= overlap < window:
+        raise Exception(
+            "window must be a positive number of periods and overlap must be smaller than window"
+        )
+
+    periods = list(model.s_T)
+    period_position = {t: i for i, t in enumerate(periods)}
+    step = window - overlap
+
+    if compare_monolithic:
+        monolithic_model = model.clone()
+        start_time = time.perf_counter()
+        monolithic_results = solve_model(monolithic_model, options)
+        monolithic_time = time.perf_counter() - start_time
+
+    # Store the time period of every variable and active constraint once
+    time_vars = [
+        (v, _period_position(index, period_position))
+        for var in model.component_objects(Var)
+        for index, v in var.items()
+    ]
+    time_vars = [(v, pos) for v, pos in time_vars if pos is not None]
+    time_constraints = [
+        (c, _period_position(index, period_position))
+        for con in model.component_objects(Constraint, active=True)
+        for index, c in con.items()
+        if c.active
+    ]
+    time_constraints = [(c, pos) for c, pos in time_constraints if pos is not None]
+
+    state = snapshot_variable_state(model)
+    windows = []
+    start = 0
+    try:
+        while True:
+            end = min(start + window, len(periods))
+            # Remove the periods after the window from the problem
+            for v, pos in time_vars:
+                if pos >= end:
+                    v.fix(0)
+            for c, pos in time_constraints:
+                if pos >= end:
+                    c.deactivate()
+            # The terminal storage levels are only enforced in the last period, so
+            # they are also imposed at the end of the committed periods and of the
+            # window, to leave a state that the next windows can drain
+            if end < len(periods):
+                for t in (periods[start + step - 1], periods[end - 1]):
+                    for level, theta, sites in (
+                        (model.v_L_Storage, model.p_theta_Storage, model.s_S),
+                        (model.v_L_PadStorage, model.p_theta_PadStorage, model.s_CP),
+                    ):
+                        for i in sites:
+                            ub = value(theta[i])
+                            if level[i, t].ub is not None:
+                                ub = min(ub, level[i, t].ub)
+                            level[i, t].setub(ub)
+            print("\n")
+            print("*" * 50)
+            print(
+                " " * 10,
+                "Rolling horizon window",
+                periods[start],
+                "-",
+                periods[end - 1],
+            )
+            print("*" * 50)
+            start_time = time.perf_counter()
+            results = solve_model(model, options)
+            windows.append(
+                {
+                    "Window": periods[start] + " - " + periods[end - 1],
+                    "Solve Time [s]": time.perf_counter() - start_time,
+                    "Objective": value(model.objective),
+                    "Termination Condition": str(results.solver.termination_condition),
+                }
+            )
+            if (
+                end == len(periods)
+                or results.solver.termination_condition
+                == TerminationCondition.infeasible
+            ):
+                break
+
+            # Bring back the original problem, then commit the decisions taken in
+            # the periods before the next window and the build decisions
+            restore_variable_state(state)
+            for c, pos in time_constraints:
+                c.activate()
+            start += step
+            for v, pos in time_vars:
+                if pos < start:
+                    if v.value is None:
+                        v.fix(0)
+                    elif v.is_binary():
+                        v.fix(round(v.value))
+                    else:
+                        v.fix()
+            _commit_build_decisions(model)
+            # Constraints of the committed periods without any free variable are
+            # satisfied by construction, only up to the solver tolerance
+            for c, pos in time_constraints:
+                if pos < start and not any(
+                    True for _ in identify_variables(c.body, include_fixed=False)
+                ):
+                    c.deactivate()
+    finally:
+        restore_variable_state(state)
+        for c, pos in time_constraints:
+            c.activate()
+
+    report = pd.DataFrame(windows)
+    summary = [
+        {
+            "Window": "Rolling horizon",
+            "Solve Time [s]": report["Solve Time [s]"].sum(),
+            "Objective": value(model.objective),
+            "Termination Condition": windows[-1]["Termination Condition"],
+        }
+    ]
+    if compare_monolithic:
+        monolithic_objective = value(monolithic_model.objective)
+        summary.append(
+            {
+                "Window": "Monolithic",
+                "Solve Time [s]": monolithic_time,
+                "Objective": monolithic_objective,
+                "Termination Condition": str(
+                    monolithic_results.solver.termination_condition
+                ),
+            }
+        )
+        if monolithic_objective:
+            summary[0]["Objective Gap [%]"] = (
+                100
+                * (summary[0]["Objective"] - monolithic_objective)
+                / abs(monolithic_objective)
+            )
+    report = pd.concat([report, pd.DataFrame(summary)], ignore_index=True).set_index(
+        "Window"
+    )
+    print("\n", report.to_string())
+    return results, report
+
+
+class ModelTemplate:
+    """
+    Strategic model built once for a network and a configuration, that can be
+    instantiated for the parameter data of each scenario without rebuilding
+    its Sets, Vars and Constraints, e.g.:
+
+        template = ModelTemplate(df_sets, df_parameters, default)
+        for scenario_parameters in scenarios:
+            model = template.instantiate(scenario_parameters)
+            results = solve_model(model, options)
+
+    Only the data listed in update_model_parameters can change between
+    scenarios. Every instance is the template model itself, reset to its state
+    after construction: the components added when solving it (e.g. the water
+    quality block) are removed, and the values, bounds and fixed status of the
+    variables and the active constraints are restored. The results of a
+    scenario must therefore be processed before instantiating the next one.
+    """
+
+    def __init__(self, df_sets, df_parameters, default={}):
+        self.df_sets = df_sets
+        self.model = create_model(df_sets, df_parameters, default)
+        self._components = set(self.model.component_map())
+        self._variable_state = snapshot_variable_state(self.model)
+        self._active = [
+            (c, c.active)
+            for c in self.model.component_data_objects(
+                (Constraint, Objective, Block), descend_into=True
+            )
+        ]
+
+    def instantiate(self, df_parameters):
+        """
+        Returns the template model reset and updated for df_parameters
+        """
+        model = self.model
+        if model.config.network_presolve:
+            # The pruned network depends on the data, it must not change
+            df_sets, df_parameters = _presolve_network(self.df_sets, df_parameters)
+            if not _same_data(df_sets, model.df_sets):
+                raise Exception(
+                    "The network presolve removes different locations for these parameters, build a new model with create_model instead"
+                )
+        for name in list(model.component_map()):
+            if name not in self._components:
+                model.del_component(name)
+        restore_variable_state(self._variable_state, restore_values=True)
+        for component, active in self._active:
+            if active:
+                component.activate()
+            else:
+                component.deactivate()
+        update_model_parameters(model, df_parameters)
+        return model
@@ -116,6 +116,22 @@ class TestAddFeatures:
 
         assert min_node == "N06"
 
+    @pytest.mark.slow
+    def test_desal_install_parallel(self):
+        _, df_sets, df_parameters = self.obtain_data()
+        min_node, models = node_rerun(
+            df_sets,
+            df_parameters,
+            treatment_site="R01",
+            max_iterations=5000,
+            max_workers=2,
+            keep_models=1,
+        )
+
+        assert min_node == "N06"
+        assert list(models) == ["N06"]
+        assert pyo.check_optimal_termination(models["N06"].status)
+
 
 if __name__ == "__main__":
     pytest.main()
@@ -19,9 +19,123 @@ import pytest
 # import it.
 pytest.importorskip("pyproj")
 
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from pareto.utilities import earthquake_distance
 from pareto.utilities.earthquake_distance import calculate_earthquake_distances, main
 
 
+@pytest.fixture
+def earthquake_api(monkeypatch):
+    """
+    Local stand-in for the USGS and TexNet APIs. Every request returns two
+    earthquakes close to the requested location, one on 2024-03-23 and one on
+    2024-03-25. The requests received are recorded in the returned list.
+    """
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            requests.append((url.path, query))
+            lat, lon = float(query["lat"]), float(query["lon"])
+            features = []
+            for n, time_ms in enumerate((1711195200000, 1711368000000)):
+                if url.path == "/usgs":
+                    props = {"time": time_ms, "mag": 3.5}
+                else:
+                    props = {"Event_Date": time_ms, "Magnitude": 3.5}
+                features.append(
+                    {
+                        "id": f"eq{n}_{query['lat']}",
+                        "properties": props,
+                        "geometry": {"coordinates": [lon + 0.01 * n, lat + 0.02]},
+                    }
+                )
+            body = json.dumps({"features": features}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    monkeypatch.setattr(
+        earthquake_distance,
+        "usgs_api_url",
+        base_url + "/usgs?lat={lat}&lon={lon}&r={max_radius_km}&m={min_magnitude}",
+    )
+    monkeypatch.setattr(
+        earthquake_distance,
+        "texnet_api_url",
+        base_url + "/texnet?lat={lat}&lon={lon}&r={max_radius_mi}&m={min_magnitude}",
+    )
+    yield requests
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.unit
+def test_earthquake_distance_concurrent_cached(earthquake_api, tmp_path):
+    swd_latlons = [
+        {"swd_id": i, "lat": 31.0 + 0.1 * i, "lon": -104.0 + 0.1 * i} for i in range(8)
+    ]
+    serial = calculate_earthquake_distances(swd_latlons, api="texnet")
+    assert len(earthquake_api) == 8
+    assert len(serial) == 16
+    # the results keep the order of the SWD sites
+    assert [row["swd_id"] for row in serial] == [i for i in range(8) for _ in "ab"]
+    # the batched distances match the distance of every single earthquake
+    for row in serial:
+        swd = swd_latlons[row["swd_id"]]
+        n = int(row["eq_id"][2])
+        expected = earthquake_distance.geod.line_length(
+            [swd["lon"], swd["lon"] + 0.01 * n], [swd["lat"], swd["lat"] + 0.02]
+        )
+        assert row["distance_mi"] == pytest.approx(
+            expected * earthquake_distance.mi_per_m
+        )
+
+    cache_dir = tmp_path / "cache"
+    concurrent = calculate_earthquake_distances(
+        swd_latlons, api="texnet", max_workers=4, cache_dir=str(cache_dir)
+    )
+    assert concurrent == serial
+    assert len(earthquake_api) == 16
+    assert len(list(cache_dir.iterdir())) == 8
+
+    # repeated runs are served from the cache, dates are applied locally
+    cached = calculate_earthquake_distances(
+        swd_latlons,
+        api="texnet",
+        min_date="2024-03-25",
+        max_workers=4,
+        cache_dir=str(cache_dir),
+    )
+    assert len(earthquake_api) == 16
+    assert cached == [row for row in serial if row["eq_id"].startswith("eq1")]
+
+    # another api or magnitude is a different cache entry
+    calculate_earthquake_distances(
+        swd_latlons[:2], api="usgs", cache_dir=str(cache_dir)
+    )
+    calculate_earthquake_distances(
+        swd_latlons[:2], api="texnet", min_magnitude=4, cache_dir=str(cache_dir)
+    )
+    assert len(earthquake_api) == 20
+    assert earthquake_api[-1][0] == "/texnet"
+    assert earthquake_api[-1][1]["m"] == "4"
+
+
 # calculate_earthquake_distances uses pyproj package, which is only supported
 # for Python 3.9 and later
 @pytest.mark.unit
@@ -0,0 +1,247 @@
+#####################################################################################################
+# PARETO was produced under the DOE Produced Water Application for Beneficial Reuse Environmental
+# Impact and Treatment Optimization (PARETO), and is copyright (c) 2021-2024 by the software owners:
+# The Regents of the University of California, through Lawrence Berkeley National Laboratory, et al.
+# All rights reserved.
+#
+# NOTICE. This Software was developed under funding from the U.S. Department of Energy and the U.S.
+# Government consequently retains certain rights. As such, the U.S. Government has been granted for
+# itself and others acting on its behalf a paid-up, nonexclusive, irrevocable, worldwide license in
+# the Software to reproduce, distribute copies to the public, prepare derivative works, and perform
+# publicly and display publicly, and to permit others to do so.
+#####################################################################################################
+"""
+Test reading input data with get_data and building drive time matrices with od_matrix
+"""
+import json
+import math
+import shutil
+import threading
+import warnings
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from importlib import resources
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+import pytest
+
+from pareto.utilities import get_data as get_data_module
+from pareto.utilities.get_data import get_data, od_matrix
+
+set_list = ["ProductionPads", "CompletionsPads", "SWDSites"]
+parameter_list = ["Units", "CompletionsDemand", "PadRates"]
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    fpath = tmp_path / "input.xlsx"
+    with resources.path("pareto.case_studies", "strategic_toy_case_study.xlsx") as f:
+        shutil.copyfile(f, fpath)
+    return fpath
+
+
+def _read(fpath, cache_dir):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return get_data(fpath, set_list, parameter_list, cache_dir=cache_dir)
+
+
+@pytest.mark.unit
+def test_get_data_cache(workbook, tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    [df_sets, df_parameters] = get_data(workbook, set_list, parameter_list)
+    [cached_sets, cached_parameters] = _read(workbook, cache_dir)
+    assert len(list(cache_dir.iterdir())) == 1
+    assert cached_parameters == df_parameters
+    for name in df_sets:
+        assert list(cached_sets[name]) == list(df_sets[name])
+
+    # A second call must be served from the cache without reading the workbook
+    def _fail(*args, **kwargs):
+        raise AssertionError("workbook should not be read")
+
+    monkeypatch.setattr(pd, "read_excel", _fail)
+    monkeypatch.setattr(pd, "ExcelFile", _fail)
+    [cached_sets, cached_parameters] = _read(workbook, cache_dir)
+    assert cached_parameters == df_parameters
+
+    # Warnings raised while parsing are issued again on a cache hit
+    with pytest.warns(UserWarning, match="is not found in defined sets"):
+        get_data(workbook, set_list, parameter_list, cache_dir=cache_dir)
+
+
+@pytest.mark.unit
+def test_get_data_cache_invalidation(workbook, tmp_path):
+    cache_dir = tmp_path / "cache"
+    [_, df_parameters] = _read(workbook, cache_dir)
+
+    # Requesting different tabs creates a separate cache entry
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        [_, fewer_parameters] = get_data(
+            workbook, set_list, parameter_list[:2], cache_dir=cache_dir
+        )
+    assert "PadRates" not in fewer_parameters
+    assert len(list(cache_dir.iterdir())) == 2
+
+    # Changing the workbook invalidates the cached entry
+    with resources.path("pareto.case_studies", "strategic_small_case_study.xlsx") as f:
+        shutil.copyfile(f, workbook)
+    [_, new_parameters] = _read(workbook, cache_dir)
+    [_, expected_parameters] = _read(workbook, None)
+    assert new_parameters == expected_parameters
+    assert new_parameters != df_parameters
+    assert len(list(cache_dir.iterdir())) == 3
+
+
+# Locations on a line of latitude 32, 0.1 degrees of longitude apart
+locations = {
+    f"L{i}": {"latitude": 32.0, "longitude": -103.0 + 0.1 * i} for i in range(5)
+}
+
+
+def _stub_distance_m(lon1, lat1, lon2, lat2):
+    # Any deterministic function of the coordinates works for the stub server
+    return 100000 * (abs(lon1 - lon2) + abs(lat1 - lat2))
+
+
+@pytest.fixture
+def osrm_server(monkeypatch):
+    """
+    Local stand-in for the OSRM table service. Drive distances are computed from
+    the coordinates and drive times assume 20 m/s. Requests that contain the
+    latitude 40 fail. The coordinates of every request are recorded.
+    """
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlsplit(self.path)
+            coordinates = [
+                tuple(float(x) for x in c.split(","))
+                for c in url.path.rsplit("/", 1)[1].split(";")
+            ]
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            sources = [coordinates[int(i)] for i in query["sources"].split(";")]
+            destinations = [
+                coordinates[int(i)] for i in query["destinations"].split(";")
+            ]
+            requests.append((sources, destinations))
+            if any(math.isclose(c[1], 40.0) for c in coordinates):
+                self.send_response(500)
+                self.end_headers()
+                return
+            distances = [
+                [_stub_distance_m(*o, *d) for d in destinations] for o in sources
+            ]
+            body = {
+                "code": "Ok",
+                "distances": distances,
+                "durations": [[x / 20 for x in row] for row in distances],
+            }
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(json.dumps(body).encode())
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(
+        get_data_module,
+        "osrm_api_url",
+        f"http://127.0.0.1:{server.server_port}/table/v1/driving/",
+    )
+    yield requests
+    server.shutdown()
+    server.server_close()
+
+
+def _expected(o, d):
+    dist_m = _stub_distance_m(
+        locations[o]["longitude"],
+        locations[o]["latitude"],
+        locations[d]["longitude"],
+        locations[d]["latitude"],
+    )
+    return dist_m / 20 / 3600, dist_m / 1000 * 0.621371
+
+
+@pytest.mark.unit
+def test_od_matrix_tiles_and_cache(osrm_server, tmp_path):
+    inputs = {
+        "origin": dict(list(locations.items())[:4]),
+        "output": "time_distance",
+        "create_report": False,
+        "tile_size": 2,
+    }
+    times, distances = od_matrix(dict(inputs))
+    assert len(osrm_server) == 4
+    assert all(len(o) <= 2 and len(d) <= 2 for o, d in osrm_server)
+    assert list(times) == [
+        (o, d) for o in list(locations)[:4] for d in list(locations)[:4]
+    ]
+    for (o, d), time in times.items():
+        assert time == pytest.approx(_expected(o, d)[0])
+        assert distances[o, d] == pytest.approx(_expected(o, d)[1])
+
+    # Concurrent requests give the same matrix
+    assert od_matrix(dict(inputs, max_workers=4)) == [times, distances]
+
+    # Cached pairs are not requested again
+    cache_dir = str(tmp_path / "od_cache")
+    od_matrix(dict(inputs, cache_dir=cache_dir))
+    n_requests = len(osrm_server)
+    assert od_matrix(dict(inputs, cache_dir=cache_dir)) == [times, distances]
+    assert len(osrm_server) == n_requests
+
+    # Adding a location only requests the pairs that include it
+    destination = dict(list(locations.items())[:3])
+    destination["L4"] = locations["L4"]
+    times = od_matrix(
+        dict(inputs, destination=destination, cache_dir=cache_dir, output=None)
+    )
+    new_requests = osrm_server[n_requests:]
+    assert len(new_requests) == 2
+    assert all(d == [(locations["L4"]["longitude"], 32.0)] for _, d in new_requests)
+    assert times["L0", "L4"] == pytest.approx(_expected("L0", "L4")[0])
+
+
+@pytest.mark.unit
+def test_od_matrix_great_circle(osrm_server):
+    origin = {"A": {"latitude": 32.0, "longitude": -103.0}}
+    destination = {"B": {"latitude": 33.0, "longitude": -103.0}}
+    times, distances = od_matrix(
+        {
+            "origin": origin,
+            "destination": destination,
+            "api": "great_circle",
+            "road_factor": 1.5,
+            "average_speed": 50,
+            "output": "time_distance",
+            "create_report": False,
+        }
+    )
+    # one degree of latitude is about 69.1 miles
+    assert distances["A", "B"] == pytest.approx(69.1 * 1.5, rel=1e-3)
+    assert times["A", "B"] == pytest.approx(distances["A", "B"] / 50)
+    assert osrm_server == []
+
+    # The estimate is used for the tiles that the API can not provide
+    inputs = {
+        "origin": {"L0": locations["L0"], "X": {"latitude": 40.0, "longitude": -103.0}},
+        "destination": {k: locations[k] for k in ("L0", "L1")},
+        "tile_size": 1,
+        "output": "distance",
+        "create_report": False,
+    }
+    with pytest.raises(Warning):
+        od_matrix(dict(inputs))
+    distances = od_matrix(dict(inputs, fallback=True))
+    assert distances["L0", "L1"] == pytest.approx(_expected("L0", "L1")[1])
+    estimate = od_matrix(dict(inputs, api="great_circle"))
+    assert distances["X", "L1"] == estimate["X", "L1"]
+    assert distances["L0", "L1"] != estimate["L0", "L1"]
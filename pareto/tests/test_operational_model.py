@@ -125,7 +125,7 @@ def test_basic_build(build_operational_model):
     )
     assert degrees_of_freedom(m) == 135
     # Check unit config arguments
-    assert len(m.config) == 3
+    assert len(m.config) == 4
     assert m.config.production_tanks
     assert isinstance(m.s_T, pyo.Set)
     assert isinstance(m.v_F_Piped, pyo.Var)
@@ -258,7 +258,7 @@ def test_operational_model_discrete_water_quality_build(build_operational_model)
     )
     assert degrees_of_freedom(m) == 335
     # Check unit config arguments
-    assert len(m.config) == 3
+    assert len(m.config) == 4
     assert m.config.water_quality
     assert isinstance(m.s_T, pyo.Set)
     assert isinstance(m.v_F_Piped, pyo.Var)
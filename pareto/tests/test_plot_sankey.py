@@ -128,3 +128,26 @@ def plot_args_multi_regions():
 
 def test_plot_sankey_multi_regions(input_data_multi_regions, plot_args_multi_regions):
     plot_sankey(input_data_multi_regions, args=plot_args_multi_regions)
+
+
+def test_plot_sankey_duplicate_links():
+    input_data = {
+        "source": ["PP01", "PP01", "N01", "PP01", "N01"],
+        "destination": ["N01", "N02", "N01", "N01", "K01"],
+        "value": [1000, 500, 10, 2000, 3000],
+    }
+    fig = plot_sankey(input_data, args={"output_file": None})
+    sankey = fig.data[0]
+
+    # duplicate links are merged in order of first appearance
+    assert list(sankey.link.source) == [0, 0, 1, 1]
+    assert list(sankey.link.target) == [1, 2, 3, 4]
+    assert list(sankey.link.value) == [3000, 500, 10, 3000]
+    # links from a location to itself use a separate node with the same name
+    assert list(sankey.node.label) == [
+        "PP01:3k",
+        "N01:3k",
+        "N02:500",
+        "N01:10",
+        "K01:3k",
+    ]
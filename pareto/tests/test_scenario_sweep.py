@@ -0,0 +1,160 @@
+#####################################################################################################
+# PARETO was produced under the DOE Produced Water Application for Beneficial Reuse Environmental
+# Impact and Treatment Optimization (PARETO), and is copyright (c) 2021-2024 by the software owners:
+# The Regents of the University of California, through Lawrence Berkeley National Laboratory, et al.
+# All rights reserved.
+#
+# NOTICE. This Software was developed under funding from the U.S. Department of Energy and the U.S.
+# Government consequently retains certain rights. As such, the U.S. Government has been granted for
+# itself and others acting on its behalf a paid-up, nonexclusive, irrevocable, worldwide license in
+# the Software to reproduce, distribute copies to the public, prepare derivative works, and perform
+# publicly and display publicly, and to permit others to do so.
+#####################################################################################################
+"""
+Test the scenario sweep runner of the strategic model
+"""
+import json
+
+import pandas as pd
+import pyomo.environ as pyo
+import pytest
+from importlib import resources
+
+from pareto.strategic_water_management.scenario_sweep import (
+    STRATEGIC_SET_LIST,
+    apply_parameter_overrides,
+    main,
+    product_scenarios,
+    run_scenario_sweep,
+)
+from pareto.strategic_water_management.strategic_produced_water_optimization import (
+    Objectives,
+    PipelineCost,
+)
+from pareto.utilities.get_data import get_data
+from pareto.utilities.solvers import get_solver
+
+
+@pytest.fixture(scope="module")
+def toy_case_study():
+    with resources.path(
+        "pareto.case_studies", "strategic_toy_case_study.xlsx"
+    ) as fpath:
+        parameter_list = [
+            tab
+            for tab in pd.ExcelFile(fpath).sheet_names
+            if tab not in STRATEGIC_SET_LIST and tab not in ("Overview", "Schematic")
+        ]
+        yield fpath, get_data(fpath, STRATEGIC_SET_LIST, parameter_list)
+
+
+@pytest.mark.unit
+def test_apply_parameter_overrides():
+    df_parameters = {
+        "CompletionsDemand": {("CP01", "T01"): 10, ("CP01", "T02"): 20},
+        "Economics": {"discount_rate": 0.08, "currency": "USD"},
+    }
+    overridden = apply_parameter_overrides(
+        df_parameters,
+        {
+            "CompletionsDemand": 2,
+            "Economics": {"discount_rate": 0.1},
+        },
+    )
+    assert overridden["CompletionsDemand"] == {
+        ("CP01", "T01"): 20,
+        ("CP01", "T02"): 40,
+    }
+    assert overridden["Economics"] == {"discount_rate": 0.1, "currency": "USD"}
+    # the base data must not be modified
+    assert df_parameters["CompletionsDemand"][("CP01", "T01")] == 10
+    assert df_parameters["Economics"]["discount_rate"] == 0.08
+
+    with pytest.raises(KeyError):
+        apply_parameter_overrides(df_parameters, {"PadRates": 2})
+
+
+@pytest.mark.unit
+def test_product_scenarios():
+    scenarios = product_scenarios(
+        {"base": {}, "high_demand": {"CompletionsDemand": 1.5}},
+        {"cost": {"objective": "cost"}, "reuse": {"objective": "reuse"}},
+    )
+    assert list(scenarios) == [
+        "base|cost",
+        "base|reuse",
+        "high_demand|cost",
+        "high_demand|reuse",
+    ]
+    assert scenarios["high_demand|reuse"] == {
+        "parameters": {"CompletionsDemand": 1.5},
+        "config": {"objective": "reuse"},
+    }
+
+
+@pytest.mark.component
+def test_run_scenario_sweep(toy_case_study):
+    _, [df_sets, df_parameters] = toy_case_study
+    scenarios = {
+        "distance_based": {"config": {"pipeline_cost": "distance_based"}},
+        "capacity_based": {
+            "config": {"pipeline_cost": PipelineCost.capacity_based},
+            "parameters": {"CompletionsDemand": 1.1},
+        },
+        "invalid": {"config": {"objective": "profit"}},
+    }
+    options = {"running_time": 10, "solver": "cbc"}
+    kpis = run_scenario_sweep(
+        df_sets,
+        df_parameters,
+        scenarios,
+        base_config={"objective": Objectives.cost},
+        options=options,
+        max_workers=2,
+    )
+    assert list(kpis.index) == list(scenarios)
+    assert kpis.loc["invalid", "Termination Condition"] == "error"
+    assert "profit" in kpis.loc["invalid", "Error"]
+    for name in ("distance_based", "capacity_based"):
+        assert kpis.loc[name, "Error"] == ""
+        assert kpis.loc[name, "Termination Condition"] in (
+            str(pyo.TerminationCondition.optimal),
+            str(pyo.TerminationCondition.maxTimeLimit),
+        )
+    assert "v_Z [USD]" in kpis.columns
+    assert "reuse_WaterKPI" in kpis.columns
+
+
+@pytest.mark.component
+def test_scenario_sweep_cli(toy_case_study, tmp_path):
+    fpath, _ = toy_case_study
+    scenario_file = tmp_path / "scenarios.json"
+    scenario_file.write_text(
+        json.dumps(
+            {
+                "base": {},
+                "no_reuse": {
+                    "parameters": {"ReuseCapacity": [["O02", "T01", 0]]},
+                    "config": {"objective": "cost"},
+                },
+            }
+        )
+    )
+    output = tmp_path / "kpis.csv"
+    main(
+        [
+            str(fpath),
+            str(scenario_file),
+            "--output",
+            str(output),
+            "--workers",
+            "1",
+            "--running-time",
+            "10",
+            "--solver",
+            "cbc",
+        ]
+    )
+    kpis = pd.read_csv(output, index_col="Scenario")
+    assert list(kpis.index) == ["base", "no_reuse"]
+    assert "v_Z [USD]" in kpis.columns
@@ -18,6 +18,7 @@ import pyomo.environ as pyo
 from pyomo.util.check_units import assert_units_consistent
 from pyomo.core.base import value
 from pyomo.environ import Constraint, units
+from pyomo.core.expr.visitor import identify_variables
 
 # Import IDAES solvers
 from pareto.utilities.solvers import get_solver
@@ -34,7 +35,16 @@ from pareto.strategic_water_management.strategic_produced_water_optimization imp
     pipeline_hydraulics,
     RemovalEfficiencyMethod,
     InfrastructureTiming,
+    BigM,
     infrastructure_timing,
+    _build_arc_adjacency,
+    _get_persistent_solver,
+    solve_rolling_horizon,
+    _hazen_williams_head,
+    refine_hydraulics_breakpoints,
+    ModelTemplate,
+    update_model_parameters,
+    updatable_parameters,
 )
 from pareto.utilities.get_data import get_data, get_display_units
 from pareto.utilities.units_support import (
@@ -42,6 +52,9 @@ from pareto.utilities.units_support import (
     PintUnitExtractionVisitor,
 )
 from importlib import resources
+import json
+import logging
+import pandas as pd
 import pytest
 from idaes.core.util.model_statistics import degrees_of_freedom
 from pareto.utilities.results import (
@@ -193,7 +206,7 @@ def test_basic_build_capex_distance_based_capacity_input(build_strategic_model):
     )
     assert degrees_of_freedom(m) == 29595
     # Check unit config arguments
-    assert len(m.config) == 8
+    assert len(m.config) == 12
     assert m.config.objective
     assert isinstance(m.s_T, pyo.Set)
     assert isinstance(m.v_F_Piped, pyo.Var)
@@ -216,7 +229,7 @@ def test_basic_build_capex_distance_based_capacity_calculated(build_strategic_mo
     )
     assert degrees_of_freedom(m) == 29595
     # Check unit config arguments
-    assert len(m.config) == 8
+    assert len(m.config) == 12
     assert m.config.objective
     assert isinstance(m.s_T, pyo.Set)
     assert isinstance(m.v_F_Piped, pyo.Var)
@@ -239,7 +252,7 @@ def test_basic_build_capex_capacity_based_capacity_input(build_strategic_model):
     )
     assert degrees_of_freedom(m) == 29595
     # Check unit config arguments
-    assert len(m.config) == 8
+    assert len(m.config) == 12
     assert m.config.objective
     assert isinstance(m.s_T, pyo.Set)
     assert isinstance(m.v_F_Piped, pyo.Var)
@@ -262,7 +275,7 @@ def test_basic_build_capex_capacity_based_capacity_calculated(build_strategic_mo
     )
     assert degrees_of_freedom(m) == 29595
     # Check unit config arguments
-    assert len(m.config) == 8
+    assert len(m.config) == 12
     assert m.config.objective
     assert isinstance(m.s_T, pyo.Set)
     assert isinstance(m.v_F_Piped, pyo.Var)
@@ -271,6 +284,83 @@ def test_basic_build_capex_capacity_based_capacity_calculated(build_strategic_mo
     assert isinstance(m.PipelineExpansionCapEx, pyo.Constraint)
 
 
+@pytest.mark.unit
+def test_build_arc_adjacency():
+    locations = ["A", "B", "C", "D"]
+    arcs = [("C", "A"), ("A", "B"), ("B", "A"), ("A", "C"), ("A", "X")]
+    arcs_in, arcs_out = _build_arc_adjacency(locations, arcs)
+    assert arcs_in == {"A": ["B", "C"], "B": ["A"], "C": ["A"], "D": []}
+    # Neighbors follow the order of locations, not the order of the arcs
+    assert arcs_out == {"A": ["B", "C"], "B": ["A"], "C": ["A"], "D": []}
+    # Arcs with an endpoint outside of locations are ignored
+    assert "X" not in arcs_in
+
+
+@pytest.mark.unit
+def test_get_persistent_solver():
+    cbc = pyo.SolverFactory("cbc")
+    assert _get_persistent_solver(cbc) is None
+
+    gurobi = pyo.SolverFactory("gurobi_direct")
+    gurobi.options["mipgap"] = 0.01
+    persistent = _get_persistent_solver(gurobi)
+    if gurobi.available(exception_flag=False):
+        assert persistent.type == "gurobi_persistent"
+        assert persistent.options["mipgap"] == 0.01
+    else:
+        assert persistent is None
+
+
+@pytest.mark.unit
+def test_arc_adjacency_sets(build_strategic_model):
+    m = build_strategic_model(
+        config_dict={
+            "objective": Objectives.cost,
+            "pipeline_cost": PipelineCost.distance_based,
+            "pipeline_capacity": PipelineCapacity.input,
+            "node_capacity": True,
+            "water_quality": WaterQuality.false,
+        }
+    )
+    for arcs, arcs_in, arcs_out in (
+        (m.s_LLA, m.s_LLA_In, m.s_LLA_Out),
+        (m.s_LLT, m.s_LLT_In, m.s_LLT_Out),
+    ):
+        for l in m.s_L:
+            assert set(arcs_in[l]) == {a for (a, b) in arcs if b == l}
+            assert set(arcs_out[l]) == {b for (a, b) in arcs if a == l}
+        # Every arc is listed exactly once on each side
+        assert sum(len(arcs_in[l]) for l in m.s_L) == len(arcs)
+        assert sum(len(arcs_out[l]) for l in m.s_L) == len(arcs)
+    # Network nodes have no trucking arcs
+    for n in m.s_N:
+        assert len(m.s_LLT_In[n]) == 0
+        assert len(m.s_LLT_Out[n]) == 0
+
+    # Arc-based constraints are only built for valid arcs
+    assert set(m.PipelineCapacityExpansion) == set(m.s_LLA)
+    assert set(m.LogicConstraintPipeline) == set(m.s_LLA)
+    assert set(m.TruckingCost) == {
+        (l, l_tilde, t) for (l, l_tilde) in m.s_LLT for t in m.s_T
+    }
+    assert set(m.PipelineCapacity) == {
+        (l, l_tilde, t)
+        for (l, l_tilde) in m.s_LLA
+        if l not in m.s_O and l not in m.s_K and l_tilde not in m.s_F
+        for t in m.s_T
+    }
+
+    # Balance constraints include exactly the flows on adjacent arcs
+    t = m.s_T.first()
+    for n in m.s_N:
+        flows = {v.name for v in identify_variables(m.NetworkBalance[n, t].body)}
+        assert flows == {
+            m.v_F_Piped[l, l_tilde, t].name
+            for (l, l_tilde) in m.s_LLA
+            if n in (l, l_tilde)
+        }
+
+
 def test_strategic_model_build_units_scaled_units_consistency(build_strategic_model):
     """
     Note: There are pyomo functions like assert_units_consistent that test consistency of expressions.
@@ -562,6 +652,28 @@ def test_run_hydraulics_post_process_reduced_strategic_model(
     assert pytest.approx(24, abs=1e-1) == pyo.value(
         sum(m.hydraulics.vb_Y_Pump[key] for key in m.s_LLA)
     )
+    # the vectorized head losses match the head of each arc and period
+    mh = m.hydraulics
+    for (l1, l2, t), loss in mh.p_HW_loss.items():
+        if (
+            pyo.value(m.v_F_Piped[l1, l2, t]) > 0.01
+            and pyo.value(mh.p_effective_Pipeline_diameter[l1, l2]) > 0.1
+        ):
+            assert pytest.approx(pyo.value(loss)) == pyo.value(
+                _hazen_williams_head(
+                    mh.p_iota_HW_material_factor_pipeline,
+                    units.convert(m.p_lambda_Pipeline[l1, l2], to_units=units.meter),
+                    units.convert(
+                        mh.p_effective_Pipeline_diameter[l1, l2],
+                        to_units=units.meter,
+                    ),
+                    units.convert(
+                        m.v_F_Piped[l1, l2, t], to_units=units.m**3 / units.s
+                    ),
+                )
+            )
+        else:
+            assert pyo.value(loss) == 0
 
     with nostdout():
         assert is_feasible(m)
@@ -663,6 +775,54 @@ def test_hydraulics_co_optimize_linearized_input(
     assert isinstance(mh.hydraulics.PumpHeadCons, pyo.Constraint)
 
 
+@pytest.mark.unit
+def test_hydraulics_co_optimize_linearized_breakpoints(
+    build_workshop_strategic_model,
+):
+    m = build_workshop_strategic_model(
+        config_dict={
+            "objective": Objectives.cost,
+            "pipeline_cost": PipelineCost.capacity_based,
+            "pipeline_capacity": PipelineCapacity.input,
+            "hydraulics": Hydraulics.co_optimize_linearized,
+            "water_quality": WaterQuality.false,
+        }
+    )
+    (l1, l2), (l3, l4) = list(m.s_LLA)[:2]
+    t = m.s_T.first()
+    m.v_F_Piped[l1, l2, t].fix(100)
+    m.v_F_Piped[l3, l4, t].setub(0)
+    m.v_F_Piped[l3, l4, m.s_T.last()].setub(900)
+    mh = pipeline_hydraulics(m).hydraulics
+
+    # arcs with a fixed or zero flow are not linearized
+    assert (l1, l2, t) not in mh.s_PiecewiseArcs
+    assert (l3, l4, t) not in mh.s_PiecewiseArcs
+    assert len(mh.s_PiecewiseArcs) == len(m.s_LLA) * len(m.s_T) - 2
+    assert len(mh.vb_z) == len(mh.s_PiecewiseArcs) * len(m.s_zset)
+    assert (l1, l2, t) not in mh.SumOne
+    assert pyo.value(mh.termEquationConv[l1, l2, t].upper) == pytest.approx(
+        (100 * 1.84e-6) ** 1.85
+    )
+    # breakpoints are evenly spaced over the flow bounds of each arc
+    key = (l3, l4, m.s_T.last())
+    assert [pyo.value(mh.p_flow_breakpoints[(*key, k)]) for k in m.s_lamset] == (
+        pytest.approx([0, 300, 600, 900])
+    )
+
+    # refining moves the inner breakpoints around the incumbent flow
+    m.v_F_Piped[key].set_value(450)
+    refine_hydraulics_breakpoints(m)
+    assert [pyo.value(mh.p_flow_breakpoints[(*key, k)]) for k in m.s_lamset] == (
+        pytest.approx([0, 375, 525, 900])
+    )
+    m.v_F_Piped[key].set_value(0)
+    refine_hydraulics_breakpoints(m)
+    assert [pyo.value(mh.p_flow_breakpoints[(*key, k)]) for k in m.s_lamset] == (
+        pytest.approx([0, 0, 37.5, 900])
+    )
+
+
 # if solver cbc exists @solver
 @pytest.mark.component
 def test_run_hydraulics_co_optimize_linearized_reduced_strategic_model(
@@ -692,6 +852,113 @@ def test_run_hydraulics_co_optimize_linearized_reduced_strategic_model(
 
     assert results.solver.termination_condition == pyo.TerminationCondition.optimal
     assert results.solver.status == pyo.SolverStatus.ok
+    violations = m.hydraulics_pressure_violations
+    assert list(violations.columns) == [
+        "Node",
+        "Period",
+        "Pressure",
+        "Limit",
+        "Violation",
+    ]
+    assert set(violations["Node"]) <= set(m.s_N)
+    assert (
+        (violations["Violation"] == "maximum")
+        == (violations["Pressure"] > violations["Limit"])
+    ).all()
+
+
+@pytest.mark.unit
+def test_network_presolve(build_reduced_strategic_model, caplog):
+    config_dict = {
+        "objective": Objectives.cost,
+        "pipeline_cost": PipelineCost.distance_based,
+        "pipeline_capacity": PipelineCapacity.input,
+        "water_quality": WaterQuality.false,
+    }
+    m = build_reduced_strategic_model(config_dict=config_dict)
+    df_sets = dict(m.df_sets)
+    df_parameters = {
+        key: dict(value) if isinstance(value, dict) else value
+        for key, value in m.df_parameters.items()
+    }
+    # a dead end branch of two nodes and a disposal site without any capacity
+    df_sets["NetworkNodes"] = pd.concat(
+        [df_sets["NetworkNodes"], pd.Series(["N98", "N99"])], ignore_index=True
+    )
+    df_sets["SWDSites"] = pd.concat(
+        [df_sets["SWDSites"], pd.Series(["K99"])], ignore_index=True
+    )
+    df_parameters["NNA"].update({("N01", "N98"): 1, ("N98", "N99"): 1})
+    df_parameters["NKA"][("N01", "K99")] = 1
+    df_parameters["Elevation"].update({"N98": 0, "N99": 0})
+    df_parameters["InitialDisposalCapacity"]["K99"] = 0
+    df_parameters["DisposalCapacityIncrements"].update(
+        {("K99", i): 0 for i in df_sets["InjectionCapacities"]}
+    )
+
+    with caplog.at_level(logging.INFO):
+        m_presolved = create_model(
+            df_sets, df_parameters, dict(config_dict, network_presolve=True)
+        )
+
+    assert "removed 3 locations (K99, N98, N99) and 3 arcs" in caplog.text
+    assert set(m_presolved.s_L) == set(m.s_L)
+    assert set(m_presolved.s_LLA) == set(m.s_LLA)
+    assert len(m_presolved.vb_y_Disposal) == len(m.vb_y_Disposal)
+    # the input data is not modified
+    assert "N99" in list(df_sets["NetworkNodes"])
+    assert ("N01", "K99") in df_parameters["NKA"]
+
+    # nothing is removed from a network without dead parts
+    m_presolved = create_model(
+        m.df_sets, m.df_parameters, dict(config_dict, network_presolve=True)
+    )
+    assert set(m_presolved.s_LLA) == set(m.s_LLA)
+
+
+@pytest.mark.unit
+def test_profile_construction(build_reduced_strategic_model, tmp_path):
+    m = build_reduced_strategic_model(
+        config_dict={
+            "objective": Objectives.cost,
+            "pipeline_cost": PipelineCost.distance_based,
+            "pipeline_capacity": PipelineCapacity.input,
+            "water_quality": WaterQuality.false,
+            "profile_construction": True,
+        }
+    )
+    pipeline_hydraulics(m)
+
+    df = m.construction_profile.to_dataframe()
+    assert list(df.columns) == [
+        "Stage",
+        "Component",
+        "Type",
+        "Time [s]",
+        "Peak Memory [MB]",
+        "Variables",
+        "Constraints",
+        "Nonzeros",
+    ]
+    assert set(df["Stage"]) == {"create_model", "pipeline_hydraulics"}
+    row = df.set_index("Component").loc["v_F_Piped"]
+    assert row["Type"] == "Var"
+    assert row["Variables"] == len(m.v_F_Piped)
+    row = df.set_index("Component").loc["PipelineCapacity"]
+    assert row["Constraints"] == len(m.PipelineCapacity)
+    assert row["Nonzeros"] == 2 * len(m.PipelineCapacity)
+    assert (df["Peak Memory [MB]"] >= 0).all()
+    assert "hydraulics.v_Pressure" in set(df["Component"])
+
+    path = tmp_path / "profile.json"
+    report = json.loads(m.construction_profile.to_json(path))
+    assert json.loads(path.read_text()) == report
+    assert set(report["stages"]) == {"create_model", "pipeline_hydraulics"}
+    assert len(report["components"]) == len(df)
+
+    # models built without profiling are not instrumented
+    m = create_model(m.df_sets, m.df_parameters, {"water_quality": WaterQuality.false})
+    assert not hasattr(m, "construction_profile")
 
 
 @pytest.mark.unit
@@ -709,7 +976,7 @@ def test_basic_reduced_build_capex_capacity_based_capacity_calculated(
     )
     assert degrees_of_freedom(m) == 12851
     # Check unit config arguments
-    assert len(m.config) == 8
+    assert len(m.config) == 12
     assert m.config.objective
     assert isinstance(m.s_T, pyo.Set)
     assert isinstance(m.v_F_Piped, pyo.Var)
@@ -733,7 +1000,7 @@ def test_basic_reduced_build_capex_capacity_based_capacity_input(
     )
     assert degrees_of_freedom(m) == 12851
     # Check unit config arguments
-    assert len(m.config) == 8
+    assert len(m.config) == 12
     assert m.config.objective
     assert isinstance(m.s_T, pyo.Set)
     assert isinstance(m.v_F_Piped, pyo.Var)
@@ -757,7 +1024,7 @@ def test_basic_reduced_build_capex_distance_based_capacity_input(
     )
     assert degrees_of_freedom(m) == 12851
     # Check unit config arguments
-    assert len(m.config) == 8
+    assert len(m.config) == 12
     assert m.config.objective
     assert isinstance(m.s_T, pyo.Set)
     assert isinstance(m.v_F_Piped, pyo.Var)
@@ -781,7 +1048,7 @@ def test_basic_reduced_build_discrete_water_quality_input(
     )
     assert degrees_of_freedom(m) == 103331
     # Check unit config arguments
-    assert len(m.config) == 8
+    assert len(m.config) == 12
     assert m.config.objective
     assert isinstance(m.s_T, pyo.Set)
     assert isinstance(m.v_F_Piped, pyo.Var)
@@ -897,6 +1164,192 @@ def test_run_reduced_strategic_model(build_reduced_strategic_model):
         assert is_feasible(m)
 
 
+@pytest.mark.component
+def test_rolling_horizon_reduced_strategic_model(build_reduced_strategic_model):
+    m = build_reduced_strategic_model(
+        config_dict={
+            "objective": Objectives.cost,
+            "pipeline_cost": PipelineCost.distance_based,
+            "pipeline_capacity": PipelineCapacity.input,
+            "water_quality": WaterQuality.false,
+        }
+    )
+    n_periods = len(m.s_T)
+    n_constraints = len(list(m.component_data_objects(pyo.Constraint, active=True)))
+
+    options = {
+        "deactivate_slacks": True,
+        "scale_model": False,
+        "running_time": 60 * 5,
+        "gap": 0,
+    }
+    results, report = solve_rolling_horizon(
+        m,
+        window=n_periods // 2 + 2,
+        overlap=2,
+        options=options,
+        compare_monolithic=True,
+    )
+
+    assert results.solver.termination_condition == pyo.TerminationCondition.optimal
+    assert list(report.index) == [
+        report.index[0],
+        report.index[1],
+        "Rolling horizon",
+        "Monolithic",
+    ]
+    assert report.index[1].endswith(m.s_T.last())
+    # the stitched solution covers the full horizon and cannot beat the monolithic solve
+    assert pytest.approx(88199.598, abs=1e-1) == report.loc["Monolithic", "Objective"]
+    assert report.loc["Rolling horizon", "Objective"] == pyo.value(m.v_Z)
+    assert report.loc["Rolling horizon", "Objective Gap [%]"] >= -1e-6
+    # constraints and fixed variables are restored
+    assert (
+        len(list(m.component_data_objects(pyo.Constraint, active=True)))
+        == n_constraints
+    )
+    assert not any(v.fixed for v in m.vb_y_Pipeline.values())
+    assert not any(v.fixed for v in m.v_L_Storage.values())
+    with nostdout():
+        assert is_feasible(m)
+
+    with pytest.raises(Exception):
+        solve_rolling_horizon(m, window=2, overlap=2)
+
+
+@pytest.mark.component
+def test_run_reduced_strategic_model_tight_big_m(build_reduced_strategic_model):
+    m = build_reduced_strategic_model(
+        config_dict={
+            "objective": Objectives.cost,
+            "pipeline_cost": PipelineCost.distance_based,
+            "pipeline_capacity": PipelineCapacity.input,
+            "water_quality": WaterQuality.false,
+            "big_m": BigM.tight,
+        }
+    )
+    M_Flow = pyo.value(m.p_M_Flow)
+    max_expansion = max(pyo.value(m.p_delta_Pipeline[d]) for d in m.s_D)
+    for (l, l_tilde), M in m.p_M_Flow_Piped.items():
+        if l in m.s_O or l in m.s_K or l_tilde in m.s_F:
+            assert pyo.value(M) == M_Flow
+        elif (l_tilde, l) not in m.s_LLA:
+            assert pyo.value(M) == pytest.approx(
+                min(pyo.value(m.p_sigma_Pipeline[l, l_tilde]) + max_expansion, M_Flow)
+            )
+    assert all(pyo.value(M) <= M_Flow for M in m.p_M_Flow_Treatment.values())
+    assert any(pyo.value(M) < M_Flow for M in m.p_M_Flow_Piped.values())
+
+    options = {
+        "deactivate_slacks": True,
+        "scale_model": False,
+        "running_time": 60 * 5,
+        "gap": 0,
+    }
+    results = solve_model(model=m, options=options)
+
+    assert results.solver.termination_condition == pyo.TerminationCondition.optimal
+    # tight big-M values do not cut off the optimal solution
+    assert pytest.approx(88199.598, abs=1e-1) == pyo.value(m.v_Z)
+
+
+@pytest.mark.component
+def test_run_reduced_strategic_model_variable_bounds(build_reduced_strategic_model):
+    m = build_reduced_strategic_model(
+        config_dict={
+            "objective": Objectives.cost,
+            "pipeline_cost": PipelineCost.distance_based,
+            "pipeline_capacity": PipelineCapacity.input,
+            "water_quality": WaterQuality.false,
+            "variable_bounds": True,
+        }
+    )
+    assert all(v.ub is None for v in m.v_F_Trucked.values())
+
+    options = {
+        "deactivate_slacks": True,
+        "scale_model": False,
+        "running_time": 60 * 5,
+        "gap": 0,
+    }
+    results = solve_model(model=m, options=options)
+
+    assert results.solver.termination_condition == pyo.TerminationCondition.optimal
+    for var in (
+        m.v_F_Trucked,
+        m.v_L_Storage,
+        m.v_F_DisposalDestination,
+        m.v_F_TreatmentFeed,
+        m.v_D_Capacity,
+        m.v_T_Capacity,
+        m.v_C_Disposal,
+    ):
+        assert all(v.ub is not None for v in var.values())
+    # the bounds do not cut off the optimal solution
+    assert pytest.approx(88199.598, abs=1e-1) == pyo.value(m.v_Z)
+
+
+@pytest.mark.component
+def test_model_template(build_reduced_strategic_model):
+    config_dict = {
+        "objective": Objectives.cost,
+        "pipeline_cost": PipelineCost.distance_based,
+        "pipeline_capacity": PipelineCapacity.input,
+        "water_quality": WaterQuality.false,
+        "variable_bounds": True,
+    }
+    m = build_reduced_strategic_model(config_dict=config_dict)
+    df_sets = m.df_sets
+    df_parameters = dict(m.df_parameters)
+    scenario = dict(df_parameters)
+    scenario["CompletionsDemand"] = {
+        key: 1.02 * val for key, val in df_parameters["CompletionsDemand"].items()
+    }
+    scenario["PipelineOperationalCost"] = {
+        key: 1.5 * val for key, val in df_parameters["PipelineOperationalCost"].items()
+    }
+
+    # The updated Params match the ones of a model built for the scenario
+    update_model_parameters(m, scenario)
+    scenario_model = create_model(df_sets, scenario, config_dict)
+    for param_name in [name for name, _ in updatable_parameters.values()] + [
+        "p_gamma_TotalDemand",
+        "p_beta_TotalProd",
+        "p_chi_DisposalExpansionAllowed",
+    ]:
+        param = getattr(m, param_name)
+        expected = getattr(scenario_model, param_name)
+        for index in expected:
+            assert pytest.approx(value(expected[index])) == value(param[index])
+
+    # Data that changes the structure of the model is rejected
+    structural_change = dict(scenario)
+    structural_change["DisposalCapacityIncrements"] = {
+        key: val + 1 for key, val in df_parameters["DisposalCapacityIncrements"].items()
+    }
+    with pytest.raises(Exception, match="DisposalCapacityIncrements"):
+        update_model_parameters(m, structural_change)
+
+    # The template is reset between the scenarios
+    options = {
+        "deactivate_slacks": True,
+        "scale_model": False,
+        "running_time": 60 * 5,
+        "gap": 0,
+    }
+    template = ModelTemplate(df_sets, df_parameters, config_dict)
+    for parameters, objective in (
+        (scenario, 91598.263),
+        (df_parameters, 88199.598),
+    ):
+        instance = template.instantiate(parameters)
+        assert instance is template.model
+        assert not instance.v_S_FracDemand[next(iter(instance.v_S_FracDemand))].fixed
+        results = solve_model(model=instance, options=options)
+        assert results.solver.termination_condition == pyo.TerminationCondition.optimal
+        assert pytest.approx(objective, abs=1e-1) == pyo.value(instance.v_Z)
+
+
 @pytest.mark.component
 def test_water_quality_reduced_strategic_model_removal_concentration(
     build_reduced_strategic_model,
@@ -1423,7 +1876,7 @@ def test_basic_toy_build(build_toy_strategic_model):
     )
     assert degrees_of_freedom(m) == 7237
     # Check unit config arguments
-    assert len(m.config) == 8
+    assert len(m.config) == 12
     assert m.config.objective
     assert isinstance(m.s_T, pyo.Set)
     assert isinstance(m.v_F_Piped, pyo.Var)
@@ -1597,7 +2050,7 @@ def test_basic_permian_demo_build(build_permian_demo_strategic_model):
     )
     assert degrees_of_freedom(m) == 20955
     # Check unit config arguments
-    assert len(m.config) == 8
+    assert len(m.config) == 12
     assert m.config.objective
     assert isinstance(m.s_T, pyo.Set)
     assert isinstance(m.v_F_Piped, pyo.Var)
@@ -1822,7 +2275,7 @@ def test_workshop_build(build_workshop_strategic_model):
     )
     assert degrees_of_freedom(m) == 3973
     # Check unit config arguments
-    assert len(m.config) == 8
+    assert len(m.config) == 12
     assert m.config.objective
     assert isinstance(m.s_T, pyo.Set)
     assert isinstance(m.v_F_Piped, pyo.Var)
@@ -27,16 +27,27 @@ from pareto.strategic_water_management.strategic_produced_water_optimization imp
 )
 from pareto.utilities.get_data import get_data
 from pareto.utilities.results import is_feasible, nostdout
+from pareto.utilities.results import feasibility_audit, summarize_feasibility_audit
+from pareto.utilities.results import _conversion_factor, _write_excel_report
+from pareto.utilities.results import _write_parquet_report, read_report
 from importlib import resources
 
 import pyomo.environ as pyo
 from pyomo.environ import value
+import pytest
+import pandas as pd
 
 # Modules to test:
 from pareto.utilities.bounding_functions import VariableBounds
 from pareto.utilities.model_modifications import free_variables
 from pareto.utilities.model_modifications import deactivate_slacks
 from pareto.utilities.model_modifications import fix_vars
+from pareto.utilities.model_modifications import (
+    snapshot_variable_state,
+    restore_variable_state,
+    fix_all_except,
+    bound_around_solution,
+)
 
 
 ############################
@@ -392,6 +403,184 @@ def test_fix_vars():
         assert is_feasible(model)
 
 
+############################
+def test_bulk_variable_state():
+    model = pyo.ConcreteModel()
+    model.s_I = pyo.Set(initialize=["A", "B", "C"])
+    model.x = pyo.Var(model.s_I, bounds=(0, 100))
+    model.y = pyo.Var(model.s_I, within=pyo.Binary)
+    model.b = pyo.Block()
+    model.b.z = pyo.Var(initialize=5)
+    model.x["A"].value = 10
+    model.x["B"].value = 1e-9
+    model.y["A"].value = 0.9999
+    model.y["B"].fix(0)
+
+    state = snapshot_variable_state(model, exclude=["b.z"])
+
+    # Bound around the current solution, variables without a value are unchanged
+    bound_around_solution(model, exclude=["b.z"], rel_tol=0.1)
+    assert model.x["A"].bounds == (pytest.approx(9), pytest.approx(11))
+    assert model.x["C"].bounds == (0, 100)
+    assert model.y["A"].fixed and model.y["A"].value == 1
+    assert not model.y["C"].fixed
+    assert model.b.z.bounds == (None, None)
+
+    # Fix all variables, small values and variables without a value are fixed to 0
+    fix_all_except(model, exclude=["y"], zero_tol=1e-7)
+    assert model.x["A"].fixed and model.x["A"].value == 10
+    assert model.x["B"].fixed and model.x["B"].value == 0
+    assert model.x["C"].fixed and model.x["C"].value == 0
+    assert model.b.z.fixed and model.b.z.value == 5
+    assert not model.y["C"].fixed
+
+    # Restore bounds and fixed status, but keep the current values
+    model.x["A"].value = 20
+    restore_variable_state(state)
+    assert model.x["A"].bounds == (0, 100)
+    assert not model.x["A"].fixed and model.x["A"].value == 20
+    assert not model.y["A"].fixed
+    assert model.y["B"].fixed
+    assert model.b.z.fixed
+
+    restore_variable_state(state, restore_values=True)
+    assert model.x["A"].value == 10
+    assert model.x["C"].value is None
+
+
+############################
+def test_report_conversion_and_excel_writer(tmp_path):
+    factor = _conversion_factor(
+        pyo.units.m**3 / pyo.units.day, pyo.units.m**3 / pyo.units.week
+    )
+    assert factor == pytest.approx(7)
+
+    headers = {
+        "v_F_Overview_dict": [
+            ("Variable Name", "Documentation", "Unit", "Total"),
+            ("v_Z", "Objective", "USD", 10.5),
+        ],
+        "v_F_Piped_dict": [
+            ("Origin", "Destination", "Time", "Piped water"),
+            ("N01", "N02", "T01", 2.0),
+            ("PROPRIETARY DATA",),
+        ],
+        "v_L_Storage_dict": [("Storage site", "Time", "Storage Levels")],
+    }
+    fname = tmp_path / "report.xlsx"
+    _write_excel_report(fname, headers)
+
+    sheets = pd.read_excel(fname, sheet_name=None, header=1)
+    assert list(sheets) == ["v_F_Overview", "v_F_Piped", "v_L_Storage"]
+    assert list(sheets["v_F_Piped"].columns) == list(headers["v_F_Piped_dict"][0])
+    assert sheets["v_F_Piped"].iloc[0].tolist() == ["N01", "N02", "T01", 2.0]
+    assert sheets["v_F_Piped"].iloc[1, 0] == "PROPRIETARY DATA"
+    assert sheets["v_F_Overview"]["Total"].tolist() == [10.5]
+    assert sheets["v_L_Storage"].empty
+
+
+############################
+def test_parquet_report(tmp_path):
+    pytest.importorskip("pyarrow")
+    headers = {
+        "v_F_Overview_dict": [
+            ("Variable Name", "Documentation", "Unit", "Total"),
+            ("v_Z", "Objective", "USD", 10.5),
+            ("reuse_WaterKPI", "Reuse Fraction", None, 20.0),
+        ],
+        "vb_y_overview_dict": [
+            ("CAPEX Type", "Location", "Build Lead Time"),
+            ("Pipeline Construction", "N01", 2),
+            ("Storage Facility", "S01", "--"),
+        ],
+        "hydraulics.v_term_dict": [
+            ("Location", "Location", "Time", "Term Value"),
+            ("N01", "N02", "T01", 1.5),
+            ("PROPRIETARY DATA",),
+        ],
+        "v_L_Storage_dict": [("Storage site", "Time", "Storage Levels")],
+    }
+    fname = tmp_path / "report.parquet"
+    _write_parquet_report(fname, headers)
+
+    results_dict = read_report(fname)
+    assert list(results_dict) == list(headers)
+    assert results_dict["v_F_Overview_dict"] == headers["v_F_Overview_dict"]
+    # columns mixing numbers and text are stored as text
+    assert results_dict["vb_y_overview_dict"][1:] == [
+        ("Pipeline Construction", "N01", "2"),
+        ("Storage Facility", "S01", "--"),
+    ]
+    assert results_dict["hydraulics.v_term_dict"] == [
+        ("Location", "Location", "Time", "Term Value"),
+        ("N01", "N02", "T01", 1.5),
+        ("PROPRIETARY DATA", None, None, None),
+    ]
+    assert results_dict["v_L_Storage_dict"] == headers["v_L_Storage_dict"]
+
+    # Each sheet is a regular Parquet file, repeated column names are made unique
+    df = pd.read_parquet(fname / "hydraulics.v_term.parquet", columns=["Location.1"])
+    assert df["Location.1"].tolist() == ["N02", None]
+
+    results_dict = read_report(fname, sheets=["v_F_Overview"])
+    assert list(results_dict) == ["v_F_Overview_dict"]
+
+
+############################
+def test_feasibility_audit():
+    model = pyo.ConcreteModel()
+    model.s_T = pyo.Set(initialize=["T01", "T02", "T03"])
+    model.s_I = pyo.Set(initialize=["A", "B"])
+    model.x = pyo.Var(model.s_I, model.s_T, bounds=(0, 10), initialize=1)
+    model.y = pyo.Var(model.s_I, within=pyo.Binary, initialize=1)
+    model.Balance = pyo.Constraint(
+        model.s_I, model.s_T, rule=lambda m, i, t: m.x[i, t] <= 5 * m.y[i]
+    )
+    model.Square = pyo.Constraint(expr=model.x["A", "T01"] ** 2 <= 50)
+    model.Total = pyo.Constraint(
+        model.s_T, rule=lambda m, t: sum(m.x[i, t] for i in m.s_I) == 2
+    )
+
+    report = feasibility_audit(model)
+    assert report.empty
+    with nostdout():
+        assert is_feasible(model)
+
+    model.x["A", "T01"].value = 8
+    model.x["B", "T03"].value = 12
+    model.y["B"].value = 0.5
+    report = feasibility_audit(model)
+    # all violations are reported, largest first
+    assert list(report["Violation"]) == pytest.approx([14, 11, 9.5, 7, 3, 2, 0.5])
+    assert list(report["Family"]) == [
+        "Square",
+        "Total",
+        "Balance",
+        "Total",
+        "Balance",
+        "x",
+        "y",
+    ]
+    assert list(report["Type"][-2:]) == ["Bound", "Integrality"]
+    assert list(report["Period"]) == [None, "T03", "T03", "T01", "T01", "T03", None]
+    assert report["Index"][2] == ("B", "T03")
+
+    summary = summarize_feasibility_audit(report)
+    total = summary[(summary["Family"] == "Total")]
+    assert list(total["Period"]) == ["T03", "T01"]
+    assert total["Count"].sum() == 2
+    assert summary["Count"].sum() == len(report)
+    with nostdout():
+        assert not is_feasible(model)
+
+    # variables without a value are reported with an undefined violation
+    model.x["A", "T02"].value = None
+    report = feasibility_audit(model)
+    undefined = report[report["Violation"].isna()]
+    assert set(undefined["Family"]) == {"x", "Balance", "Total"}
+    assert report["Violation"].isna().iloc[-1]
+
+
 ############################
 if __name__ == "__main__":
     test_utilities_wout_quality()
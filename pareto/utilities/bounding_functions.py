@@ -22,6 +22,7 @@ from pyomo.environ import (
     value,
     Any,
 )
+import numpy as np
 
 
 ###############################################################################
@@ -30,16 +31,34 @@ def VariableBounds(model):
     """
     This function adds bounds to variables in an PARETO existing model object.
     At present, the following variables are included:
-        > v_F_Piped
-        > v_Q
-        > v_F_Trucked (NOTE: this is to be included in a future revision, but requires a change within the PARETO Strategic model code)
+        > v_F_Piped, v_F_Trucked and v_F_Sourced
+        > v_L_Storage and v_L_PadStorage
+        > v_F_DisposalDestination
+        > v_F_TreatmentFeed, v_F_ResidualWater and v_F_TreatedWater
+        > v_D_Capacity, v_X_Capacity, v_T_Capacity and v_F_Capacity
+        > v_C_Piped, v_C_Trucked, v_C_Sourced, v_C_Disposal, v_C_Treatment and v_C_Storage
+        > v_Q (post process water quality, once the quality block exists)
+        > v_F_DiscretePiped (discrete water quality)
+
+    The flow bounds are derived from the water entering the system in each
+    period plus the largest inventory that can have accumulated in storage by
+    then. They hold for every solution without circulating flows, so at least
+    one optimal solution is kept. Capacity bounds that depend on a capacity
+    slack are only applied while that slack is fixed to zero.
     """
     model = Bound_v_F_Piped(model)
+    model = Bound_v_F_Trucked(model)
+    model = Bound_v_F_Sourced(model)
+    model = Bound_v_L_Storage(model)
+    model = Bound_v_F_DisposalDestination(model)
+    model = Bound_v_F_Treatment(model)
+    model = Bound_CapacityVariables(model)
+    model = Bound_CostVariables(model)
     if model.config.water_quality is WaterQuality.post_process:
-        model = Bound_v_Q_PP(model)
+        if hasattr(model, "quality"):
+            model = Bound_v_Q_PP(model)
     elif model.config.water_quality is WaterQuality.discrete:
         model = Bound_v_F_DiscretePiped(model)
-        # model = Bound_v_F_Trucked(model) # TODO: resolve unit problem with p_max_number_of_trucks - it must be week^-1 to make the units work out
     elif model.config.water_quality is WaterQuality.false:
         pass
     else:
@@ -47,6 +66,115 @@ def VariableBounds(model):
     return model
 
 
+###############################################################################
+### Helper functions for the supply based bounds
+def _extract(param):
+    """
+    Returns the values of a parameter as a dictionary, treating the parameter
+    default as zero for the indices that are not stored
+    """
+    return {key: val for key, val in param.extract_values().items() if val is not None}
+
+
+def _supply_bounds(model):
+    """
+    Computes two vectors over s_T:
+        - the largest volume of water that can flow through any arc in a period,
+          i.e., the water entering the system in the period plus the inventory
+          that can have accumulated in storage at the end of the previous period
+        - the largest inventory held in storage at the end of each period, i.e.,
+          the initial storage levels plus the cumulative water entering the system
+    """
+    periods = list(model.s_T)
+    position = {t: i for i, t in enumerate(periods)}
+    entering = np.zeros(len(periods))
+    for param in (
+        model.p_beta_Production,
+        model.p_beta_Flowback,
+        model.p_sigma_ExternalWater,
+    ):
+        for (_, t), val in _extract(param).items():
+            entering[position[t]] += max(val, 0)
+    initial = sum(_extract(model.p_lambda_Storage).values()) + sum(
+        _extract(model.p_lambda_PadStorage).values()
+    )
+    inventory = initial + np.cumsum(entering)
+    flow = entering + np.concatenate(([initial], inventory[:-1]))
+    return dict(zip(periods, flow)), dict(zip(periods, inventory))
+
+
+def _arc_flow_bounds(model, arcs):
+    """
+    Returns the flow bound on each (l, l_tilde, t) for the given arcs. Flows
+    leaving a production pad, completions pad or external water source cannot
+    exceed the supply of that node in the period, all other flows are bounded
+    by the water in the system.
+    """
+    flow_ub, _ = _supply_bounds(model)
+    production = _extract(model.p_beta_Production)
+    flowback = _extract(model.p_beta_Flowback)
+    external = _extract(model.p_sigma_ExternalWater)
+    bounds = {}
+    for l, l_tilde in arcs:
+        if l in model.s_PP:
+            supply = production
+        elif l in model.s_CP:
+            supply = flowback
+        elif l in model.s_F:
+            supply = external
+        else:
+            supply = None
+        for t in model.s_T:
+            if supply is None:
+                bounds[l, l_tilde, t] = flow_ub[t]
+            else:
+                bounds[l, l_tilde, t] = max(supply.get((l, t), 0), 0)
+    return bounds
+
+
+def _inflow_bounds(model, nodes, arc_bounds):
+    """
+    Returns the bound on the total flow into each (node, t), i.e., the smaller
+    of the water in the system and the sum of the bounds on the incoming arcs
+    """
+    flow_ub, _ = _supply_bounds(model)
+    bounds = {}
+    for n in nodes:
+        in_arcs = [(l, n) for l in model.s_LLA_In[n]] + [
+            (l, n) for l in model.s_LLT_In[n]
+        ]
+        for t in model.s_T:
+            total = sum(arc_bounds[arc + (t,)] for arc in in_arcs)
+            bounds[n, t] = min(total, flow_ub[t])
+    return bounds
+
+
+def _slack_deactivated(slack, index=None):
+    """
+    Returns True if the capacity slack variable on the index is fixed to zero
+    """
+    var = slack if index is None else slack[index]
+    return var.fixed and value(var) == 0
+
+
+def _tighten_upper_bounds(var, bounds):
+    """
+    Applies the bounds (a dictionary from index to value) to a variable
+    component in one pass, keeping any upper bound that is already tighter.
+    Fixed variables are left untouched.
+    """
+    indices = [index for index in bounds if not var[index].fixed]
+    if not indices:
+        return
+    data = [var[index] for index in indices]
+    new = np.fromiter((bounds[index] for index in indices), float, len(indices))
+    current = np.fromiter(
+        (np.inf if v.ub is None else v.ub for v in data), float, len(indices)
+    )
+    for v, ub in zip(data, np.maximum(np.minimum(new, current), 0)):
+        v.setub(float(ub))
+
+
 ###############################################################################
 ### Individual variable bound generation functions
 def Bound_v_F_Piped(model):
@@ -68,28 +196,227 @@ def Bound_v_F_Piped(model):
                     [value(model.p_delta_Pipeline[d]) for d in model.s_D]
                 )
 
-    # Set up bounds in a parameter
-    model.p_F_Piped_UB = Param(
-        model.s_LLA,
-        default=None,
-        mutable=True,
-        within=Any,
-        initialize=p_F_Piped_UB_init,
-        units=model.model_units["volume_time"],
-        doc="Maximum pipeline capacity between nodes [volume_time]",
-    )
+    # Set up bounds in a parameter (once, so that the bounds can be reapplied)
+    if not hasattr(model, "p_F_Piped_UB"):
+        model.p_F_Piped_UB = Param(
+            model.s_LLA,
+            default=None,
+            mutable=True,
+            within=Any,
+            initialize=p_F_Piped_UB_init,
+            units=model.model_units["volume_time"],
+            doc="Maximum pipeline capacity between nodes [volume_time]",
+        )
     # Assign upper bounds to variables; note that using a bounds rule would require redefining the variable
     for key in model.s_LLA:
         model.v_F_Piped[key, :].setub(model.p_F_Piped_UB[key])
+    # Flows can never exceed the supply available in the period
+    _tighten_upper_bounds(model.v_F_Piped, _arc_flow_bounds(model, model.s_LLA))
     return model
 
 
 def Bound_v_F_Trucked(model):
-    for key in model.s_LLT:
+    # Trucked flows are not limited by a capacity, so only the supply bounds apply
+    _tighten_upper_bounds(model.v_F_Trucked, _arc_flow_bounds(model, model.s_LLT))
+    return model
+
+
+def Bound_v_F_Sourced(model):
+    external = _extract(model.p_sigma_ExternalWater)
+    _tighten_upper_bounds(
+        model.v_F_Sourced,
+        {(f, p, t): external.get((f, t), 0) for f, p, t in model.v_F_Sourced},
+    )
+    return model
+
+
+def Bound_v_L_Storage(model):
+    _, inventory_ub = _supply_bounds(model)
+    max_storage_expansion = max(
+        [value(model.p_delta_Storage[c]) for c in model.s_C], default=0
+    )
+    bounds = {}
+    for s in model.s_S:
         for t in model.s_T:
-            model.v_F_Trucked[key, t].setub(
-                model.p_delta_Truck * model.p_max_number_of_trucks
+            bounds[s, t] = inventory_ub[t]
+            if _slack_deactivated(model.v_S_StorageCapacity, s):
+                bounds[s, t] = min(
+                    bounds[s, t],
+                    value(model.p_sigma_Storage[s]) + max_storage_expansion,
+                )
+    _tighten_upper_bounds(model.v_L_Storage, bounds)
+    _tighten_upper_bounds(
+        model.v_L_PadStorage,
+        {
+            (p, t): min(inventory_ub[t], value(model.p_sigma_PadStorage[p]))
+            for p in model.s_CP
+            for t in model.s_T
+        },
+    )
+    return model
+
+
+def Bound_v_F_DisposalDestination(model):
+    arc_bounds = {
+        **_arc_flow_bounds(model, model.s_LLA),
+        **_arc_flow_bounds(model, model.s_LLT),
+    }
+    bounds = _inflow_bounds(model, model.s_K, arc_bounds)
+    for k in model.s_K:
+        if _slack_deactivated(model.v_S_DisposalCapacity, k):
+            capacity = _disposal_capacity_bound(model, k)
+            for t in model.s_T:
+                bounds[k, t] = min(bounds[k, t], capacity)
+    _tighten_upper_bounds(model.v_F_DisposalDestination, bounds)
+    return model
+
+
+def Bound_v_F_Treatment(model):
+    arc_bounds = {
+        **_arc_flow_bounds(model, model.s_LLA),
+        **_arc_flow_bounds(model, model.s_LLT),
+    }
+    bounds = _inflow_bounds(model, model.s_R, arc_bounds)
+    for r in model.s_R:
+        capacity = _treatment_capacity_bound(model, r)
+        for t in model.s_T:
+            bounds[r, t] = min(bounds[r, t], capacity)
+    # Residual and treated water are both fractions of the treatment feed
+    for var in (
+        model.v_F_TreatmentFeed,
+        model.v_F_ResidualWater,
+        model.v_F_TreatedWater,
+    ):
+        _tighten_upper_bounds(var, bounds)
+    return model
+
+
+def _disposal_capacity_bound(model, k):
+    expansion = max([value(model.p_delta_Disposal[k, i]) for i in model.s_I], default=0)
+    return value(model.p_sigma_Disposal[k]) + expansion * value(
+        model.p_chi_DisposalExpansionAllowed[k]
+    )
+
+
+def _treatment_capacity_bound(model, r):
+    # Exactly one technology and size is selected at every treatment site
+    return max(
+        [
+            value(model.p_sigma_Treatment[r, wt])
+            + max([value(model.p_delta_Treatment[wt, j]) for j in model.s_J])
+            for wt in model.s_WT
+        ],
+        default=0,
+    )
+
+
+def Bound_CapacityVariables(model):
+    _tighten_upper_bounds(
+        model.v_T_Capacity,
+        {r: _treatment_capacity_bound(model, r) for r in model.s_R},
+    )
+    _tighten_upper_bounds(
+        model.v_D_Capacity,
+        {
+            k: _disposal_capacity_bound(model, k)
+            for k in model.s_K
+            if _slack_deactivated(model.v_S_DisposalCapacity, k)
+        },
+    )
+    max_storage_expansion = max(
+        [value(model.p_delta_Storage[c]) for c in model.s_C], default=0
+    )
+    _tighten_upper_bounds(
+        model.v_X_Capacity,
+        {
+            s: value(model.p_sigma_Storage[s]) + max_storage_expansion
+            for s in model.s_S
+            if _slack_deactivated(model.v_S_StorageCapacity, s)
+        },
+    )
+    if hasattr(model, "p_F_Piped_UB"):
+        _tighten_upper_bounds(
+            model.v_F_Capacity,
+            {
+                key: value(model.p_F_Piped_UB[key])
+                for key in model.s_LLA
+                if _slack_deactivated(model.v_S_PipelineCapacity, key)
+            },
+        )
+    return model
+
+
+def Bound_CostVariables(model):
+    """
+    Bounds the cost variables by the largest flow they are charged on times the
+    unit cost. Only the indices on which the defining cost constraint exists
+    are bounded.
+    """
+    piped = _arc_flow_bounds(model, model.s_LLA)
+    trucked = _arc_flow_bounds(model, model.s_LLT)
+    arc_bounds = {**piped, **trucked}
+
+    def unit_cost(expr):
+        return max(value(expr), 0)
+
+    external = _extract(model.p_sigma_ExternalWater)
+    _tighten_upper_bounds(
+        model.v_C_Piped,
+        {
+            (l, l_tilde, t): (
+                external.get((l, t), 0) if l in model.s_F else piped[l, l_tilde, t]
+            )
+            * unit_cost(model.p_pi_Pipeline[l, l_tilde])
+            for l, l_tilde, t in model.PipingCost
+        },
+    )
+    _tighten_upper_bounds(
+        model.v_C_Trucked,
+        {
+            (l, l_tilde, t): trucked[l, l_tilde, t]
+            * unit_cost(
+                1
+                / model.p_delta_Truck
+                * model.p_tau_Trucking[l, l_tilde]
+                * model.p_pi_Trucking[l]
             )
+            for l, l_tilde, t in model.TruckingCost
+        },
+    )
+    # Sourced water (piped and trucked) is limited by the external water availability
+    _tighten_upper_bounds(
+        model.v_C_Sourced,
+        {
+            (f, p, t): external.get((f, t), 0) * unit_cost(model.p_pi_Sourcing[f])
+            for f, p, t in model.ExternalSourcingCost
+        },
+    )
+    disposal = _inflow_bounds(model, model.s_K, arc_bounds)
+    _tighten_upper_bounds(
+        model.v_C_Disposal,
+        {
+            (k, t): disposal[k, t] * unit_cost(model.p_pi_Disposal[k])
+            for k, t in model.DisposalCost
+        },
+    )
+    storage = _inflow_bounds(model, model.s_S, arc_bounds)
+    _tighten_upper_bounds(
+        model.v_C_Storage,
+        {
+            (s, t): storage[s, t] * unit_cost(model.p_pi_Storage[s])
+            for s, t in model.StorageDepositCost
+        },
+    )
+    treatment = _inflow_bounds(model, model.s_R, arc_bounds)
+    _tighten_upper_bounds(
+        model.v_C_Treatment,
+        {
+            (r, t): min(treatment[r, t], _treatment_capacity_bound(model, r))
+            * max([unit_cost(model.p_pi_Treatment[r, wt]) for wt in model.s_WT])
+            for r in model.s_R
+            for t in model.s_T
+        },
+    )
     return model
 
 
@@ -157,16 +484,17 @@ def Bound_v_F_DiscretePiped(model):
             [value(model.p_delta_Pipeline[d]) for d in model.s_D]
         )
 
-    # Set up bounds in a parameter
-    model.p_F_DiscretePiped_UB = Param(
-        model.s_LLA,
-        default=None,
-        mutable=True,
-        within=Any,
-        initialize=p_F_DiscretePiped_UB_init,
-        units=model.model_units["volume_time"],
-        doc="Maximum pipeline capacity between nodes [volume_time]",
-    )
+    # Set up bounds in a parameter (once, so that the bounds can be reapplied)
+    if not hasattr(model, "p_F_DiscretePiped_UB"):
+        model.p_F_DiscretePiped_UB = Param(
+            model.s_LLA,
+            default=None,
+            mutable=True,
+            within=Any,
+            initialize=p_F_DiscretePiped_UB_init,
+            units=model.model_units["volume_time"],
+            doc="Maximum pipeline capacity between nodes [volume_time]",
+        )
     # Assign upper bounds to variables
     for key in model.s_NonPLP:
         for t in model.s_T:
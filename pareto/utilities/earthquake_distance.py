@@ -15,10 +15,13 @@ import os
 import re
 import json
 import csv
+import hashlib
+import numpy as np
 import pandas as pd
 import pyproj
 import urllib.request
 import urllib.error
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 # API documentation: https://earthquake.usgs.gov/fdsnws/event/1/
@@ -96,6 +99,41 @@ def convert_date_to_timestamp(date):
     return date_ts
 
 
+def _cache_file(cache_dir, api, lat, lon, max_radius_mi, min_magnitude):
+    """
+    Return the file that caches the API response for one SWD site. The dates are
+    not part of the key, since they are applied to the response locally.
+    """
+    key = repr((api, float(lat), float(lon), float(max_radius_mi), min_magnitude))
+    return os.path.join(cache_dir, hashlib.sha256(key.encode()).hexdigest() + ".json")
+
+
+def _fetch_earthquakes(url, cache_file=None):
+    """
+    Return the GeoJSON response of the API for url, reading it from cache_file if
+    it exists, and storing it there otherwise
+    """
+    if cache_file is not None and os.path.exists(cache_file):
+        with open(cache_file) as f:
+            return json.load(f)
+
+    try:
+        request = urllib.request.Request(url)
+        with urllib.request.urlopen(request) as f:
+            response = json.load(f)
+    except:
+        raise Exception("API error")
+
+    if cache_file is not None:
+        # Write to a temporary file first so that concurrent lookups never
+        # read a partially written response
+        tmp_file = cache_file + ".%d.tmp" % os.getpid()
+        with open(tmp_file, "w") as f:
+            json.dump(response, f)
+        os.replace(tmp_file, cache_file)
+    return response
+
+
 def calculate_earthquake_distances(
     swd_latlons,
     api="usgs",
@@ -105,8 +143,13 @@ def calculate_earthquake_distances(
     max_date=None,
     save=None,
     overwrite=False,
+    max_workers=1,
+    cache_dir=None,
 ):
     # swd_latlons is a list of dicts with id, lat, and lon
+    # max_workers is the number of API requests that are sent concurrently
+    # cache_dir is a directory where API responses are stored, so that repeated
+    # runs with the same api, coordinates, radius and magnitude do not refetch them
     if api not in ("usgs", "texnet"):
         raise Exception("api must be either usgs or texnet")
 
@@ -128,12 +171,16 @@ def calculate_earthquake_distances(
     else:
         fmt = None
 
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+
     earthquake_distances = []
 
     keys = ("swd_id", "eq_id", "time", "distance_mi", "magnitude")
 
+    urls = []
+    cache_files = []
     for swd_latlon in swd_latlons:
-        swd_id = swd_latlon["swd_id"]
         swd_lat = swd_latlon["lat"]
         swd_lon = swd_latlon["lon"]
         if api == "usgs":
@@ -151,13 +198,33 @@ def calculate_earthquake_distances(
                 max_radius_mi=max_radius_mi,
                 min_magnitude=min_magnitude,
             )
+        urls.append(url)
+        if cache_dir is not None:
+            cache_files.append(
+                _cache_file(
+                    cache_dir, api, swd_lat, swd_lon, max_radius_mi, min_magnitude
+                )
+            )
+        else:
+            cache_files.append(None)
 
-        try:
-            request = urllib.request.Request(url)
-            with urllib.request.urlopen(request) as f:
-                response = json.load(f)
-        except:
-            raise Exception("API error")
+    if max_workers > 1 and len(urls) > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            responses = list(executor.map(_fetch_earthquakes, urls, cache_files))
+    else:
+        responses = [
+            _fetch_earthquakes(url, cache_file)
+            for url, cache_file in zip(urls, cache_files)
+        ]
+
+    # Coordinates of the SWD sites and earthquakes, the distances between them are
+    # calculated at once after all the responses have been processed
+    swd_lons = []
+    swd_lats = []
+    eq_lons = []
+    eq_lats = []
+    for swd_latlon, response in zip(swd_latlons, responses):
+        swd_id = swd_latlon["swd_id"]
         for feat in response["features"]:
             eq_id = feat["id"]
             props = feat["properties"]
@@ -170,20 +237,31 @@ def calculate_earthquake_distances(
                 continue
 
             time = datetime.fromtimestamp(time_ts).strftime("%Y-%m-%d %H:%M:%S")
-            lat = coords[1]
-            lon = coords[0]
+            swd_lons.append(swd_latlon["lon"])
+            swd_lats.append(swd_latlon["lat"])
+            eq_lons.append(coords[0])
+            eq_lats.append(coords[1])
             mag = props["mag"] if api == "usgs" else props["Magnitude"]
-            dist_mi = geod.line_length([swd_lon, lon], [swd_lat, lat]) * mi_per_m
             earthquake_distances.append(
                 {
                     keys[0]: swd_id,
                     keys[1]: eq_id,
                     keys[2]: time,
-                    keys[3]: dist_mi,
+                    keys[3]: None,
                     keys[4]: mag,
                 }
             )
 
+    if earthquake_distances:
+        _, _, dist_m = geod.inv(
+            np.array(swd_lons, dtype=float),
+            np.array(swd_lats, dtype=float),
+            np.array(eq_lons, dtype=float),
+            np.array(eq_lats, dtype=float),
+        )
+        for row, dist in zip(earthquake_distances, (dist_m * mi_per_m).tolist()):
+            row[keys[3]] = dist
+
     if fmt == "csv":
         with open(save, "w", newline="") as f:
             writer = csv.writer(f)
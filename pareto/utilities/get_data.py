@@ -17,11 +17,20 @@ format that Pyomo requires
 Authors: PARETO Team (Andres J. Calderon, Markus G. Drouven)
 """
 
+import hashlib
+import json
+import os
+import pickle
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import requests
 import numpy as np
 import warnings
 
+# Bump this value whenever the output format of get_data() changes so that
+# previously cached workbooks are parsed again
+_CACHE_FORMAT_VERSION = 1
+
 
 def _read_data(_fname, _set_list, _parameter_list):
     """
@@ -185,7 +194,33 @@ def _df_to_param(data_frame, data_column, sum_repeated_indexes):
     return _df_parameters
 
 
-def get_data(fname, set_list, parameter_list, sum_repeated_indexes=False):
+def _cache_key(fname, set_list, parameter_list, sum_repeated_indexes):
+    """
+    Build the key under which the parsed content of a workbook is cached. The key
+    combines the SHA256 hash of the workbook bytes with the requested tabs, so the
+    cached entry is invalidated as soon as the file (or the request) changes.
+    """
+    key = hashlib.sha256()
+    with open(fname, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            key.update(chunk)
+    key.update(
+        repr(
+            (
+                _CACHE_FORMAT_VERSION,
+                pd.__version__,
+                list(set_list),
+                list(parameter_list),
+                sum_repeated_indexes,
+            )
+        ).encode()
+    )
+    return key.hexdigest()
+
+
+def get_data(
+    fname, set_list, parameter_list, sum_repeated_indexes=False, cache_dir=None
+):
     """
     This method uses Pandas methods to read data for Sets and Parameters from excel spreadsheets.
     - Sets are assumed to not have neither a header nor an index column. In addition, the data
@@ -236,7 +271,55 @@ def get_data(fname, set_list, parameter_list, sum_repeated_indexes=False):
 
     It is worth highlighting that the Set for time periods "model.s_T" is derived by the
     method based on the Parameter: CompletionsDemand which is indexed by T
+
+    If cache_dir is specified, the parsed [df_sets, df_parameters] are stored in that
+    directory in binary (pickle) format, keyed by the SHA256 hash of the workbook
+    together with set_list, parameter_list and sum_repeated_indexes. Subsequent calls
+    on an unchanged workbook load the cached result instead of reading the Excel file,
+    and any change to the workbook automatically results in a new cache entry.
     """
+    if cache_dir is not None:
+        cache_file = os.path.join(
+            cache_dir,
+            _cache_key(fname, set_list, parameter_list, sum_repeated_indexes) + ".pkl",
+        )
+        if os.path.isfile(cache_file):
+            with open(cache_file, "rb") as f:
+                [df_sets, df_parameters, cached_warnings] = pickle.load(f)
+            # Re-issue the warnings raised when the workbook was first parsed
+            for message in cached_warnings:
+                warnings.warn(message, UserWarning, stacklevel=2)
+            return [df_sets, df_parameters]
+
+        with warnings.catch_warnings(record=True) as caught_warnings:
+            warnings.simplefilter("always")
+            [df_sets, df_parameters] = get_data(
+                fname, set_list, parameter_list, sum_repeated_indexes
+            )
+        for w in caught_warnings:
+            warnings.warn(w.message, w.category, stacklevel=2)
+
+        os.makedirs(cache_dir, exist_ok=True)
+        # Write to a temporary file first so that concurrent readers never see a
+        # partially written cache entry
+        temp_file = cache_file + ".%d.tmp" % os.getpid()
+        with open(temp_file, "wb") as f:
+            pickle.dump(
+                [
+                    df_sets,
+                    df_parameters,
+                    [
+                        str(w.message)
+                        for w in caught_warnings
+                        if issubclass(w.category, UserWarning)
+                    ],
+                ],
+                f,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        os.replace(temp_file, cache_file)
+        return [df_sets, df_parameters]
+
     # Check all names available in the input sheet
     set_list_common = []
     parameter_list_common = []
@@ -494,6 +577,145 @@ def get_display_units(input_sheet_name_list, user_units):
     return {sheet: unit_dict[sheet] for sheet in input_sheet_name_list}
 
 
+# API services supported by od_matrix()
+osrm_api_url = "https://router.project-osrm.org/table/v1/driving/"
+bing_api_url = "https://dev.virtualearth.net/REST/v1/Routes/DistanceMatrix?"
+
+# Maximum number of origins and destinations sent in one request. The public OSRM
+# server accepts at most 100 coordinates per table request, and Bing Maps at most
+# 2,500 origin-destination pairs per synchronous request
+_od_tile_size = {"open_street_map": 50, "bing_maps": 50}
+
+mi_per_km = 0.621371
+earth_radius_mi = 3958.8
+
+
+def _request_osrm_tile(origin, destination):
+    """
+    Request drive times [h] and distances [mi] between all the origins and
+    destinations of one tile from the Open Street Maps (OSRM) table service
+    """
+    # This API works with GET requests. The general format is:
+    # https://router.project-osrm.org/table/v1/driving/Lat1,Long1;Lat2,Long2?sources=index1;index2&destinations=index1;index2&annotations=[duration|distance|duration,distance]
+    locations = list(origin.values()) + list(destination.values())
+    coordinates = ";".join(
+        str(loc["longitude"]) + "," + str(loc["latitude"]) for loc in locations
+    )
+    origin_index = ";".join(str(index) for index in range(len(origin)))
+    destination_index = ";".join(
+        str(index + len(origin)) for index in range(len(destination))
+    )
+    response = requests.get(
+        osrm_api_url
+        + coordinates
+        + "?sources="
+        + origin_index
+        + "&destinations="
+        + destination_index
+        + "&annotations=duration,distance"
+    )
+    if response.ok:
+        # Ensure HTTP Status code is less than 400
+        response_json = response.json()
+    else:
+        raise Warning(
+            "Error when requesting data, make sure your coordinates are correct"
+        )
+    if response_json["code"].lower() != "ok":
+        raise Warning("Error when requesting data, make sure your API key is valid")
+
+    results = {}
+    for index_i, o_name in enumerate(origin):
+        for index_j, d_name in enumerate(destination):
+            results[(o_name, d_name)] = (
+                response_json["durations"][index_i][index_j] / 3600,
+                (response_json["distances"][index_i][index_j] / 1000) * mi_per_km,
+            )
+    return results
+
+
+def _request_bing_tile(origin, destination, api_key):
+    """
+    Request drive times [h] and distances [mi] between all the origins and
+    destinations of one tile from the Bing Maps distance matrix service
+    """
+    # Formating origin and destination dicts for Bing Maps POST request, that is, converting this structure:
+    # origin={origin1:{"latitude":value1, "longitude":value2},
+    #           origin2:{"latitude":value3, "longitude":value4}}
+    # Into the following structure:
+    # data={"origins":[{"latitude":value1, "longitude":value2},
+    #                   {"latitude":value3, "longitude":value4}], ...}
+    data = {
+        "origins": [
+            {"latitude": loc["latitude"], "longitude": loc["longitude"]}
+            for loc in origin.values()
+        ],
+        "destinations": [
+            {"latitude": loc["latitude"], "longitude": loc["longitude"]}
+            for loc in destination.values()
+        ],
+        "travelMode": "driving",
+    }
+
+    # Sending a POST request to the API
+    header = {"Content-Type": "application/json"}
+    response = requests.post(bing_api_url + "key=" + api_key, headers=header, json=data)
+    if response.ok:
+        # Ensure HTTP Status code is less than 400
+        response_json = response.json()
+    else:
+        raise Warning(
+            "Error when requesting data, make sure your API key and coordinates"
+            " are correct"
+        )
+    if response_json["statusDescription"].lower() != "ok":
+        raise Warning("Error when requesting data, make sure your API key is valid")
+
+    origin_names = list(origin.keys())
+    destination_names = list(destination.keys())
+    results = {}
+    for data_temp in response_json["resourceSets"][0]["resources"][0]["results"]:
+        o_name = origin_names[data_temp["originIndex"]]
+        d_name = destination_names[data_temp["destinationIndex"]]
+        results[(o_name, d_name)] = (
+            data_temp["travelDuration"] / 60,
+            data_temp["travelDistance"] * mi_per_km,
+        )
+    return results
+
+
+def _great_circle_tile(origin, destination, road_factor, average_speed):
+    """
+    Estimate drive distances [mi] as the great-circle (haversine) distance times a
+    road factor, and drive times [h] from the average driving speed [mi/h]
+    """
+    o_lat = np.radians([float(loc["latitude"]) for loc in origin.values()])[:, None]
+    o_lon = np.radians([float(loc["longitude"]) for loc in origin.values()])[:, None]
+    d_lat = np.radians([float(loc["latitude"]) for loc in destination.values()])
+    d_lon = np.radians([float(loc["longitude"]) for loc in destination.values()])
+    a = (
+        np.sin((d_lat - o_lat) / 2) ** 2
+        + np.cos(o_lat) * np.cos(d_lat) * np.sin((d_lon - o_lon) / 2) ** 2
+    )
+    distance = 2 * earth_radius_mi * np.arcsin(np.sqrt(a)) * road_factor
+
+    results = {}
+    for index_i, o_name in enumerate(origin):
+        for index_j, d_name in enumerate(destination):
+            dist = float(distance[index_i, index_j])
+            results[(o_name, d_name)] = (dist / average_speed, dist)
+    return results
+
+
+def _od_cache_key(o_location, d_location):
+    return "{0!r},{1!r};{2!r},{3!r}".format(
+        float(o_location["latitude"]),
+        float(o_location["longitude"]),
+        float(d_location["latitude"]),
+        float(d_location["longitude"]),
+    )
+
+
 def od_matrix(inputs):
 
     """
@@ -514,6 +736,22 @@ def od_matrix(inputs):
                 Bing maps: https://docs.microsoft.com/en-us/bingmaps/rest-services/
                 Open Street Maps: https://www.openstreetmap.org/
                 If no API is selected, Open Street Maps is used by default
+                'great_circle' can be selected to work offline, see road_factor
+
+    - road_factor, average_speed:   OPTIONAL. Used for the offline 'great_circle' estimate, drive
+                distances are the great-circle distances times road_factor (default 1.3), and drive
+                times are computed with average_speed in mi/h (default 40)
+
+    - fallback: OPTIONAL. If True, the 'great_circle' estimate is used for the locations that
+                could not be requested from the API, instead of raising an exception
+
+    - tile_size:    OPTIONAL. Maximum number of origins and destinations sent to the API in one
+                request, large matrices are split into tiles of this size
+
+    - max_workers:  OPTIONAL. Number of tiles requested concurrently, the default is 1
+
+    - cache_dir:    OPTIONAL. Directory where the drive times and distances returned by the API
+                are stored per origin-destination pair, so only new pairs are requested
 
     - api_key:  An API key should be provided in order to use Bing maps. The key can be obtained at:
                 https://www.microsoft.com/en-us/maps/create-a-bing-maps-key
@@ -545,6 +783,12 @@ def od_matrix(inputs):
         "output": None,
         "fpath": None,
         "create_report": True,
+        "road_factor": 1.3,
+        "average_speed": 40,
+        "fallback": False,
+        "tile_size": None,
+        "max_workers": 1,
+        "cache_dir": None,
     }
 
     for i in inputs_default.keys():
@@ -559,14 +803,12 @@ def od_matrix(inputs):
     create_report = inputs["create_report"]
 
     # Check that a valid API service has been selected and make sure an api_key was provided
-    if api in ("open_street_map", None):
-        api_url_base = "https://router.project-osrm.org/table/v1/driving/"
-
-    elif api == "bing_maps":
-        api_url_base = "https://dev.virtualearth.net/REST/v1/Routes/DistanceMatrix?"
+    if api is None:
+        api = "open_street_map"
+    if api == "bing_maps":
         if api_key is None:
             raise Warning("Please provide a valid api_key")
-    else:
+    elif api not in ("open_street_map", "great_circle"):
         raise Warning("{0} API service is not supported".format(api))
 
     # If no destinations were provided, it is assumed that the origins are also destinations
@@ -610,159 +852,109 @@ def od_matrix(inputs):
         destination = destination_dict
 
     # =======================================================================
-    #                           SELECTING API
+    #                     REQUESTING DRIVE TIMES AND DISTANCES
     # =======================================================================
+    # results contains (drive time [h], drive distance [mi]) per (origin, destination)
+    results = {}
 
-    if api in (None, "open_street_map"):
-        # This API works with GET requests. The general format is:
-        # https://router.project-osrm.org/table/v1/driving/Lat1,Long1;Lat2,Long2?sources=index1;index2&destinations=index1;index2&annotations=[duration|distance|duration,distance]
-        coordinates = ""
-        origin_index = ""
-        destination_index = ""
-        # Building strings for coordinates, source indices, and destination indices
-        for index, location in enumerate(origin.keys()):
-            coordinates += (
-                str(origin[location]["longitude"])
-                + ","
-                + str(origin[location]["latitude"])
-                + ";"
-            )
-            origin_index += str(index) + ";"
-
-        for index, location in enumerate(destination.keys()):
-            coordinates += (
-                str(destination[location]["longitude"])
-                + ","
-                + str(destination[location]["latitude"])
-                + ";"
-            )
-            destination_index += str(index + len(origin)) + ";"
-
-        # Dropping the last character ";" of each string so the API get request is valid
-        coordinates = coordinates[:-1]
-        origin_index = origin_index[:-1]
-        destination_index = destination_index[:-1]
-        response = requests.get(
-            api_url_base
-            + coordinates
-            + "?sources="
-            + origin_index
-            + "&destinations="
-            + destination_index
-            + "&annotations=duration,distance"
-        )
-        if response.ok:
-            # Ensure HTTP Status code is less than 400
-            response_json = response.json()
-        else:
-            raise Warning(
-                "Error when requesting data, make sure your coordinates are correct"
-            )
-
-        df_times = pd.DataFrame(
-            index=list(origin.keys()), columns=list(destination.keys())
-        )
-        df_distance = pd.DataFrame(
-            index=list(origin.keys()), columns=list(destination.keys())
+    if api == "great_circle":
+        results = _great_circle_tile(
+            origin, destination, inputs["road_factor"], inputs["average_speed"]
         )
-        output_times = {}
-        output_distance = {}
-
-        # Loop for reading the output JSON file
-        if response_json["code"].lower() == "ok":
-            for index_i, o_name in enumerate(origin):
-                for index_j, d_name in enumerate(destination):
-
-                    output_times[(o_name, d_name)] = (
-                        response_json["durations"][index_i][index_j] / 3600
+    else:
+        # Pairs that were requested before are read from the cache, which is keyed
+        # by coordinates so that renaming a location does not invalidate it
+        cache = {}
+        cache_file = None
+        if inputs["cache_dir"] is not None:
+            os.makedirs(inputs["cache_dir"], exist_ok=True)
+            cache_file = os.path.join(inputs["cache_dir"], "od_" + api + ".json")
+            if os.path.exists(cache_file):
+                with open(cache_file) as f:
+                    cache = json.load(f)
+            for o_name, o_location in origin.items():
+                for d_name, d_location in destination.items():
+                    key = _od_cache_key(o_location, d_location)
+                    if key in cache:
+                        results[(o_name, d_name)] = tuple(cache[key])
+
+        # Split the origins and destinations into tiles that the API accepts and
+        # only request the tiles that contain pairs missing from the cache
+        tile_size = inputs["tile_size"] or _od_tile_size[api]
+        origin_names = list(origin.keys())
+        destination_names = list(destination.keys())
+        tiles = []
+        for i in range(0, len(origin_names), tile_size):
+            for j in range(0, len(destination_names), tile_size):
+                o_tile = origin_names[i : i + tile_size]
+                d_tile = destination_names[j : j + tile_size]
+                o_missing = [
+                    o for o in o_tile if any((o, d) not in results for d in d_tile)
+                ]
+                d_missing = [
+                    d for d in d_tile if any((o, d) not in results for o in o_missing)
+                ]
+                if o_missing:
+                    tiles.append(
+                        (
+                            {o: origin[o] for o in o_missing},
+                            {d: destination[d] for d in d_missing},
+                        )
                     )
-                    output_distance[(o_name, d_name)] = (
-                        response_json["distances"][index_i][index_j] / 1000
-                    ) * 0.621371
-
-                    df_times.loc[o_name, d_name] = output_times[(o_name, d_name)]
-                    df_distance.loc[o_name, d_name] = output_distance[(o_name, d_name)]
-        else:
-            raise Warning("Error when requesting data, make sure your API key is valid")
-
-    elif api == "bing_maps":
-        # Formating origin and destination dicts for Bing Maps POST request, that is, converting this structure:
-        # origin={origin1:{"latitude":value1, "longitude":value2},
-        #           origin2:{"latitude":value3, "longitude":value4}}
-        # destination={destination1:{"latitude":value5, "longitude":value6,
-        #               destination2:{"latitude":value7, "longitude":value8}}
-        # Into the following structure:
-        # data={"origins":[{"latitude":value1, "longitude":value2},
-        #                   {"latitude":value3, "longitude":value4}],
-        #       "destinations":[{"latitude":value5, "longitude":value6},
-        #                       {"latitude":value7, "longitude":value8}]}
-
-        origins_post = []
-        destinations_post = []
-        for i in origin.keys():
-            origins_post.append(
-                {"latitude": origin[i]["latitude"], "longitude": origin[i]["longitude"]}
-            )
 
-        for i in destination.keys():
-            destinations_post.append(
-                {"latitude": origin[i]["latitude"], "longitude": origin[i]["longitude"]}
+        def _request_tile(tile):
+            try:
+                if api == "open_street_map":
+                    return _request_osrm_tile(*tile), True
+                else:
+                    return _request_bing_tile(*tile, api_key), True
+            except Exception:
+                if not inputs["fallback"]:
+                    raise
+            estimate = _great_circle_tile(
+                *tile, inputs["road_factor"], inputs["average_speed"]
             )
+            return estimate, False
 
-        # Building the dictionary with the adequate structure compatible with Bing Maps
-        data = {
-            "origins": origins_post,
-            "destinations": destinations_post,
-            "travelMode": "driving",
-        }
-
-        # Sending a POST request to the API
-        header = {"Content-Type": "application/json"}
-        response = requests.post(
-            api_url_base + "key=" + api_key, headers=header, json=data
-        )
-        if response.ok:
-            # Ensure HTTP Status code is less than 400
-            response_json = response.json()
+        if inputs["max_workers"] > 1 and len(tiles) > 1:
+            with ThreadPoolExecutor(max_workers=inputs["max_workers"]) as executor:
+                tile_results = list(executor.map(_request_tile, tiles))
         else:
-            raise Warning(
-                "Error when requesting data, make sure your API key and coordinates"
-                " are correct"
-            )
-
-        # Definition of two empty dataframes that will contain drive times and distances.
-        # These dataframes wiil be exported to an Excel workbook
-        df_times = pd.DataFrame(
-            index=list(origin.keys()), columns=list(destination.keys())
-        )
-        df_distance = pd.DataFrame(
-            index=list(origin.keys()), columns=list(destination.keys())
-        )
-        output_times = {}
-        output_distance = {}
-
-        # Loop for reading the output JSON file
-        if response_json["statusDescription"].lower() == "ok":
-            for i in range(
-                len(response_json["resourceSets"][0]["resources"][0]["results"])
-            ):
-                data_temp = response_json["resourceSets"][0]["resources"][0]["results"][
-                    i
-                ]
-                origin_index = data_temp["originIndex"]
-                destination_index = data_temp["destinationIndex"]
-
-                o_name = list(origin.keys())[origin_index]
-                d_name = list(destination.keys())[destination_index]
-                output_times[(o_name, d_name)] = data_temp["travelDuration"] / 60
-                output_distance[(o_name, d_name)] = (
-                    data_temp["travelDistance"] * 0.621371
-                )
-
-                df_times.loc[o_name, d_name] = output_times[(o_name, d_name)]
-                df_distance.loc[o_name, d_name] = output_distance[(o_name, d_name)]
-        else:
-            raise Warning("Error when requesting data, make sure your API key is valid")
+            tile_results = [_request_tile(tile) for tile in tiles]
+
+        for tile, (tile_result, from_api) in zip(tiles, tile_results):
+            results.update(tile_result)
+            # Estimates are not cached, so they are requested again in the next run
+            if from_api:
+                for (o_name, d_name), value in tile_result.items():
+                    key = _od_cache_key(origin[o_name], destination[d_name])
+                    cache[key] = value
+
+        if cache_file is not None and tiles:
+            tmp_file = cache_file + ".%d.tmp" % os.getpid()
+            with open(tmp_file, "w") as f:
+                json.dump(cache, f)
+            os.replace(tmp_file, cache_file)
+
+    # Definition of two dataframes that contain drive times and distances.
+    # These dataframes wiil be exported to an Excel workbook
+    output_times = {}
+    output_distance = {}
+    for o_name in origin:
+        for d_name in destination:
+            if (o_name, d_name) in results:
+                output_times[(o_name, d_name)] = results[(o_name, d_name)][0]
+                output_distance[(o_name, d_name)] = results[(o_name, d_name)][1]
+    df_times = pd.DataFrame(
+        [[output_times.get((o, d)) for d in destination] for o in origin],
+        index=list(origin.keys()),
+        columns=list(destination.keys()),
+    )
+    df_distance = pd.DataFrame(
+        [[output_distance.get((o, d)) for d in destination] for o in origin],
+        index=list(origin.keys()),
+        columns=list(destination.keys()),
+    )
 
     # Define the default name of the Excel workbook
     if fpath is None:
@@ -22,29 +22,103 @@ import logging
 _log = logging.getLogger(__name__)
 
 ###--- Functions ---###
-# free variables function
-def free_variables(model, exception_list=None, time_period=None):
+def _var_components(model, exclude=None):
+    """
+    Yield the Var components of the model (including sub-blocks) whose name is
+    not in exclude
+    """
     for var in model.component_objects(Var):
-        if exception_list is not None and var.name in exception_list:
+        if exclude is not None and var.name in exclude:
             continue
-        else:
-            for index in var:
-                is_in_time_period = True
-                if index is not None and time_period is not None:
-                    for i in index:
-                        if i in model.s_T and i not in time_period:
-                            is_in_time_period = False
-                            break
-                if not is_in_time_period:
+        yield var
+
+
+# snapshot variable state
+def snapshot_variable_state(model, exclude=None):
+    """
+    Record the value, bounds and fixed status of every variable of the model.
+
+    The state is stored per Var component as a list of
+    (VarData, value, lower, upper, fixed) tuples, so it can be restored later with
+    restore_variable_state() without looking up any index again.
+    """
+    return [
+        [(v, v.value, v.lower, v.upper, v.fixed) for v in var.values()]
+        for var in _var_components(model, exclude)
+    ]
+
+
+# restore variable state
+def restore_variable_state(state, restore_values=False):
+    """
+    Restore the bounds and fixed status recorded by snapshot_variable_state().
+    The current variable values are kept (e.g. to be used as a warm start),
+    unless restore_values is True.
+    """
+    for var_state in state:
+        for v, val, lower, upper, fixed in var_state:
+            v.lower = lower
+            v.upper = upper
+            v.fixed = fixed
+            if restore_values:
+                v.set_value(val, skip_validation=True)
+    return None
+
+
+# fix all variables except the ones in exclude
+def fix_all_except(model, exclude=None, zero_tol=None):
+    """
+    Fix every variable of the model, except the components named in exclude, to
+    its current value. If zero_tol is given, variables without a value or with an
+    absolute value not larger than zero_tol are fixed to 0.
+    """
+    for var in _var_components(model, exclude):
+        for v in var.values():
+            if zero_tol is not None and (v.value is None or abs(v.value) <= zero_tol):
+                v.fix(0)
+            else:
+                v.fix()
+    return None
+
+
+# bound variables around their current value
+def bound_around_solution(model, exclude=None, rel_tol=0.01):
+    """
+    Fix binary variables to their rounded value and bound continuous variables to
+    [(1 - rel_tol) * value, (1 + rel_tol) * value], for every variable of the
+    model except the components named in exclude. Variables without a value are
+    left unchanged.
+    """
+    for var in _var_components(model, exclude):
+        for v in var.values():
+            val = v.value
+            if val is None:
+                continue
+            if v.domain is Binary:
+                v.fix(round(val))
+            else:
+                v.setlb((1 - rel_tol) * val)
+                v.setub((1 + rel_tol) * val)
+    return None
+
+
+# free variables function
+def free_variables(model, exception_list=None, time_period=None):
+    if time_period is not None:
+        excluded_periods = {t for t in model.s_T if t not in time_period}
+    for var in _var_components(model, exception_list):
+        for index, index_var in var.items():
+            if index is not None and time_period is not None:
+                if isinstance(index, tuple):
+                    if any(i in excluded_periods for i in index):
+                        continue
+                elif index in excluded_periods:
                     continue
-                index_var = var if index is None else var[index]
-                # unfix binary variables and unbound the continuous variables
-                if index_var.domain is Binary:
-                    index_var.unfix()
-                else:
-                    index_var.unfix()
-                    index_var.setlb(0)
-                    index_var.setub(None)
+            # unfix binary variables and unbound the continuous variables
+            index_var.unfix()
+            if index_var.domain is not Binary:
+                index_var.setlb(0)
+                index_var.setub(None)
     return None
 
 
@@ -64,16 +138,18 @@ def deactivate_slacks(model):
 
 def fix_vars(model, vars_to_fix, indexes, v_val):
     _log.info("inside fix_vars")
-    for var in model.component_objects(Var):
-        if var.name in vars_to_fix:
+    for var in _var_components(model):
+        if var.name in vars_to_fix and indexes in var:
             _log.info("\nFixing this variable")
             _log.info(var)
-            for index in var:
-                if index == indexes:
-                    if not var[index].domain is Binary:
-                        v_val = pyunits.convert_value(
-                            v_val,
-                            from_units=model.user_units["volume_time"],
-                            to_units=model.model_units["volume_time"],
-                        )
-                    var[index].fix(v_val)
+            index_var = var[indexes]
+            if index_var.domain is Binary:
+                index_var.fix(v_val)
+            else:
+                index_var.fix(
+                    pyunits.convert_value(
+                        v_val,
+                        from_units=model.user_units["volume_time"],
+                        to_units=model.model_units["volume_time"],
+                    )
+                )
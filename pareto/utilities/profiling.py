@@ -0,0 +1,243 @@
+#####################################################################################################
+# PARETO was produced under the DOE Produced Water Application for Beneficial Reuse Environmental
+# Impact and Treatment Optimization (PARETO), and is copyright (c) 2021-2024 by the software owners:
+# The Regents of the University of California, through Lawrence Berkeley National Laboratory, et al.
+# All rights reserved.
+#
+# NOTICE. This Software was developed under funding from the U.S. Department of Energy and the U.S.
+# Government consequently retains certain rights. As such, the U.S. Government has been granted for
+# itself and others acting on its behalf a paid-up, nonexclusive, irrevocable, worldwide license in
+# the Software to reproduce, distribute copies to the public, prepare derivative works, and perform
+# publicly and display publicly, and to permit others to do so.
+#####################################################################################################
+# Title: Instrumentation of the construction of PARETO models
+
+###--- Imports ---###
+from contextlib import contextmanager
+import functools
+import json
+import time
+import tracemalloc
+
+import pandas as pd
+from pyomo.core.base import block as _block
+from pyomo.core.expr.current import identify_variables
+from pyomo.environ import Block, Constraint, Var
+
+# The name of the block data class changed in Pyomo 6.7.2
+_BlockData = getattr(_block, "BlockData", None) or _block._BlockData
+
+# Profilers that are currently recording, innermost last
+_active_profilers = []
+_original_add_component = None
+
+
+###--- Functions ---###
+def _profiled_add_component(block, name, val):
+    """
+    Replacement of the Pyomo add_component method that records the construction
+    of each component with the innermost active profiler
+    """
+    if not _active_profilers:
+        return _original_add_component(block, name, val)
+    return _active_profilers[-1]._record(block, name, val)
+
+
+def _install_hook():
+    global _original_add_component
+    if _original_add_component is None:
+        _original_add_component = _BlockData.add_component
+        _BlockData.add_component = _profiled_add_component
+
+
+def _remove_hook():
+    global _original_add_component
+    if _original_add_component is not None and not _active_profilers:
+        _BlockData.add_component = _original_add_component
+        _original_add_component = None
+
+
+def _component_size(component):
+    """
+    Returns the number of variables, constraints and constraint nonzeros of a
+    Var, Constraint or Block component (zeros for any other component)
+    """
+    if component.ctype is Var:
+        return len(component), 0, 0
+    if component.ctype is Constraint:
+        constraints = list(component.values())
+        nonzeros = sum(
+            len(list(identify_variables(c.body, include_fixed=True)))
+            for c in constraints
+        )
+        return 0, len(constraints), nonzeros
+    if component.ctype is Block:
+        n_vars = sum(
+            1 for _ in component.component_data_objects(Var, descend_into=True)
+        )
+        constraints = list(
+            component.component_data_objects(Constraint, descend_into=True)
+        )
+        nonzeros = sum(
+            len(list(identify_variables(c.body, include_fixed=True)))
+            for c in constraints
+        )
+        return n_vars, len(constraints), nonzeros
+    return 0, 0, 0
+
+
+def construction_stage(func):
+    """
+    Decorator for the functions that add components to an existing PARETO model
+    (e.g. water_quality or pipeline_hydraulics). When the model is being built
+    under a profiler, or was built with one (model.construction_profile), the
+    components added by the function are recorded under the function name.
+    """
+
+    @functools.wraps(func)
+    def wrapper(model, *args, **kwargs):
+        if _active_profilers:
+            profiler = _active_profilers[-1]
+        else:
+            profiler = getattr(model, "construction_profile", None)
+        if profiler is None:
+            return func(model, *args, **kwargs)
+        with profiler.stage(func.__name__):
+            return func(model, *args, **kwargs)
+
+    return wrapper
+
+
+###--- Classes ---###
+class ConstructionProfiler:
+    """
+    Records the wall time, the peak memory and the number of variables,
+    constraints and nonzeros of every component added to a Pyomo model while
+    one of its stages is active, e.g.:
+
+        profiler = ConstructionProfiler()
+        with profiler.stage("create_model"):
+            model = create_model(df_sets, df_parameters)
+        print(profiler.to_dataframe())
+
+    The peak memory is measured with tracemalloc, which slows down the model
+    construction noticeably. Set trace_memory=False to only record times.
+    The sizes are counted when the report is generated, so a Block reports
+    everything that was added to it, including later stages.
+    """
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.records = []
+        self._stages = []
+        # peak memory seen by each component under construction, innermost last
+        self._peaks = []
+        self._depth = 0
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Context manager recording every component constructed inside it
+        under the stage name
+        """
+        start_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if start_tracing:
+            tracemalloc.start()
+        _install_hook()
+        _active_profilers.append(self)
+        self._stages.append(name)
+        try:
+            yield self
+        finally:
+            self._stages.pop()
+            _active_profilers.remove(self)
+            _remove_hook()
+            if start_tracing:
+                tracemalloc.stop()
+
+    def _record(self, block, name, val):
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            start, peak = tracemalloc.get_traced_memory()
+            # Keep the peak of the enclosing components before resetting it
+            self._peaks = [max(p, peak) for p in self._peaks]
+            if hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+            self._peaks.append(start)
+        start_time = time.perf_counter()
+        self._depth += 1
+        try:
+            return _original_add_component(block, name, val)
+        finally:
+            elapsed = time.perf_counter() - start_time
+            self._depth -= 1
+            peak_memory = None
+            if tracing:
+                own_peak = max(self._peaks.pop(), tracemalloc.get_traced_memory()[1])
+                self._peaks = [max(p, own_peak) for p in self._peaks]
+                peak_memory = (own_peak - start) / 2**20
+            self.records.append(
+                {
+                    "Stage": self._stages[-1],
+                    "Component": val.name,
+                    "Type": val.ctype.__name__,
+                    "Time [s]": elapsed,
+                    "Peak Memory [MB]": peak_memory,
+                    "nested": self._depth > 0,
+                    "component": val,
+                }
+            )
+
+    def to_dataframe(self, sort_by=None):
+        """
+        Returns the construction report as a DataFrame with one row per
+        component, in construction order unless a column to sort by
+        (descending) is given
+        """
+        rows = []
+        for record in self.records:
+            row = {k: v for k, v in record.items() if k not in ("nested", "component")}
+            (
+                row["Variables"],
+                row["Constraints"],
+                row["Nonzeros"],
+            ) = _component_size(record["component"])
+            rows.append(row)
+        df = pd.DataFrame(
+            rows,
+            columns=[
+                "Stage",
+                "Component",
+                "Type",
+                "Time [s]",
+                "Peak Memory [MB]",
+                "Variables",
+                "Constraints",
+                "Nonzeros",
+            ],
+        )
+        if sort_by is not None:
+            df = df.sort_values(sort_by, ascending=False, ignore_index=True)
+        return df
+
+    def to_json(self, path=None):
+        """
+        Returns the construction report as a JSON string, and also writes it to
+        path if one is given
+        """
+        # Components constructed inside another one are part of its time already
+        stage_times = {}
+        for record in self.records:
+            if not record["nested"]:
+                stage_times[record["Stage"]] = (
+                    stage_times.get(record["Stage"], 0) + record["Time [s]"]
+                )
+        report = {
+            "stages": stage_times,
+            "components": self.to_dataframe().to_dict(orient="records"),
+        }
+        text = json.dumps(report, indent=2)
+        if path is not None:
+            with open(path, "w") as f:
+                f.write(text)
+        return text
@@ -25,14 +25,20 @@ from pareto.strategic_water_management.strategic_produced_water_optimization imp
     InfrastructureTiming,
 )
 from pyomo.environ import Constraint, Var, units as pyunits, value
+from pyomo.repn.standard_repn import generate_standard_repn
 import plotly.graph_objects as go
 import plotly.express as px
 import pandas as pd
 from enum import Enum
 
 import contextlib
+import json
+import os
 import sys
 import numpy as np
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
 
 
 class FakeIO:
@@ -64,6 +70,128 @@ class OutputUnits(Enum):
     unscaled_model_units = 1
 
 
+def _conversion_factor(from_units, to_units):
+    """
+    Return the factor that converts values from from_units to to_units, so that
+    every element of an indexed variable can be converted with one NumPy operation.
+    Pyomo units do not support offset units (e.g. degC), so a factor is enough.
+    """
+    return pyunits.convert_value(1.0, from_units=from_units, to_units=to_units)
+
+
+def _write_excel_report(fname, headers):
+    """
+    Write one sheet per report dictionary. The workbook is created in write-only
+    mode, so rows are streamed to the file sheet by sheet instead of building a
+    DataFrame and a full in-memory worksheet for every variable.
+    The layout matches the one of DataFrame.to_excel(startrow=1, index=False):
+    an empty first row, the column names, then the data.
+    """
+    header_font = Font(bold=True)
+    header_border = Border(
+        left=Side(style="thin"),
+        right=Side(style="thin"),
+        top=Side(style="thin"),
+        bottom=Side(style="thin"),
+    )
+    header_alignment = Alignment(horizontal="center", vertical="top")
+
+    workbook = Workbook(write_only=True)
+    for report_name, rows in headers.items():
+        sheet = workbook.create_sheet(title=report_name[: -len("_dict")])
+        sheet.append([])
+        header_row = []
+        for column_name in rows[0]:
+            cell = WriteOnlyCell(sheet, value=column_name)
+            cell.font = header_font
+            cell.border = header_border
+            cell.alignment = header_alignment
+            header_row.append(cell)
+        sheet.append(header_row)
+        for row in rows[1:]:
+            sheet.append(row)
+    workbook.save(fname)
+
+
+# Name of the file that lists the sheets of a Parquet report, in report order,
+# together with their original column names
+_PARQUET_MANIFEST = "_report.json"
+
+
+def _unique_columns(columns):
+    """
+    Make column names unique the same way pd.read_excel() does, e.g. a repeated
+    "Location" column becomes "Location.1", as Parquet requires unique names
+    """
+    unique = []
+    for column in columns:
+        column = str(column)
+        name, count = column, 0
+        while name in unique:
+            count += 1
+            name = f"{column}.{count}"
+        unique.append(name)
+    return unique
+
+
+def _write_parquet_report(dirname, headers):
+    """
+    Write one Parquet file per report dictionary in the directory dirname. Columns
+    that mix text and numbers (e.g. "--" entries or PROPRIETARY DATA footnotes)
+    are stored as text, since Parquet columns have a single type.
+    """
+    os.makedirs(dirname, exist_ok=True)
+    manifest = []
+    for report_name, rows in headers.items():
+        sheet_name = report_name[: -len("_dict")]
+        columns = _unique_columns(rows[0])
+        df = pd.DataFrame(
+            [row[: len(columns)] for row in rows[1:]], columns=columns, dtype=object
+        )
+        for column in columns:
+            values = df[column].dropna()
+            is_text = values.map(lambda x: isinstance(x, str))
+            if is_text.any() and not is_text.all():
+                df[column] = df[column].map(lambda x: None if x is None else str(x))
+            else:
+                df[column] = df[column].infer_objects()
+        fname = sheet_name + ".parquet"
+        df.to_parquet(os.path.join(dirname, fname), index=False)
+        manifest.append({"sheet": sheet_name, "file": fname, "columns": rows[0]})
+    with open(os.path.join(dirname, _PARQUET_MANIFEST), "w") as f:
+        json.dump(manifest, f)
+
+
+def read_report(fname, sheets=None):
+    """
+    Read a report written by generate_report() back into the results_dict format
+    it returns: {"<sheet>_dict": [(column names), (row), ...]}.
+    fname can be an Excel report or a Parquet report directory. If sheets is given,
+    only these sheets are read. Missing entries are returned as None.
+    """
+    if str(fname).lower().endswith(".parquet"):
+        with open(os.path.join(fname, _PARQUET_MANIFEST)) as f:
+            manifest = json.load(f)
+        columns = {entry["sheet"]: tuple(entry["columns"]) for entry in manifest}
+        if sheets is None:
+            sheets = list(columns)
+        data = {
+            sheet: pd.read_parquet(os.path.join(fname, sheet + ".parquet"))
+            for sheet in sheets
+        }
+    else:
+        data = pd.read_excel(fname, sheet_name=sheets, header=1)
+        columns = {sheet: tuple(df.columns) for sheet, df in data.items()}
+
+    results_dict = {}
+    for sheet, df in data.items():
+        df = df.astype(object).where(df.notna(), None)
+        results_dict[sheet + "_dict"] = [columns[sheet]] + list(
+            df.itertuples(index=False, name=None)
+        )
+    return results_dict
+
+
 def generate_report(
     model,
     results_obj=None,
@@ -76,6 +204,8 @@ def generate_report(
     and creates a dictionary that contains headers for all the variables that will be included in an Excel report.
     IMPORTANT: If an indexed variable is added or removed from a model, the printing lists and headers should be updated
     accrodingly.
+    If fname ends with ".parquet", the report is written as a directory with one Parquet file per
+    sheet instead of an Excel workbook (requires pyarrow), see read_report() to load it back.
     """
     # Printing model sets, parameters, constraints, variable values
 
@@ -1086,45 +1216,59 @@ def generate_report(
             to_unit = variable.get_units()
         else:
             to_unit = None
-        if variable._data is not None:
-            # Loop through the indices of a variable. "i" is a tuple of indices
-            for i in variable._data:
-                # convert the value to display units
-                if units_true and variable._data[i].value:
-                    var_value = pyunits.convert_value(
-                        variable._data[i].value,
-                        from_units=variable.get_units(),
-                        to_units=to_unit,
+        if variable._data is not None and not variable.is_indexed():
+            # Create the overview report with variables that are not indexed, e.g.:
+            # total piped water, total trucked water, total externally sourced water, etc.
+            var_value = variable.value
+            if units_true and var_value:
+                var_value = pyunits.convert_value(
+                    var_value,
+                    from_units=variable.get_units(),
+                    to_units=to_unit,
+                )
+            if to_unit is not None:
+                headers["v_F_Overview_dict"].append(
+                    (
+                        variable.name,
+                        variable.doc,
+                        to_unit.to_string().replace("oil_bbl", "bbl"),
+                        var_value,
                     )
-                else:
-                    var_value = variable._data[i].value
-
-                if i is None:
-                    # Create the overview report with variables that are not indexed, e.g.:
-                    # total piped water, total trucked water, total externally sourced water, etc.
-                    if to_unit is not None:
-                        headers["v_F_Overview_dict"].append(
-                            (
-                                variable.name,
-                                variable.doc,
-                                to_unit.to_string().replace("oil_bbl", "bbl"),
-                                var_value,
-                            )
-                        )
-                    else:
-                        headers["v_F_Overview_dict"].append(
-                            (variable.name, variable.doc, to_unit, var_value)
-                        )
+                )
+            else:
+                headers["v_F_Overview_dict"].append(
+                    (variable.name, variable.doc, to_unit, var_value)
+                )
 
-                # if a variable contains only one index, then "i" is recognized as a string and not a tuple,
-                # in that case, "i" is redefined by adding a comma so that it becomes a tuple
-                elif i is not None and isinstance(i, str):
-                    i = (i,)
-                # replace the discrete qualities by their actual values
-                if str(variable.name) == "v_DQ" and var_value > 0:
-                    var_value = model.p_discrete_quality[i[2], i[3]].value
-                if i is not None and var_value is not None and var_value > 0:
-                    headers[str(variable.name) + "_dict"].append((*i, var_value))
+        elif variable._data is not None:
+            # Convert all the values of the variable to display units at once,
+            # variables without a value are loaded as NaN and are not reported
+            var_values = np.array(
+                [v.value for v in variable._data.values()], dtype=float
+            )
+            if units_true:
+                var_values = var_values * _conversion_factor(
+                    variable.get_units(), to_unit
+                )
+            positive = np.flatnonzero(var_values > 0)
+            if len(positive) > 0:
+                report = headers[str(variable.name) + "_dict"]
+                indices = list(variable._data.keys())
+                is_v_DQ = str(variable.name) == "v_DQ"
+                for n, var_value in zip(
+                    positive.tolist(), var_values[positive].tolist()
+                ):
+                    i = indices[n]
+                    # if a variable contains only one index, then "i" is recognized as a string and not a tuple,
+                    # in that case, "i" is redefined by adding a comma so that it becomes a tuple
+                    if not isinstance(i, tuple):
+                        i = (i,)
+                    # replace the discrete qualities by their actual values
+                    if is_v_DQ:
+                        var_value = model.p_discrete_quality[i[2], i[3]].value
+                        if var_value is None or not var_value > 0:
+                            continue
+                    report.append((*i, var_value))
 
     if model.v_C_Slack.value is not None and model.v_C_Slack.value > 0:
         print("!!!ATTENTION!!! One or several slack variables have been triggered!")
@@ -1226,13 +1370,10 @@ def generate_report(
 
     # Creating the Excel report
     if fname is not None:
-        with pd.ExcelWriter(fname) as writer:
-            for i in headers:
-                df = pd.DataFrame(headers[i][1:], columns=headers[i][0])
-                df.fillna("")
-                df.to_excel(
-                    writer, sheet_name=i[: -len("_dict")], index=False, startrow=1
-                )
+        if str(fname).lower().endswith(".parquet"):
+            _write_parquet_report(fname, headers)
+        else:
+            _write_excel_report(fname, headers)
 
     return model, headers
 
@@ -1355,26 +1496,11 @@ def plot_sankey(input_data={}, args=None):
         )
 
     # Combine locations and cut out duplicates while maintaining same order
-    total_labels = source + destination
-    label = sorted(set(total_labels), key=total_labels.index)
-
-    all_labels = label.copy()
-
-    for s in source:
-        for l in label:
-            if s == l:
-                s_index = label.index(l)
-                for n, k in enumerate(source):
-                    if k == s:
-                        source[n] = s_index
-
-    for d in destination:
-        for l in label:
-            if d == l:
-                d_index = label.index(l)
-                for m, j in enumerate(destination):
-                    if j == d:
-                        destination[m] = d_index
+    label = list(dict.fromkeys(source + destination))
+
+    # Replace the sources and destinations by their index in the label list
+    source = pd.Categorical(source, categories=label).codes.tolist()
+    destination = pd.Categorical(destination, categories=label).codes.tolist()
 
     # Remove added string from affected names before passing them into sankey method
     for t, x in enumerate(label):
@@ -1384,21 +1510,10 @@ def plot_sankey(input_data={}, args=None):
     sum_dict = {"source": source, "destination": destination, "value": value}
     sum_df = pd.DataFrame(sum_dict)
 
-    # Finding duplicates in dataframe and dropping them
-    df_dup = sum_df[sum_df.duplicated(subset=["source", "destination"], keep=False)]
-    df_dup = df_dup.drop_duplicates(subset=["source", "destination"], keep="first")
-
-    # Looping through dataframe and summing the total values of each node and assigning it to its instance
-    for index, row in df_dup.iterrows():
-        new_value = 0
-        new_value = sum_df.loc[
-            (sum_df["source"] == row["source"])
-            & (sum_df["destination"] == row["destination"]),
-            "value",
-        ].sum()
-        sum_df.at[index, "value"] = new_value
-
-    df_updated = sum_df.drop_duplicates(subset=["source", "destination"], keep="first")
+    # Summing the values of duplicate links, keeping the first occurrence of each link
+    df_updated = sum_df.groupby(["source", "destination"], sort=False, as_index=False)[
+        "value"
+    ].sum()
 
     if is_sections:
         fig = []
@@ -1512,23 +1627,24 @@ def outlet_flow(source=[], destination=[], label=[], value=[], qualityDict=[]):
     """
     static_label = label.copy()
 
-    # Loop through each list finding where labels match sources and destination and totaling/rounding their values to be used in updated label list
+    # Total the values leaving each label, or entering it for labels without outlets
+    source = np.asarray(source, dtype=int)
+    destination = np.asarray(destination, dtype=int)
+    value = np.asarray(value, dtype=float)
+    outflow = np.bincount(source, weights=value, minlength=len(label))
+    inflow = np.bincount(destination, weights=value, minlength=len(label))
+    has_outlet = np.bincount(source, minlength=len(label)) > 0
+    has_inlet = np.bincount(destination, minlength=len(label)) > 0
+
     for x, l in enumerate(label):
-        output = 0
-        v_count = []
-        for s, g in enumerate(source):
-            if g == x:
-                v_count.append(s)
-        if len(v_count) == 0:
-            for d, h in enumerate(destination):
-                if h == x:
-                    v_count.append(d)
-            if len(v_count) == 0:
-                continue
-        for v in v_count:
-            output = output + float(value[v])
-            rounded_output = round(output, 0)
-            integer_output = int(rounded_output)
+        if has_outlet[x]:
+            output = outflow[x]
+        elif has_inlet[x]:
+            output = inflow[x]
+        else:
+            continue
+        rounded_output = round(output, 0)
+        integer_output = int(rounded_output)
 
         value_length = len(str(integer_output))
         if value_length >= 4 and value_length <= 7:
@@ -2673,80 +2789,218 @@ def is_integer_value(value, tol):
     return np.isclose(np.round(value) - value, 0.0, atol=tol)
 
 
-def _check_infeasible(obj, val, tol):
+def _period_of(index, periods):
+    """
+    Returns the time period contained in a component index, or None
+    """
+    if not isinstance(index, tuple):
+        index = (index,)
+    for i in index:
+        if i in periods:
+            return i
+    return None
+
+
+def _bound_array(values):
+    return np.array([np.nan if v is None else v for v in values], dtype=float)
+
+
+def _violation(val, lower, upper):
+    """
+    Vectorized magnitude of the violation of lower <= val <= upper, where
+    missing bounds are NaN and a missing value gives a NaN violation
+    """
+    with np.errstate(invalid="ignore"):
+        violation = np.fmax(
+            np.fmax(lower - val, val - upper), np.zeros_like(val, dtype=float)
+        )
+    violation[np.isnan(val)] = np.nan
+    return violation
+
+
+def _evaluate_constraints(constraints):
+    """
+    Evaluates the bodies of the constraints in bulk. The linear part of every
+    body is compiled into a sparse (row, column, coefficient) form once, so the
+    bodies are a single weighted sum over the variable values. Bodies with a
+    nonlinear part are evaluated with value().
+    """
+    rows, columns, coefficients = [], [], []
+    constants = np.zeros(len(constraints))
+    var_columns = {}
+    variables = []
+    nonlinear = []
+    for row, con in enumerate(constraints):
+        repn = generate_standard_repn(con.body, compute_values=True, quadratic=False)
+        if repn.nonlinear_expr is not None:
+            nonlinear.append(row)
+            continue
+        constants[row] = value(repn.constant)
+        for var, coef in zip(repn.linear_vars, repn.linear_coefs):
+            column = var_columns.get(id(var))
+            if column is None:
+                column = var_columns[id(var)] = len(variables)
+                variables.append(var)
+            rows.append(row)
+            columns.append(column)
+            coefficients.append(value(coef))
+
+    var_values = _bound_array(v.value for v in variables)
+    columns = np.array(columns, dtype=int)
+    terms = np.array(coefficients, dtype=float) * var_values[columns]
+    body = constants + np.bincount(
+        np.array(rows, dtype=int), weights=terms, minlength=len(constraints)
+    )
+    for row in nonlinear:
+        val = value(constraints[row].body, exception=False)
+        body[row] = np.nan if val is None else val
+    return body
+
+
+def feasibility_audit(model, bound_tol=1e-3, cons_tol=1e-3):
+    """
+    Checks the solution contained in a pyomo model object and returns every
+    violation found, rather than stopping at the first one. The report is a
+    DataFrame with one row per violated constraint, variable bound or
+    integrality requirement and the columns:
+        - Type: "Constraint", "Bound" or "Integrality"
+        - Family: name of the constraint or variable component
+        - Index: index within the component
+        - Period: time period of the index (None if the index has no period)
+        - Value, Lower, Upper: evaluated body (or variable value) and bounds
+        - Violation: magnitude of the violation (NaN if there is no value)
+    sorted by decreasing violation. Use summarize_feasibility_audit() to group
+    the violations by family and period.
+
+    bound_tol and cons_tol are violation tolerances acceptable for bounds and
+    constraints respectively
+    """
+    periods = set(model.s_T) if hasattr(model, "s_T") else set()
+    reports = []
+
+    def add_report(kind, components, val, lower, upper, violation, tol):
+        violated = np.isnan(violation) | (violation > tol)
+        selected = np.flatnonzero(violated)
+        if len(selected) == 0:
+            return
+        reports.append(
+            pd.DataFrame(
+                {
+                    "Type": kind,
+                    "Family": [components[i].parent_component().name for i in selected],
+                    "Index": [components[i].index() for i in selected],
+                    "Period": [
+                        _period_of(components[i].index(), periods) for i in selected
+                    ],
+                    "Value": val[selected],
+                    "Lower": lower[selected],
+                    "Upper": upper[selected],
+                    "Violation": violation[selected],
+                }
+            )
+        )
+
+    # Variable bounds and integrality
+    variables = list(model.component_data_objects(ctype=Var, descend_into=True))
+    val = _bound_array(v.value for v in variables)
+    bounds = [v.bounds for v in variables]
+    lower = _bound_array(b[0] for b in bounds)
+    upper = _bound_array(b[1] for b in bounds)
+    add_report(
+        "Bound",
+        variables,
+        val,
+        lower,
+        upper,
+        _violation(val, lower, upper),
+        bound_tol,
+    )
+    # The domains are shared by many variables, so classify each domain only once
+    domain_kind = {}
+    for v in variables:
+        if id(v.domain) not in domain_kind:
+            domain_kind[id(v.domain)] = (v.is_binary(), v.is_integer())
+    kinds = np.array([domain_kind[id(v.domain)] for v in variables], dtype=bool)
+    kinds = kinds.reshape(len(variables), 2)
+    binary = kinds[:, 0]
+    integer = kinds[:, 1] & ~binary
+    deviation = np.zeros(len(variables))
+    deviation[binary] = np.fmin(np.abs(val[binary]), np.abs(val[binary] - 1))
+    deviation[integer] = np.abs(val[integer] - np.round(val[integer]))
+    # Missing values are already reported as bound violations
+    deviation[np.isnan(val)] = 0
+    add_report(
+        "Integrality",
+        variables,
+        val,
+        lower,
+        upper,
+        deviation,
+        bound_tol,
+    )
+
+    # Constraints
+    constraints = list(
+        model.component_data_objects(ctype=Constraint, active=True, descend_into=True)
+    )
+    body = _evaluate_constraints(constraints)
+    lower = _bound_array(value(c.lower, exception=False) for c in constraints)
+    upper = _bound_array(value(c.upper, exception=False) for c in constraints)
+    add_report(
+        "Constraint",
+        constraints,
+        body,
+        lower,
+        upper,
+        _violation(body, lower, upper),
+        cons_tol,
+    )
+
+    columns = ["Type", "Family", "Index", "Period", "Value", "Lower", "Upper"]
+    if not reports:
+        return pd.DataFrame(columns=columns + ["Violation"])
+    return (
+        pd.concat(reports, ignore_index=True)
+        .sort_values("Violation", ascending=False, na_position="last")
+        .reset_index(drop=True)
+    )
+
+
+def summarize_feasibility_audit(report):
     """
-    NOTE: This method is duplicated from
-    https://github.com/Pyomo/pyomo/blob/e5627620d4cb9e6ff1e5bf29bf32e327eaf2153b/pyomo/util/infeasible.py
-    and should be replaced when made available in a Pyomo release version
+    Groups the violations of a feasibility_audit() report by type, family and
+    period, giving the number of violations and their largest and total
+    magnitude, sorted by decreasing largest violation
     """
-    if val is None:
-        # Undefined value due to missing variable value or evaluation error
-        return 4
-    # Check for infeasibilities
-    infeasible = 0
-    if obj.has_lb():
-        lb = value(obj.lower, exception=False)
-        if lb is None:
-            infeasible |= 4 | 1
-        elif lb - val > tol:
-            infeasible |= 1
-    if obj.has_ub():
-        ub = value(obj.upper, exception=False)
-        if ub is None:
-            infeasible |= 4 | 2
-        elif val - ub > tol:
-            infeasible |= 2
-    return infeasible
+    grouped = report.fillna({"Period": "-"}).groupby(["Type", "Family", "Period"])
+    summary = pd.DataFrame(
+        {
+            "Count": grouped.size(),
+            "Max Violation": grouped["Violation"].max(),
+            "Total Violation": grouped["Violation"].sum(),
+        }
+    )
+    return summary.sort_values(
+        "Max Violation", ascending=False, na_position="first"
+    ).reset_index()
 
 
 def is_feasible(model, bound_tol=1e-3, cons_tol=1e-3):
 
     """
-    Verifies the solution contained in a pyomo model object is feasible. This requires iterating
-    through all variables and constraints and ensuring that the constraint and variable bounds are
-    satisfied at the solution present in the model.
+    Verifies the solution contained in a pyomo model object is feasible, i.e., that the
+    constraints and integrality requirements are satisfied at the solution present in the
+    model. Variable bound violations are printed but do not make the solution infeasible.
     bound_tol and cons_tol are violation tolerances acceptable for bounds and constraints
     respectively
 
-    NOTE: This method uses
-    https://github.com/Pyomo/pyomo/blob/e5627620d4cb9e6ff1e5bf29bf32e327eaf2153b/pyomo/util/infeasible.py
-    as reference for development. This should be deprecated if/when Pyomo makes available a utility
-    to check for feasibility of a solution.
+    The check is done with feasibility_audit(), which returns all the violations.
     """
-    for var in model.component_data_objects(ctype=Var, descend_into=True):
-        val = var.value
-        if _check_infeasible(var, val, bound_tol):
-            print(
-                "Variable violated bounds or no value found",
-                var,
-                val,
-                var.lower,
-                var.upper,
-            )
-
-        if var.is_binary():
-            if not is_binary_value(val, bound_tol):
-                print("Variable took a non-binary value", var, val)
-                return False
-
-        # check for integer requirements
-        elif var.is_integer():
-            if not is_integer_value(val, bound_tol):
-                print("Variable took a  non-integer value", var, val)
-                return False
-
-    for con in model.component_data_objects(
-        ctype=Constraint, active=True, descend_into=True
-    ):
-        body_value = value(con.body, exception=False)
-        if _check_infeasible(con, body_value, cons_tol):
-            print(
-                "Constraint not satisfied or no value found",
-                con,
-                body_value,
-                con.lower,
-                con.upper,
-            )
-            return False
+    report = feasibility_audit(model, bound_tol=bound_tol, cons_tol=cons_tol)
+    if not report.empty:
+        print("Feasibility violations:")
+        print(summarize_feasibility_audit(report).to_string(index=False))
+    if (report["Type"] != "Bound").any():
+        return False
     print("All tests passed!")
     return True
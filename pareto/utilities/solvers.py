@@ -82,6 +82,7 @@ def set_timeout(solver: OptSolver, timeout_s: Number) -> OptSolver:
     name_key_mapping = {
         "gurobi": "timeLimit",
         "gurobi_direct": "timeLimit",
+        "gurobi_persistent": "timeLimit",
         "cbc": "seconds",
     }
     option_key = name_key_mapping.get(solver.name, None)
@@ -86,6 +86,10 @@ setup(
             "packaging",  # packaging is already a dependency of pytest, but we specify it here just in case
             "pyyaml",
         ],
+        # for writing and reading reports in Parquet format
+        "parquet": [
+            "pyarrow",
+        ],
     },
     include_package_data=True,
     package_data={
@@ -97,6 +101,7 @@ setup(
     entry_points={
         "console_scripts": [
             "stagedfright=stagedfright:main",
+            "pareto-scenario-sweep=pareto.strategic_water_management.scenario_sweep:main",
         ]
     },
 )